@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+import time
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+
+def request_deadline(request: Request) -> Optional[float]:
+    """Deadline absoluto (time.monotonic) a partir de X-Request-Timeout-Ms u OCR_REQUEST_TIMEOUT_MS."""
+    raw = request.headers.get(DEADLINE_HEADER, "").strip()
+    if not raw:
+        timeout_ms = settings.ocr_request_timeout_ms
+        return time.monotonic() + timeout_ms / 1000.0 if timeout_ms > 0 else None
+
+    try:
+        timeout_ms = int(raw)
+    except ValueError:
+        timeout_ms = 0
+    if timeout_ms <= 0:
+        raise AppException(
+            400,
+            ErrorCodes.OCR_VALIDATION_400,
+            "Validation failed",
+            f"{DEADLINE_HEADER} debe ser un entero positivo (milisegundos)",
+        )
+    return time.monotonic() + timeout_ms / 1000.0
+
+
+@asynccontextmanager
+async def admitted(request: Request, deadline: Optional[float]) -> AsyncIterator[None]:
+    """Espera un lugar en el control de admisión (si está activo) antes de correr el OCR."""
+    controller = getattr(request.app.state, "admission", None)
+    if controller is None:
+        yield
+        return
+
+    async with controller.admit(deadline=deadline, is_disconnected=request.is_disconnected):
+        yield
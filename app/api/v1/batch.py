@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+
+from fastapi import APIRouter, Depends, File, Form, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+
+from app.api.v1.ocr import ocr_lang
+from app.api.v1.streaming import NDJSON, item_error, ndjson_line
+from app.api.v1.uploads import read_upload
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+from app.core.trace import get_trace_id
+from app.services.image_fetch import fetch_image_bytes
+from app.services.ocr_runner import run_ocr
+
+router = APIRouter(tags=["OCR"])
+
+Loader = Callable[[], Awaitable[bytes]]
+
+
+async def stream_ndjson(
+    items: List[Tuple[str, Loader]],
+    run: Callable[[bytes], Awaitable[Dict[str, Any]]],
+    *,
+    instance: str,
+    trace_id: str,
+    concurrency: int,
+) -> AsyncIterator[bytes]:
+    """
+    Procesa los items con concurrencia acotada (descarga/lectura + OCR solapados) y emite
+    una línea NDJSON por item en cuanto termina, etiquetada con su índice.
+    """
+    done: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run_item(index: int, source: str, load: Loader) -> None:
+        async with slots:
+            try:
+                data = await load()
+                line = {"index": index, "source": source, "ok": True, "data": await run(data)}
+            except Exception as e:
+                line = {"index": index, "source": source, "ok": False, "error": item_error(instance, trace_id, e)}
+        await done.put(line)
+
+    tasks = [asyncio.create_task(run_item(i, source, load)) for i, (source, load) in enumerate(items)]
+    try:
+        for _ in range(len(tasks)):
+            line = await done.get()
+            yield ndjson_line(line)
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+def batch_concurrency() -> int:
+    return settings.ocr_batch_concurrency or 2 * settings.ocr_pool_size
+
+
+@router.post("/v1/ocr/batch", response_class=StreamingResponse)
+async def ocr_batch(
+    request: Request,
+    files: Optional[List[UploadFile]] = File(default=None, description="Imágenes a procesar"),
+    urls: Optional[List[str]] = Form(default=None, description="URLs de imágenes (campo repetible)"),
+    preprocess: bool = Query(True, description="Padding + resize inteligente"),
+    blocks: bool = Query(True, description="Devuelve blocks con box/confidence"),
+    lang: str = Depends(ocr_lang),
+):
+    """
+    OCR de muchas imágenes (uploads y/o URLs) en un único request. La respuesta es NDJSON:
+    una línea por item en orden de finalización, con `index` (uploads primero, luego URLs)
+    y `data` o `error` (problem details) por item.
+    """
+    files = files or []
+    urls = urls or []
+    total = len(files) + len(urls)
+
+    if total == 0:
+        raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", "Se requiere al menos un archivo o URL")
+    if total > settings.ocr_batch_max_items:
+        raise AppException(
+            400,
+            ErrorCodes.OCR_VALIDATION_400,
+            "Validation failed",
+            f"El batch excede {settings.ocr_batch_max_items} items",
+        )
+
+    items: List[Tuple[str, Loader]] = []
+    for f in files:
+        items.append(("file", lambda f=f: read_upload(f)))
+    for u in urls:
+        items.append(("url", lambda u=u: fetch_image_bytes(u)))
+
+    state = request.app.state
+
+    async def run(data: bytes) -> Dict[str, Any]:
+        return await run_ocr(state, data, preprocess=preprocess, return_blocks=blocks, lang=lang)
+
+    return StreamingResponse(
+        stream_ndjson(
+            items,
+            run,
+            instance=request.url.path,
+            trace_id=get_trace_id(),
+            concurrency=batch_concurrency(),
+        ),
+        media_type=NDJSON,
+    )
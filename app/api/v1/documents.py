@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from contextlib import suppress
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+import asyncio
+import hashlib
+
+import numpy as np
+from fastapi import APIRouter, Depends, File, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.api.v1.ocr import ocr_lang
+from app.api.v1.streaming import NDJSON, item_error, ndjson_line
+from app.api.v1.uploads import read_upload
+from app.core.config import settings
+from app.core.trace import get_trace_id
+from app.services.documents import PageSource, open_pages
+from app.services.ocr_runner import run_ocr_page
+
+router = APIRouter(tags=["OCR"])
+
+PageRunner = Callable[[int, np.ndarray], Awaitable[Dict[str, Any]]]
+
+
+async def stream_pages(
+    pages: PageSource,
+    run: PageRunner,
+    *,
+    instance: str,
+    trace_id: str,
+    concurrency: int,
+) -> AsyncIterator[bytes]:
+    """
+    Rasteriza las páginas de a una y solo cuando hay un slot libre (como mucho `concurrency`
+    páginas decodificadas en memoria), las procesa en paralelo y emite una línea NDJSON por
+    página en cuanto termina.
+    """
+    total = pages.page_count
+    done: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    slots = asyncio.Semaphore(concurrency)
+    tasks: List["asyncio.Task[None]"] = []
+
+    def error_line(index: int, exc: Exception) -> Dict[str, Any]:
+        return {"page": index, "pages": total, "ok": False, "error": item_error(instance, trace_id, exc)}
+
+    async def run_page(index: int, img: np.ndarray) -> None:
+        try:
+            line = {"page": index, "pages": total, "ok": True, "data": await run(index, img)}
+        except Exception as e:
+            line = error_line(index, e)
+        finally:
+            slots.release()
+        await done.put(line)
+
+    async def produce() -> None:
+        for index in range(total):
+            await slots.acquire()
+            try:
+                img = await run_in_threadpool(pages.render, index)
+            except Exception as e:
+                slots.release()
+                await done.put(error_line(index, e))
+                continue
+            tasks.append(asyncio.create_task(run_page(index, img)))
+
+    producer = asyncio.create_task(produce())
+    try:
+        for _ in range(total):
+            yield ndjson_line(await done.get())
+    finally:
+        producer.cancel()
+        for t in tasks:
+            t.cancel()
+        # Espera a que termine el render en curso antes de cerrar el documento.
+        with suppress(asyncio.CancelledError):
+            await producer
+        pages.close()
+
+
+@router.post("/v1/ocr/document", response_class=StreamingResponse)
+async def ocr_document(
+    request: Request,
+    file: UploadFile = File(...),
+    preprocess: bool = Query(True, description="Padding + resize inteligente"),
+    blocks: bool = Query(True, description="Devuelve blocks con box/confidence"),
+    lang: str = Depends(ocr_lang),
+):
+    """
+    OCR de documentos multipágina (PDF, TIFF multipágina; una imagen simple cuenta como 1 página).
+    La respuesta es NDJSON: una línea por página, en orden de finalización, con `page` y `pages`.
+    """
+    data = await read_upload(file, settings.document_ext)
+    digest = await run_in_threadpool(lambda: hashlib.sha256(data).hexdigest())
+    pages = await run_in_threadpool(open_pages, data)
+
+    state = request.app.state
+
+    async def run(index: int, img: np.ndarray) -> Dict[str, Any]:
+        return await run_ocr_page(
+            state,
+            img,
+            doc_digest=digest,
+            page=index,
+            preprocess=preprocess,
+            return_blocks=blocks,
+            lang=lang,
+        )
+
+    return StreamingResponse(
+        stream_pages(
+            pages,
+            run,
+            instance=request.url.path,
+            trace_id=get_trace_id(),
+            concurrency=settings.ocr_pool_size,
+        ),
+        media_type=NDJSON,
+    )
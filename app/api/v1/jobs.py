@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import json
+
+from fastapi import APIRouter, Depends, File, Form, Query, Request, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.api.v1.ocr import ocr_lang
+from app.api.v1.ocr_format import ocr_response, response_format
+from app.api.v1.uploads import read_upload
+from app.core.errors import AppException, ErrorCodes
+from app.core.trace import get_trace_id
+from app.models.schemas import JobResponse, OcrResponse
+from app.services.jobs import DONE, FAILED, JobManager
+
+router = APIRouter(tags=["OCR jobs"])
+
+
+def _manager(request: Request) -> JobManager:
+    manager = getattr(request.app.state, "job_manager", None)
+    if manager is None:
+        raise AppException(503, ErrorCodes.OCR_BUSY_503, "Service unavailable", "La cola de jobs no está iniciada")
+    return manager
+
+
+def _job_info(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "jobId": job["id"],
+        "status": job["status"],
+        "createdAt": job["created"],
+        "updatedAt": job["updated"],
+        "expiresAt": job["expires"],
+        "statusUrl": f"/v1/ocr/jobs/{job['id']}",
+        "resultUrl": f"/v1/ocr/jobs/{job['id']}/result",
+    }
+
+
+async def _get_job(manager: JobManager, job_id: str) -> Dict[str, Any]:
+    job = await run_in_threadpool(manager.store.get, job_id)
+    if job is None:
+        raise AppException(
+            404,
+            ErrorCodes.OCR_JOB_NOT_FOUND_404,
+            "Job not found",
+            f"No existe el job {job_id} (o expiró)",
+        )
+    return job
+
+
+@router.post("/v1/ocr/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(
+    request: Request,
+    file: Optional[UploadFile] = File(default=None),
+    image_url: Optional[str] = Form(default=None, description="URL de la imagen (alternativa a file)"),
+    headers: Optional[str] = Form(default=None, description="Headers opcionales para la descarga, en JSON"),
+    preprocess: bool = Query(True, description="Padding + resize inteligente"),
+    blocks: bool = Query(True, description="Devuelve blocks con box/confidence"),
+    lang: str = Depends(ocr_lang),
+):
+    """Encola un OCR (upload o URL) y responde al instante con el id del job."""
+    if (file is None) == (not image_url):
+        raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", "Envía file o image_url (uno solo)")
+
+    payload: Dict[str, Any] = {
+        "preprocess": preprocess,
+        "blocks": blocks,
+        "lang": lang,
+        "trace_id": get_trace_id(),
+    }
+    if file is not None:
+        payload["data"] = await read_upload(file)
+    else:
+        payload["image_url"] = image_url
+        if headers:
+            try:
+                payload["headers"] = {str(k): str(v) for k, v in json.loads(headers).items()}
+            except (ValueError, AttributeError):
+                raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", "headers debe ser un objeto JSON")
+
+    manager = _manager(request)
+    job_id = await manager.submit(payload)
+    job = await _get_job(manager, job_id)
+    return {"ok": True, "traceId": get_trace_id(), "data": _job_info(job)}
+
+
+@router.get("/v1/ocr/jobs/{job_id}", response_model=JobResponse)
+async def job_status(request: Request, job_id: str):
+    job = await _get_job(_manager(request), job_id)
+    return {"ok": True, "traceId": get_trace_id(), "data": _job_info(job)}
+
+
+@router.get(
+    "/v1/ocr/jobs/{job_id}/result",
+    response_model=OcrResponse,
+    responses={202: {"model": JobResponse, "description": "El job todavía no terminó"}},
+)
+async def job_result(request: Request, job_id: str, fmt: str = Depends(response_format)):
+    manager = _manager(request)
+    job = await _get_job(manager, job_id)
+
+    if job["status"] == DONE:
+        return ocr_response(job["result"], fmt)
+
+    if job["status"] == FAILED:
+        err = job["error"] or {}
+        raise AppException(
+            err.get("status", 500),
+            err.get("code", ErrorCodes.OCR_INTERNAL_500),
+            err.get("title", "Internal error"),
+            err.get("detail", "An unexpected error occurred."),
+        )
+
+    return JSONResponse(
+        status_code=202,
+        content={"ok": True, "traceId": get_trace_id(), "data": _job_info(job)},
+        headers={"Retry-After": str(manager.retry_after_seconds())},
+    )
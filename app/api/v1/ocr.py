@@ -1,16 +1,22 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, File, UploadFile, Query, Request
+import numpy as np
+from fastapi import APIRouter, Depends, File, Form, UploadFile, Query, Request
 from pydantic import BaseModel, Field
-from starlette.concurrency import run_in_threadpool
 
-from app.core.config import settings
+from app.api.v1.admission import admitted, request_deadline
+from app.api.v1.ocr_format import ocr_response, response_format
+from app.api.v1.uploads import open_upload
 from app.core.errors import AppException, ErrorCodes
-from app.core.trace import get_trace_id
 from app.models.schemas import OcrResponse
+from app.services.documents import require_single_page
 from app.services.image_fetch import fetch_image_bytes
+from app.services.ocr_regions import parse_regions
+from app.services.ocr_registry import resolve_lang
+from app.services.ocr_runner import run_ocr
+from app.services.ocr_stages import OcrStages
 
 router = APIRouter(tags=["OCR"])
 
@@ -21,49 +27,78 @@ class OcrFromUrlRequest(BaseModel):
         default=None,
         description="Headers opcionales (cookies, referer, auth). Útil para sitios que bloquean descargas.",
     )
+    regions: Optional[List[Any]] = Field(
+        default=None,
+        description="Zonas a reconocer sin detección: [x1, y1, x2, y2] o [[x, y] x 4], en coordenadas originales",
+    )
+
+
+def ocr_stages(
+    det: bool = Query(True, description="Detección de regiones de texto (false = la imagen es una sola línea)"),
+    cls: bool = Query(True, description="Clasificador de ángulo (false si el texto ya está derecho)"),
+    rec: bool = Query(True, description="Reconocimiento (false = solo cajas, sin texto)"),
+) -> OcrStages:
+    return OcrStages(det=det, cls=cls, rec=rec).validate()
+
+
+def ocr_lang(
+    lang: Optional[str] = Query(None, description="Idioma del reconocedor (OCR_LANG u OCR_LANGS); default OCR_LANG"),
+) -> str:
+    return resolve_lang(lang)
+
+
+def _check_modes(regions: Optional[np.ndarray], stages: OcrStages, tiled: bool) -> None:
+    detail = None
+    if regions is not None and not stages.rec:
+        detail = "regions requiere rec=true (solo se reconocen las zonas indicadas)"
+    elif tiled and (regions is not None or not stages.det):
+        detail = "tiled requiere detección (det=true) y no admite regions"
+    if detail:
+        raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", detail)
 
 
 @router.post("/v1/ocr", response_model=OcrResponse)
 async def ocr_upload(
     request: Request,
     file: UploadFile = File(...),
+    regions: Optional[str] = Form(default=None, description="JSON con zonas a reconocer sin detección"),
     preprocess: bool = Query(True, description="Padding + resize inteligente"),
     blocks: bool = Query(True, description="Devuelve blocks con box/confidence"),
+    tiled: bool = Query(False, description="Imágenes muy grandes: tiles paralelos a resolución nativa"),
+    layout: bool = Query(False, description="Agrega lines y paragraphs en orden de lectura"),
+    triage: Optional[bool] = Query(None, description="Saltea el OCR si la imagen no tiene texto (default: OCR_TRIAGE)"),
+    near_duplicates: bool = Query(False, description="Reutiliza el resultado de una imagen casi idéntica ya procesada"),
+    stages: OcrStages = Depends(ocr_stages),
+    lang: str = Depends(ocr_lang),
+    fmt: str = Depends(response_format),
 ):
-    if not file.filename:
-        raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", "Archivo sin nombre")
-
-    ext = "." + file.filename.split(".")[-1].lower() if "." in file.filename else ""
-    if ext not in settings.allowed_ext:
-        raise AppException(
-            415,
-            ErrorCodes.OCR_UNSUPPORTED_415,
-            "Unsupported media type",
-            f"Formato no soportado: {ext}",
-        )
-
-    data = await file.read()
-    if not data:
-        raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", "Archivo vacío")
-
-    if len(data) > settings.max_bytes:
-        raise AppException(
-            413,
-            ErrorCodes.OCR_TOO_LARGE_413,
-            "Payload too large",
-            f"El archivo excede {settings.max_file_mb}MB",
-        )
-
-    engine = request.app.state.ocr_engine
-
-    out = await run_in_threadpool(
-        engine.extract_from_bytes,
-        data,
-        preprocess=preprocess,
-        return_blocks=blocks,
-    )
-
-    return {"ok": True, "traceId": get_trace_id(), "data": out}
+    deadline = request_deadline(request)
+    parsed_regions = parse_regions(regions)
+    _check_modes(parsed_regions, stages, tiled)
+    upload = await open_upload(file)
+
+    try:
+        require_single_page(upload.data)
+        async with admitted(request, deadline):
+            out = await run_ocr(
+                request.app.state,
+                upload.data,
+                preprocess=preprocess,
+                return_blocks=blocks,
+                stages=stages,
+                regions=parsed_regions,
+                tiled=tiled,
+                deadline=deadline,
+                lang=lang,
+                release=upload.release,
+                layout=layout,
+                triage=triage,
+                near_duplicates=near_duplicates,
+            )
+    finally:
+        upload.release()
+
+    return ocr_response(out, fmt)
 
 
 @router.post("/v1/ocr/from-url", response_model=OcrResponse)
@@ -72,17 +107,37 @@ async def ocr_from_url(
     payload: OcrFromUrlRequest,
     preprocess: bool = Query(True, description="Padding + resize inteligente"),
     blocks: bool = Query(True, description="Devuelve blocks con box/confidence"),
+    tiled: bool = Query(False, description="Imágenes muy grandes: tiles paralelos a resolución nativa"),
+    layout: bool = Query(False, description="Agrega lines y paragraphs en orden de lectura"),
+    triage: Optional[bool] = Query(None, description="Saltea el OCR si la imagen no tiene texto (default: OCR_TRIAGE)"),
+    near_duplicates: bool = Query(False, description="Reutiliza el resultado de una imagen casi idéntica ya procesada"),
+    stages: OcrStages = Depends(ocr_stages),
+    lang: str = Depends(ocr_lang),
+    fmt: str = Depends(response_format),
 ):
+    deadline = request_deadline(request)
+    regions = parse_regions(payload.regions)
+    _check_modes(regions, stages, tiled)
+
     # 1) descargar imagen (con agente/headers + streaming + límite)
     img_bytes = await fetch_image_bytes(payload.image_url, extra_headers=payload.headers)
+    require_single_page(img_bytes)
+
+    # 2) OCR (CPU-bound) en threadpool, pasando por el control de admisión y el cache de resultados
+    async with admitted(request, deadline):
+        out = await run_ocr(
+            request.app.state,
+            img_bytes,
+            preprocess=preprocess,
+            return_blocks=blocks,
+            stages=stages,
+            regions=regions,
+            tiled=tiled,
+            deadline=deadline,
+            lang=lang,
+            layout=layout,
+            triage=triage,
+            near_duplicates=near_duplicates,
+        )
 
-    # 2) OCR (CPU-bound) en threadpool
-    engine = request.app.state.ocr_engine
-    out = await run_in_threadpool(
-        engine.extract_from_bytes,
-        img_bytes,
-        preprocess=preprocess,
-        return_blocks=blocks,
-    )
-
-    return {"ok": True, "traceId": get_trace_id(), "data": out}
\ No newline at end of file
+    return ocr_response(out, fmt)
\ No newline at end of file
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import Query, Request
+from fastapi.responses import Response
+
+from app.core.errors import AppException, ErrorCodes
+from app.core.metrics import stage
+from app.core.serialization import FastJSONResponse, dumps
+from app.core.trace import get_trace_id
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack es opcional (solo para format=msgpack)
+    msgpack = None
+
+JSON = "json"
+COLUMNAR = "columnar"
+MSGPACK = "msgpack"
+
+COLUMNAR_JSON = "application/vnd.kennedycore.ocr.columnar+json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+BOX_STRIDE = 8  # 4 puntos x (x, y)
+
+
+def response_format(
+    request: Request,
+    format: Optional[str] = Query(
+        None,
+        description="json (default) | columnar (arrays por campo, cajas int32 planas) | msgpack (columnar binario)",
+    ),
+) -> str:
+    """El query param manda; si no viene, se mira el header Accept."""
+    if format is not None:
+        value = format.strip().lower()
+        if value not in (JSON, COLUMNAR, MSGPACK):
+            raise AppException(
+                400,
+                ErrorCodes.OCR_VALIDATION_400,
+                "Validation failed",
+                f"format debe ser {JSON}, {COLUMNAR} o {MSGPACK}",
+            )
+    else:
+        accept = request.headers.get("accept", "").lower()
+        if any(t in accept for t in MSGPACK_TYPES):
+            value = MSGPACK
+        elif COLUMNAR_JSON in accept:
+            value = COLUMNAR
+        else:
+            value = JSON
+
+    if value == MSGPACK and msgpack is None:
+        raise AppException(
+            406,
+            ErrorCodes.OCR_NOT_ACCEPTABLE_406,
+            "Not acceptable",
+            "Formato msgpack no disponible (falta el paquete msgpack)",
+        )
+    return value
+
+
+def _columns(blocks: List[Dict[str, Any]], *, binary: bool) -> Dict[str, Any]:
+    # reshape con el ancho fijo: sin bloques (página en blanco, blocks=false, triage) queda (0, 8).
+    boxes = np.asarray([b["box"] for b in blocks], dtype="<i4").reshape(-1, BOX_STRIDE)
+    return {
+        "count": len(blocks),
+        "text": [b["text"] for b in blocks],
+        "confidence": [b["confidence"] for b in blocks],
+        # Fila i = caja del bloque i: x1, y1, ..., x4, y4. En msgpack son los bytes int32 little-endian.
+        # En JSON, lista de ints: el fallback de la stdlib (sin orjson) no serializa arrays numpy.
+        "boxes": boxes.tobytes() if binary else boxes.ravel().tolist(),
+        "boxStride": boxes.shape[1],
+    }
+
+
+def ocr_response(out: Dict[str, Any], fmt: str = JSON) -> Response:
+    """
+    Respuesta de OCR sin pasar de nuevo por OcrResponse: los datos del engine ya tienen esa forma,
+    así que se serializan directo (mismo JSON que antes, sin revalidar cada bloque).
+    """
+    data: Dict[str, Any] = {
+        "text": out["text"],
+        "blocks": out["blocks"],
+        "preprocess": out.get("preprocess"),
+        "cache": out.get("cache"),
+    }
+    if "lines" in out:
+        data["lines"] = out["lines"]
+        data["paragraphs"] = out["paragraphs"]
+    if "triage" in out:
+        data["triage"] = out["triage"]
+    headers = {"Vary": "Accept"}
+    if fmt == JSON:
+        return FastJSONResponse({"ok": True, "traceId": get_trace_id(), "data": data}, headers=headers)
+
+    with stage("serialize"):
+        data["blocks"] = _columns(out["blocks"], binary=fmt == MSGPACK)
+        body = {"ok": True, "traceId": get_trace_id(), "format": COLUMNAR, "data": data}
+        if fmt == MSGPACK:
+            return Response(msgpack.packb(body, use_bin_type=True), media_type=MSGPACK_TYPES[0], headers=headers)
+        return Response(dumps(body), media_type=COLUMNAR_JSON, headers=headers)
@@ -1,5 +1,11 @@
 from fastapi import APIRouter
+from app.api.v1.batch import router as batch_router
+from app.api.v1.documents import router as documents_router
+from app.api.v1.jobs import router as jobs_router
 from app.api.v1.ocr import router as ocr_router
 
 router = APIRouter()
-router.include_router(ocr_router)
\ No newline at end of file
+router.include_router(ocr_router)
+router.include_router(batch_router)
+router.include_router(documents_router)
+router.include_router(jobs_router)
\ No newline at end of file
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+import logging
+
+from app.core.errors import AppException, ErrorCodes, problem_details
+from app.core.metrics import ERRORS
+from app.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "application/x-ndjson"
+
+
+def item_error(instance: str, trace_id: str, exc: Exception) -> Dict[str, Any]:
+    """Problem details para un item de una respuesta streaming (el resto del stream sigue)."""
+    if isinstance(exc, AppException):
+        body = problem_details(instance, exc.status, exc.code, exc.title, exc.detail, trace_id)
+    else:
+        logger.exception("Streamed item failed")
+        body = problem_details(
+            instance,
+            500,
+            ErrorCodes.OCR_INTERNAL_500,
+            "Internal error",
+            "An unexpected error occurred.",
+            trace_id,
+        )
+    ERRORS.labels(body["code"]).inc()
+    return body
+
+
+def ndjson_line(obj: Dict[str, Any]) -> bytes:
+    return dumps(obj) + b"\n"
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from fastapi import UploadFile
+from starlette.exceptions import HTTPException
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+from app.core.metrics import BYTES
+from app.utils.files import UploadBuffer, read_upload_chunked
+
+# Margen para headers multipart y los campos de texto (regions, urls) que viajan junto al archivo.
+FORM_OVERHEAD_BYTES = 256 * 1024
+
+
+def check_upload_name(filename: str, allowed_ext: Optional[Set[str]] = None) -> None:
+    if not filename:
+        raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", "Archivo sin nombre")
+
+    ext = "." + filename.split(".")[-1].lower() if "." in filename else ""
+    if ext not in (allowed_ext or settings.allowed_ext):
+        raise AppException(
+            415,
+            ErrorCodes.OCR_UNSUPPORTED_415,
+            "Unsupported media type",
+            f"Formato no soportado: {ext}",
+        )
+
+
+async def open_upload(file: UploadFile, allowed_ext: Optional[Set[str]] = None) -> UploadBuffer:
+    """
+    Upload validado sin copiarlo entero al heap (ver UploadBuffer). Quien lo abre llama a `release()`
+    al terminar; run_ocr lo hace antes, apenas se decodifica la imagen.
+    """
+    check_upload_name(file.filename or "", allowed_ext)
+
+    buf = await read_upload_chunked(file, settings.max_bytes)
+    BYTES.labels("uploaded").inc(len(buf))
+    if not len(buf):
+        raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", "Archivo vacío")
+    return buf
+
+
+async def read_upload(file: UploadFile, allowed_ext: Optional[Set[str]] = None) -> bytes:
+    """Igual que open_upload pero devuelve bytes propios (jobs, batch y documentos los usan después del request)."""
+    buf = await open_upload(file, allowed_ext)
+    try:
+        return buf.data if isinstance(buf.data, bytes) else bytes(buf.data)
+    finally:
+        buf.release()
+
+
+class UploadTooLarge(HTTPException):
+    """413 cortando el body a mitad de camino (FastAPI re-lanza HTTPException al parsear el form)."""
+
+    def __init__(self, limit: int, what: str = "El request") -> None:
+        super().__init__(413, f"{what} excede {limit // (1024 * 1024)}MB")
+
+
+def upload_body_limit(path: str) -> int:
+    """Tope del body multipart completo: un archivo (o OCR_BATCH_MAX_ITEMS en /batch) más el margen del form."""
+    files = settings.ocr_batch_max_items if path.rstrip("/").endswith("/batch") else 1
+    return settings.max_bytes * files + FORM_OVERHEAD_BYTES
+
+
+def upload_part_limit() -> int:
+    """Tope de cada parte del multipart: un archivo más sus headers."""
+    return settings.max_bytes + FORM_OVERHEAD_BYTES
+
+
+def multipart_boundary(content_type: bytes) -> Optional[bytes]:
+    for param in content_type.split(b";")[1:]:
+        name, _, value = param.strip().partition(b"=")
+        if name.lower() == b"boundary" and value:
+            return value.strip(b'"')
+    return None
+
+
+class PartSizeLimiter:
+    """
+    Mide cada parte del multipart mientras llega, buscando el delimitador en el stream (también partido
+    entre chunks): en /batch el tope del body es N archivos, pero ninguno puede pasar de MAX_FILE_MB.
+    """
+
+    def __init__(self, boundary: bytes, limit: int) -> None:
+        self._delimiter = b"--" + boundary
+        self._limit = limit
+        self._tail = b""
+        self._offset = 0  # bytes vistos
+        self._part_start = 0  # fin del último delimitador
+
+    def feed(self, chunk: bytes) -> None:
+        data = self._tail + chunk
+        base = self._offset - len(self._tail)
+        i = data.find(self._delimiter)
+        while i >= 0:
+            self._check(base + i)  # una parte que empieza y termina dentro del mismo chunk
+            self._part_start = base + i + len(self._delimiter)
+            i = data.find(self._delimiter, i + len(self._delimiter))
+        self._offset += len(chunk)
+        self._tail = data[-(len(self._delimiter) - 1) :]
+        self._check(self._offset)
+
+    def _check(self, end: int) -> None:
+        if end - self._part_start > self._limit:
+            raise UploadTooLarge(settings.max_bytes, "Un archivo")
+
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class UploadLimitMiddleware:
+    """
+    Corta los uploads multipart antes de recibirlos enteros: con Content-Length por encima del tope
+    falla en el primer receive (sin leer nada); sin él (chunked) cuenta los bytes y falla apenas se pasa.
+    ASGI puro para envolver `receive`, que BaseHTTPMiddleware no permite.
+    """
+
+    def __init__(self, app: Callable[[Scope, Receive, Send], Awaitable[None]]) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_type = headers.get(b"content-type", b"")
+        if not content_type.lower().startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = upload_body_limit(scope["path"])
+        try:
+            declared = int(headers.get(b"content-length", b"-1"))
+        except ValueError:
+            declared = -1
+        received = 0
+        boundary = multipart_boundary(content_type)
+        parts = PartSizeLimiter(boundary, upload_part_limit()) if boundary else None
+
+        async def limited_receive() -> Dict[str, Any]:
+            nonlocal received
+            if declared > limit:
+                raise UploadTooLarge(limit)
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                received += len(body)
+                if received > limit:
+                    raise UploadTooLarge(limit)
+                if parts is not None:
+                    parts.feed(body)
+            return message
+
+        await self.app(scope, limited_receive, send)
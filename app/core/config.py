@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import os
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 from typing import Set
@@ -16,10 +18,84 @@ class Settings(BaseSettings):
     # OCR
     ocr_lang: str = Field(default="es", alias="OCR_LANG")
     ocr_drop_score: float = Field(default=0.30, alias="OCR_DROP_SCORE")
+    ocr_det_limit_side_len: int = Field(default=960, alias="OCR_DET_LIMIT_SIDE_LEN")  # el detector achica lo que lo exceda
+    ocr_langs_raw: str = Field(default="", alias="OCR_LANGS")  # idiomas extra para ?lang=, cargados bajo demanda
+    ocr_engines_max_mb: int = Field(default=2048, alias="OCR_ENGINES_MAX_MB")  # presupuesto de esos engines, 0 = sin límite
+    ocr_engine_mb: int = Field(default=0, alias="OCR_ENGINE_MB")  # tamaño asumido por engine; 0 = estimado por sus pesos
+    ocr_model_dir: str = Field(default="", alias="OCR_MODEL_DIR")  # det/ cls/ rec/ locales (obligatorio salvo la opción de abajo)
+    ocr_allow_model_download: bool = Field(default=False, alias="OCR_ALLOW_MODEL_DOWNLOAD")  # solo desarrollo: sin OCR_MODEL_DIR, PaddleOCR descarga
+
+    # Warm-up before /ready (image sizes as WxH, comma separated)
+    ocr_warmup: bool = Field(default=True, alias="OCR_WARMUP")
+    ocr_warmup_sizes: str = Field(default="800x600,1240x1754,1920x1080", alias="OCR_WARMUP_SIZES")
+
+    # Engine pool
+    ocr_pool_size: int = Field(default=1, alias="OCR_POOL_SIZE")
+    ocr_cpu_threads: int = Field(default=0, alias="OCR_CPU_THREADS")  # 0 = cpu_count / pool_size
+    ocr_pool_timeout_seconds: float = Field(default=30.0, alias="OCR_POOL_TIMEOUT_SECONDS")
+
+    # Cross-request recognition batching (window 0 = disabled)
+    ocr_rec_batch_window_ms: float = Field(default=0.0, alias="OCR_REC_BATCH_WINDOW_MS")
+    ocr_rec_batch_max: int = Field(default=32, alias="OCR_REC_BATCH_MAX")
+
+    # Execution mode: "thread" (pool in-process) | "process" (OCR_POOL_SIZE worker processes)
+    ocr_execution_mode: str = Field(default="thread", alias="OCR_EXECUTION_MODE")
+    ocr_process_timeout_seconds: float = Field(default=120.0, alias="OCR_PROCESS_TIMEOUT_SECONDS")
+    ocr_process_startup_seconds: float = Field(default=300.0, alias="OCR_PROCESS_STARTUP_SECONDS")
+
+    # Result cache (OCR_CACHE_MAX_MB=0 disables it; OCR_CACHE_DIR enables the disk tier)
+    ocr_cache_max_mb: int = Field(default=64, alias="OCR_CACHE_MAX_MB")
+    ocr_cache_dir: str = Field(default="", alias="OCR_CACHE_DIR")
+    ocr_cache_disk_max_mb: int = Field(default=1024, alias="OCR_CACHE_DISK_MAX_MB")
+
+    # Near-duplicate lookups (?near_duplicates=true): perceptual hash -> result cache entry
+    ocr_near_cache_max_entries: int = Field(default=100_000, alias="OCR_NEAR_CACHE_MAX_ENTRIES")  # 0 = disabled
+    ocr_near_cache_max_distance: int = Field(default=4, alias="OCR_NEAR_CACHE_MAX_DISTANCE")  # bits of 64
+    ocr_near_cache_verify_distance: int = Field(default=16, alias="OCR_NEAR_CACHE_VERIFY_DISTANCE")  # bits of 256
+
+    # Admission control for /v1/ocr and /v1/ocr/from-url
+    ocr_max_concurrency: int = Field(default=0, alias="OCR_MAX_CONCURRENCY")  # 0 = 2 * OCR_POOL_SIZE
+    ocr_admission_queue_size: int = Field(default=64, alias="OCR_ADMISSION_QUEUE_SIZE")
+    ocr_admission_timeout_seconds: float = Field(default=10.0, alias="OCR_ADMISSION_TIMEOUT_SECONDS")
+    ocr_request_timeout_ms: int = Field(default=0, alias="OCR_REQUEST_TIMEOUT_MS")  # default deadline, 0 = none
 
     # Upload
     max_file_mb: int = Field(default=10, alias="MAX_FILE_MB")
     allowed_ext_raw: str = Field(default=".png,.jpg,.jpeg,.webp,.bmp,.tif,.tiff", alias="ALLOWED_EXT")
+    ocr_max_pixels: int = Field(default=100_000_000, alias="OCR_MAX_PIXELS")  # decoded pixels, 0 = no limit
+    ocr_max_regions: int = Field(default=200, alias="OCR_MAX_REGIONS")
+
+    # Batch (/v1/ocr/batch)
+    ocr_batch_max_items: int = Field(default=500, alias="OCR_BATCH_MAX_ITEMS")
+    ocr_batch_concurrency: int = Field(default=0, alias="OCR_BATCH_CONCURRENCY")  # 0 = 2 * OCR_POOL_SIZE
+
+    # Async jobs (/v1/ocr/jobs)
+    ocr_jobs_queue_size: int = Field(default=100, alias="OCR_JOBS_QUEUE_SIZE")
+    ocr_jobs_workers: int = Field(default=0, alias="OCR_JOBS_WORKERS")  # 0 = OCR_POOL_SIZE
+    ocr_jobs_ttl_seconds: float = Field(default=3600.0, alias="OCR_JOBS_TTL_SECONDS")
+    ocr_jobs_purge_interval_seconds: float = Field(default=300.0, alias="OCR_JOBS_PURGE_INTERVAL_SECONDS")  # 0 = only at startup
+    ocr_jobs_db: str = Field(default="data/jobs.sqlite3", alias="OCR_JOBS_DB")
+
+    # Multi-page documents (/v1/ocr/document)
+    ocr_pdf_dpi: int = Field(default=200, alias="OCR_PDF_DPI")
+    ocr_max_pages: int = Field(default=500, alias="OCR_MAX_PAGES")
+
+    # Pre-OCR triage: skip inference on blank/textless images (?triage= overrides per request)
+    ocr_triage: bool = Field(default=False, alias="OCR_TRIAGE")
+    ocr_triage_max_side: int = Field(default=512, alias="OCR_TRIAGE_MAX_SIDE")  # downscaled copy it looks at
+    ocr_triage_min_std: float = Field(default=2.0, alias="OCR_TRIAGE_MIN_STD")  # gray levels
+    ocr_triage_min_edge_density: float = Field(default=0.0005, alias="OCR_TRIAGE_MIN_EDGE_DENSITY")
+    ocr_triage_text_check: bool = Field(default=False, alias="OCR_TRIAGE_TEXT_CHECK")
+    ocr_triage_min_text_score: float = Field(default=0.0003, alias="OCR_TRIAGE_MIN_TEXT_SCORE")
+    ocr_triage_audit_rate: float = Field(default=0.0, alias="OCR_TRIAGE_AUDIT_RATE")  # skips still OCR'd to check
+    ocr_triage_audit_dir: str = Field(default="", alias="OCR_TRIAGE_AUDIT_DIR")  # saves false negatives
+
+    # Tiled OCR (?tiled=true): native-resolution tiles for very large images
+    ocr_tile_size: int = Field(default=960, alias="OCR_TILE_SIZE")  # capped at OCR_DET_LIMIT_SIDE_LEN
+    ocr_tile_overlap: int = Field(default=160, alias="OCR_TILE_OVERLAP")
+    ocr_tile_max_tiles: int = Field(default=64, alias="OCR_TILE_MAX_TILES")
+    ocr_tile_concurrency: int = Field(default=0, alias="OCR_TILE_CONCURRENCY")  # 0 = OCR_POOL_SIZE
+    ocr_tile_merge_threshold: float = Field(default=0.6, alias="OCR_TILE_MERGE_THRESHOLD")
 
     # Preprocess
     ocr_target_min_side: int = Field(default=1200, alias="OCR_TARGET_MIN_SIDE")
@@ -34,6 +110,13 @@ class Settings(BaseSettings):
     fetch_timeout_seconds: float = Field(default=20.0, alias="FETCH_TIMEOUT_SECONDS")
     fetch_max_redirects: int = Field(default=5, alias="FETCH_MAX_REDIRECTS")
     allow_private_networks: bool = Field(default=False, alias="ALLOW_PRIVATE_NETWORKS")
+    fetch_max_connections: int = Field(default=100, alias="FETCH_MAX_CONNECTIONS")
+    fetch_max_keepalive: int = Field(default=20, alias="FETCH_MAX_KEEPALIVE")
+    fetch_keepalive_seconds: float = Field(default=30.0, alias="FETCH_KEEPALIVE_SECONDS")
+    fetch_max_per_host: int = Field(default=10, alias="FETCH_MAX_PER_HOST")
+    fetch_http2: bool = Field(default=False, alias="FETCH_HTTP2")
+    fetch_dns_ttl_seconds: float = Field(default=60.0, alias="FETCH_DNS_TTL_SECONDS")
+    fetch_dns_negative_ttl_seconds: float = Field(default=10.0, alias="FETCH_DNS_NEGATIVE_TTL_SECONDS")
 
     # Problem Details
     problem_base_url: str = Field(default="https://kennedycore.dev/problems/ocr", alias="PROBLEM_BASE_URL")
@@ -42,6 +125,20 @@ class Settings(BaseSettings):
     def allowed_ext(self) -> Set[str]:
         return {e.strip().lower() for e in self.allowed_ext_raw.split(",") if e.strip()}
 
+    @property
+    def ocr_langs(self) -> Set[str]:
+        return {lang.strip().lower() for lang in self.ocr_langs_raw.split(",") if lang.strip()}
+
+    @property
+    def document_ext(self) -> Set[str]:
+        return self.allowed_ext | {".pdf"}
+
+    @property
+    def ocr_threads_per_instance(self) -> int:
+        if self.ocr_cpu_threads > 0:
+            return self.ocr_cpu_threads
+        return max(1, (os.cpu_count() or 1) // max(1, self.ocr_pool_size))
+
     @property
     def max_bytes(self) -> int:
         return self.max_file_mb * 1024 * 1024
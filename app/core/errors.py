@@ -1,6 +1,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
 
 
 @dataclass
@@ -9,12 +13,42 @@ class AppException(Exception):
     code: str
     title: str
     detail: str
+    headers: Optional[Dict[str, str]] = None
 
 
 class ErrorCodes:
     OCR_VALIDATION_400 = "OCR-VALIDATION-400"
     OCR_UNSUPPORTED_415 = "OCR-UNSUPPORTED-415"
+    OCR_NOT_ACCEPTABLE_406 = "OCR-NOT-ACCEPTABLE-406"
     OCR_TOO_LARGE_413 = "OCR-TOO-LARGE-413"
     OCR_FETCH_400 = "OCR-FETCH-400"
     OCR_FETCH_502 = "OCR-FETCH-502"
-    OCR_INTERNAL_500 = "OCR-ERR-500"
\ No newline at end of file
+    OCR_JOB_NOT_FOUND_404 = "OCR-JOB-NOT-FOUND-404"
+    OCR_QUEUE_FULL_429 = "OCR-QUEUE-FULL-429"
+    OCR_BUSY_503 = "OCR-BUSY-503"
+    OCR_TIMEOUT_504 = "OCR-TIMEOUT-504"
+    OCR_CLIENT_CLOSED_499 = "OCR-CLIENT-CLOSED-499"
+    OCR_INTERNAL_500 = "OCR-ERR-500"
+
+
+def problem_details(
+    instance: str,
+    status: int,
+    code: str,
+    title: str,
+    detail: str,
+    trace_id: str,
+    errors: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Cuerpo RFC 7807 (application/problem+json)."""
+    return {
+        "type": f"{settings.problem_base_url}/{code.lower()}",
+        "title": title,
+        "status": status,
+        "detail": detail,
+        "instance": instance,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "traceId": trace_id,
+        "code": code,
+        "errors": errors or [],
+    }
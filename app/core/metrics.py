@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+import contextvars
+import threading
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "ocr_stage_seconds",
+    "Duración de cada etapa del pipeline OCR",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+REQUEST_SECONDS = Histogram(
+    "ocr_http_request_seconds",
+    "Duración total de los requests HTTP",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+IN_FLIGHT = Gauge("ocr_http_requests_in_flight", "Requests HTTP en curso", registry=REGISTRY)
+QUEUED = Gauge("ocr_queued", "Trabajo esperando capacidad OCR", ["queue"], registry=REGISTRY)
+ENGINES_IN_USE = Gauge("ocr_engines_in_use", "Instancias/workers OCR ocupados", registry=REGISTRY)
+BYTES = Counter("ocr_bytes", "Bytes de imagen recibidos", ["direction"], registry=REGISTRY)
+IMAGE_PIXELS = Histogram(
+    "ocr_image_pixels",
+    "Píxeles de las imágenes decodificadas",
+    buckets=(1e5, 5e5, 1e6, 2e6, 5e6, 1e7, 2e7, 5e7, 1e8),
+    registry=REGISTRY,
+)
+STARTUP_SECONDS = Gauge(
+    "ocr_startup_seconds", "Duración del arranque en frío, por fase (import, load, warmup, total)", ["phase"],
+    registry=REGISTRY,
+)
+FIRST_REQUEST_SECONDS = Gauge(
+    "ocr_first_request_seconds", "Duración del primer request OCR después del arranque", registry=REGISTRY
+)
+ENGINE_EVENTS = Counter(
+    "ocr_lang_engines", "Registry de engines por idioma: hits, cargas y desalojos", ["event"], registry=REGISTRY
+)
+ENGINE_BYTES = Gauge("ocr_lang_engines_bytes", "Memoria estimada de los engines por idioma cargados", registry=REGISTRY)
+READY = Gauge("ocr_ready", "1 cuando el engine está cargado y caliente", registry=REGISTRY)
+TRIAGE = Counter(
+    "ocr_triage", "Triage previo a la inferencia: passed, skipped, audited, false_negative", ["result"],
+    registry=REGISTRY,
+)
+ERRORS = Counter("ocr_errors", "Errores devueltos, por código de ErrorCodes", ["code"], registry=REGISTRY)
+
+# Etapas del request actual (ms acumulados) para el header Server-Timing. Es el mismo dict en
+# todos los threads que heredan el contexto (run_in_threadpool copia el contexto, no el dict).
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("stage_timings", default=None)
+# Los tiles de un request tiled suman en paralelo sobre ese dict: sin lock se pierden incrementos.
+_timings_lock = threading.Lock()
+
+
+def start_request_timings() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+def record_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(name).observe(seconds)
+    timings = _timings.get()
+    if timings is not None:
+        with _timings_lock:
+            timings[name] = timings.get(name, 0.0) + seconds * 1000.0
+
+
+def record_stages(timings_ms: Dict[str, float]) -> None:
+    """Registra etapas medidas en otro proceso (workers de OCR_EXECUTION_MODE=process)."""
+    for name, ms in timings_ms.items():
+        record_stage(name, ms / 1000.0)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - t0)
+
+
+def server_timing_header(timings: Dict[str, float], total_ms: float) -> str:
+    parts = [f"{name};dur={ms:.1f}" for name, ms in timings.items()]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+def refresh_gauges(stats: Dict[str, Any]) -> None:
+    """Actualiza los gauges de cola/ocupación con los `stats()` de los componentes (al momento del scrape)."""
+    admission = stats.get("admission") or {}
+    jobs = stats.get("jobs") or {}
+    engine = stats.get("engine") or {}
+    languages = stats.get("languages") or {}
+    QUEUED.labels("admission").set(admission.get("waiting", 0))
+    QUEUED.labels("jobs").set(jobs.get("queued", 0))
+    ENGINES_IN_USE.set((engine.get("pool") or {}).get("in_use", 0))
+    ENGINE_BYTES.set(languages.get("bytes", 0))
+
+
+def render_metrics() -> bytes:
+    return generate_latest(REGISTRY)
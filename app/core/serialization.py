@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Any
+import json
+
+from fastapi.responses import JSONResponse
+
+from app.core.metrics import stage
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional, el fallback es la stdlib
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON compacto en UTF-8 (orjson si está instalado; acepta tipos numpy)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse con `dumps` y la etapa "serialize" medida (Server-Timing / métricas)."""
+
+    def render(self, content: Any) -> bytes:
+        with stage("serialize"):
+            return dumps(content)
@@ -1,17 +1,37 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import time
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.core.config import settings
+from app.core.serialization import FastJSONResponse
 from app.core.trace import get_trace_id, new_trace_id, set_trace_id
-from app.core.errors import AppException, ErrorCodes
+from app.core.errors import AppException, ErrorCodes, problem_details
+from app.core.metrics import (
+    CONTENT_TYPE_LATEST,
+    ERRORS,
+    IN_FLIGHT,
+    REQUEST_SECONDS,
+    refresh_gauges,
+    render_metrics,
+    server_timing_header,
+    start_request_timings,
+)
 from app.api.v1.router import router as v1_router
-from app.services.ocr_engine import PaddleOcrEngine
+from app.api.v1.uploads import UploadLimitMiddleware, UploadTooLarge
+from app.services.admission import create_admission_controller
+from app.services.engine_loader import create_engine_loader
+from app.services.image_fetch import close_http_client, http_client_stats, init_http_client
+from app.services.jobs import create_job_manager
+from app.services.near_cache import create_near_cache
+from app.services.ocr_engine import create_ocr_engine
+from app.services.ocr_registry import create_engine_registry
+from app.services.ocr_runner import create_result_cache
+from app.services.ocr_triage import triage_stats
 
 
 PROBLEM_JSON = "application/problem+json"
@@ -24,23 +44,23 @@ def problem_response(
     title: str,
     detail: str,
     errors=None,
+    headers=None,
 ):
-    trace_id = get_trace_id()
-    body = {
-        "type": f"{settings.problem_base_url}/{code.lower()}",
-        "title": title,
-        "status": status,
-        "detail": detail,
-        "instance": request.url.path,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "traceId": trace_id,
-        "code": code,
-        "errors": errors or [],
-    }
+    body = problem_details(
+        request.url.path,
+        status,
+        code,
+        title,
+        detail,
+        get_trace_id(),
+        errors=errors,
+    )
+    ERRORS.labels(code).inc()
     return JSONResponse(
         status_code=status,
         content=body,
         media_type=PROBLEM_JSON,
+        headers=headers,
     )
 
 
@@ -55,19 +75,71 @@ class TraceIdMiddleware(BaseHTTPMiddleware):
         return response
 
 
+class ServerTimingMiddleware(BaseHTTPMiddleware):
+    """Latencia por request (Prometheus) + header Server-Timing con el desglose por etapa."""
+
+    async def dispatch(self, request: Request, call_next):
+        timings = start_request_timings()
+        IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - t0
+            route = request.scope.get("route")
+            REQUEST_SECONDS.labels(
+                request.method, getattr(route, "path", "unmatched"), str(status)
+            ).observe(elapsed)
+
+        response.headers["Server-Timing"] = server_timing_header(timings, elapsed * 1000.0)
+        return response
+
+
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
+    default_response_class=FastJSONResponse,
 )
 
+app.add_middleware(UploadLimitMiddleware)
+app.add_middleware(ServerTimingMiddleware)
 app.add_middleware(TraceIdMiddleware)
 app.include_router(v1_router)
 
 
 @app.on_event("startup")
-def startup():
-    app.state.ocr_engine = PaddleOcrEngine()
-    app.state.ready = True
+async def startup():
+    # El engine se carga y calienta en background: el servidor arranca enseguida y /ready dice cuándo.
+    app.state.ready = False
+    app.state.engine_loader = create_engine_loader(create_ocr_engine)
+    app.state.engine_loader.start(app.state)
+    app.state.engine_registry = create_engine_registry(app.state)
+    app.state.result_cache = create_result_cache()
+    app.state.near_cache = create_near_cache(app.state.result_cache)
+    app.state.admission = create_admission_controller()
+    init_http_client()
+    app.state.job_manager = create_job_manager(app.state)
+    await app.state.job_manager.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.ready = False
+    engine_loader = getattr(app.state, "engine_loader", None)
+    if engine_loader is not None:
+        await engine_loader.stop()
+    job_manager = getattr(app.state, "job_manager", None)
+    if job_manager is not None:
+        await job_manager.stop()
+        job_manager.store.close()
+    await close_http_client()
+    for name in ("engine_registry", "ocr_engine", "result_cache"):
+        close = getattr(getattr(app.state, name, None), "close", None)
+        if callable(close):
+            close()
 
 
 # --------
@@ -98,15 +170,62 @@ def info():
     }
 
 
+def _startup_status() -> str:
+    engine_loader = getattr(app.state, "engine_loader", None)
+    return engine_loader.status if engine_loader is not None else "unknown"
+
+
 @app.get("/health")
 def health():
     return {
         "ok": True,
         "ready": bool(getattr(app.state, "ready", False)),
+        "startup": _startup_status(),
         "traceId": get_trace_id(),
     }
 
 
+@app.get("/ready")
+def ready():
+    # Readiness probe: 503 hasta que el engine esté cargado y caliente (/health sigue siendo liveness).
+    is_ready = bool(getattr(app.state, "ready", False))
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "startup": _startup_status(), "traceId": get_trace_id()},
+    )
+
+
+def _component_stats() -> dict:
+    out = {}
+    for section, name in (
+        ("engine", "ocr_engine"),
+        ("cache", "result_cache"),
+        ("near_cache", "near_cache"),
+        ("admission", "admission"),
+        ("jobs", "job_manager"),
+        ("startup", "engine_loader"),
+        ("languages", "engine_registry"),
+    ):
+        component_stats = getattr(getattr(app.state, name, None), "stats", None)
+        out[section] = component_stats() if callable(component_stats) else None
+    return out
+
+
+@app.get("/stats")
+def stats():
+    out = _component_stats()
+    out["fetch"] = http_client_stats()
+    out["triage"] = triage_stats()
+    out["traceId"] = get_trace_id()
+    return out
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    refresh_gauges(_component_stats())
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 # ------------------
 # Exception handlers
 # ------------------
@@ -119,6 +238,19 @@ async def app_exception_handler(request: Request, exc: AppException):
         exc.code,
         exc.title,
         exc.detail,
+        headers=exc.headers,
+    )
+
+
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large_handler(request: Request, exc: UploadTooLarge):
+    return problem_response(
+        request,
+        413,
+        ErrorCodes.OCR_TOO_LARGE_413,
+        "Payload too large",
+        exc.detail,
+        headers={"Connection": "close"},
     )
 
 
@@ -6,17 +6,49 @@ from typing import Any, Dict, List, Optional
 
 class OcrBlock(BaseModel):
     text: str
-    confidence: float
+    confidence: Optional[float] = None  # None si no se corrió reconocimiento (det-only)
     box: List[List[int]]
 
 
+class OcrLine(BaseModel):
+    text: str
+    box: List[int]  # x0, y0, x1, y1
+    blocks: List[int]  # índices en `blocks`, de izquierda a derecha
+
+
+class OcrParagraph(BaseModel):
+    text: str
+    box: List[int]
+    lines: List[int]  # índices en `lines`
+
+
 class OcrData(BaseModel):
     text: str
     blocks: List[OcrBlock]
+    lines: Optional[List[OcrLine]] = None  # solo con ?layout=true, en orden de lectura
+    paragraphs: Optional[List[OcrParagraph]] = None
+    triage: Optional[Dict[str, Any]] = None  # veredicto del triage previo a la inferencia, si corrió
     preprocess: Optional[Dict[str, Any]] = None
+    cache: Optional[Dict[str, Any]] = None
 
 
 class OcrResponse(BaseModel):
     ok: bool
     traceId: str
-    data: OcrData
\ No newline at end of file
+    data: OcrData
+
+
+class JobInfo(BaseModel):
+    jobId: str
+    status: str
+    createdAt: float
+    updatedAt: float
+    expiresAt: float
+    statusUrl: str
+    resultUrl: str
+
+
+class JobResponse(BaseModel):
+    ok: bool
+    traceId: str
+    data: JobInfo
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+import asyncio
+import math
+import time
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+
+Disconnected = Callable[[], Awaitable[bool]]
+
+# Cada cuánto se revisa si el cliente sigue conectado mientras espera un lugar.
+_POLL_SECONDS = 0.1
+
+
+def deadline_exceeded() -> AppException:
+    return AppException(
+        504,
+        ErrorCodes.OCR_TIMEOUT_504,
+        "Deadline exceeded",
+        "Se alcanzó el deadline del request antes de iniciar el OCR",
+    )
+
+
+def client_closed() -> AppException:
+    return AppException(
+        499,
+        ErrorCodes.OCR_CLIENT_CLOSED_499,
+        "Client closed request",
+        "El cliente se desconectó antes de iniciar el OCR",
+    )
+
+
+class AdmissionController:
+    """
+    Limita los requests OCR en ejecución a `limit`; los demás esperan en una cola acotada (FIFO).
+    Con la cola llena se rechaza al instante (429); si la espera supera `queue_timeout` se responde 503,
+    si vence el deadline del request 504, y si el cliente se desconecta el lugar se libera sin ejecutar.
+    """
+
+    def __init__(self, *, limit: int, queue_size: int, queue_timeout: float) -> None:
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+
+        self._limit = limit
+        self._queue_size = queue_size
+        self._queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: "Deque[asyncio.Future[None]]" = deque()
+        self._durations: Deque[float] = deque(maxlen=100)
+        self._stats = {"admitted": 0, "rejected": 0, "timed_out": 0, "expired": 0, "disconnected": 0}
+
+    def retry_after_seconds(self) -> int:
+        avg = sum(self._durations) / len(self._durations) if self._durations else 1.0
+        return max(1, math.ceil((len(self._waiters) + 1) * avg / self._limit))
+
+    def _busy(self, status: int, code: str, title: str, detail: str) -> AppException:
+        return AppException(status, code, title, detail, headers={"Retry-After": str(self.retry_after_seconds())})
+
+    async def _acquire(self, deadline: Optional[float], is_disconnected: Optional[Disconnected]) -> None:
+        if self._active < self._limit and not self._waiters:
+            self._active += 1
+            return
+
+        if len(self._waiters) >= self._queue_size:
+            self._stats["rejected"] += 1
+            raise self._busy(
+                429,
+                ErrorCodes.OCR_QUEUE_FULL_429,
+                "Too many requests",
+                "Demasiados requests OCR en espera, reintenta más tarde",
+            )
+
+        fut: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        give_up = time.monotonic() + self._queue_timeout
+        try:
+            while not fut.done():
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    self._stats["expired"] += 1
+                    raise deadline_exceeded()
+                if now >= give_up:
+                    self._stats["timed_out"] += 1
+                    raise self._busy(
+                        503,
+                        ErrorCodes.OCR_BUSY_503,
+                        "Service unavailable",
+                        "No hay capacidad OCR disponible, reintenta más tarde",
+                    )
+
+                limit = min(give_up, deadline) if deadline is not None else give_up
+                await asyncio.wait({fut}, timeout=min(limit - now, _POLL_SECONDS))
+                if not fut.done() and is_disconnected is not None and await is_disconnected():
+                    self._stats["disconnected"] += 1
+                    raise client_closed()
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                # El lugar ya nos fue cedido: se pasa al siguiente en la cola.
+                self._release()
+            else:
+                fut.cancel()
+                self._waiters.remove(fut)
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        *,
+        deadline: Optional[float] = None,
+        is_disconnected: Optional[Disconnected] = None,
+    ) -> AsyncIterator[None]:
+        await self._acquire(deadline, is_disconnected)
+        self._stats["admitted"] += 1
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._durations.append(time.perf_counter() - t0)
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "limit": self._limit,
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "queue_size": self._queue_size,
+        }
+
+
+def create_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        limit=settings.ocr_max_concurrency or 2 * max(1, settings.ocr_pool_size),
+        queue_size=settings.ocr_admission_queue_size,
+        queue_timeout=settings.ocr_admission_timeout_seconds,
+    )
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import ipaddress
+import socket
+import time
+
+Lookup = Callable[[str], Awaitable[List[str]]]
+
+
+class ResolveError(Exception):
+    pass
+
+
+async def _system_lookup(host: str) -> List[str]:
+    # loop.getaddrinfo corre en el executor: un resolver lento no congela el event loop.
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    ips: List[str] = []
+    for _family, _type, _proto, _canon, sockaddr in infos:
+        if sockaddr[0] not in ips:
+            ips.append(sockaddr[0])
+    return ips
+
+
+class CachingResolver:
+    """
+    Resolver asíncrono con cache TTL (positivo y negativo). Lookups concurrentes
+    del mismo host comparten una única consulta.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float,
+        negative_ttl: float,
+        max_entries: int = 4096,
+        lookup: Optional[Lookup] = None,
+    ) -> None:
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._max_entries = max_entries
+        self._lookup = lookup or _system_lookup
+        # host -> (expira, ips | None, error)
+        self._cache: "OrderedDict[str, Tuple[float, Optional[List[str]], str]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Future[List[str]]"] = {}
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "failures": 0}
+
+    async def resolve(self, host: str) -> List[str]:
+        try:
+            return [str(ipaddress.ip_address(host))]
+        except ValueError:
+            pass
+
+        now = time.monotonic()
+        entry = self._cache.get(host)
+        if entry is not None and entry[0] > now:
+            self._cache.move_to_end(host)
+            if entry[1] is None:
+                self._stats["negative_hits"] += 1
+                raise ResolveError(entry[2])
+            self._stats["hits"] += 1
+            return entry[1]
+
+        waiting = self._inflight.get(host)
+        if waiting is not None:
+            try:
+                return await asyncio.shield(waiting)
+            except asyncio.CancelledError:
+                if not waiting.cancelled():
+                    raise  # se canceló este request
+                # Se canceló el request dueño de la consulta (p.ej. cliente desconectado): se reintenta.
+                return await self.resolve(host)
+
+        self._stats["misses"] += 1
+        fut: "asyncio.Future[List[str]]" = asyncio.get_running_loop().create_future()
+        self._inflight[host] = fut
+        try:
+            ips = await self._lookup(host)
+            if not ips:
+                raise ResolveError(f"{host}: no addresses")
+        except Exception as e:
+            self._stats["failures"] += 1
+            err = e if isinstance(e, ResolveError) else ResolveError(f"{host}: {e}")
+            self._store(host, (time.monotonic() + self._negative_ttl, None, str(err)))
+            fut.set_exception(err)
+            fut.exception()  # evita "exception was never retrieved" si nadie más esperaba
+            raise err
+        else:
+            self._store(host, (time.monotonic() + self._ttl, ips, ""))
+            fut.set_result(ips)
+            return ips
+        finally:
+            if not fut.done():
+                fut.cancel()  # el dueño fue cancelado: despierta a los que esperaban (ver arriba)
+            self._inflight.pop(host, None)
+
+    def _store(self, host: str, entry: Tuple[float, Optional[List[str]], str]) -> None:
+        self._cache[host] = entry
+        self._cache.move_to_end(host)
+        while len(self._cache) > self._max_entries:
+            self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "entries": len(self._cache), "inflight": len(self._inflight)}
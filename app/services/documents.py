@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Any, Optional
+import struct
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+from app.services.image_decode import decode_image
+
+
+def detect_kind(data: bytes) -> str:
+    head = bytes(data[:8])
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"II*\x00") or head.startswith(b"MM\x00*"):
+        return "tiff"
+    return "image"
+
+
+def _unsupported(detail: str) -> AppException:
+    return AppException(415, ErrorCodes.OCR_UNSUPPORTED_415, "Unsupported media type", detail)
+
+
+def _check_page_pixels(index: int, w: int, h: int) -> None:
+    if settings.ocr_max_pixels and w * h > settings.ocr_max_pixels:
+        raise AppException(
+            413,
+            ErrorCodes.OCR_TOO_LARGE_413,
+            "Payload too large",
+            f"La página {index + 1} ({w}x{h}) excede el máximo de {settings.ocr_max_pixels} píxeles",
+        )
+
+
+def _tiff_page_count(data: bytes, limit: int) -> int:
+    """Cantidad de páginas (IFDs) de un TIFF leyendo solo los headers, hasta `limit`; 1 si no se puede leer."""
+    head = bytes(data[:8])
+    order = "<" if head.startswith(b"II") else ">"
+    if struct.unpack(order + "H", head[2:4])[0] != 42:  # BigTIFF u otra variante: no se cuenta
+        return 1
+    offset = struct.unpack(order + "I", head[4:8])[0]
+    count = 0
+    while offset and count < limit and offset + 2 <= len(data):
+        count += 1
+        (entries,) = struct.unpack(order + "H", bytes(data[offset : offset + 2]))
+        next_at = offset + 2 + 12 * entries
+        if next_at + 4 > len(data):
+            break
+        (offset,) = struct.unpack(order + "I", bytes(data[next_at : next_at + 4]))
+    return max(count, 1)
+
+
+def require_single_page(data: bytes) -> None:
+    """
+    /v1/ocr decodifica una sola imagen: un PDF o un TIFF de varias páginas se rechaza con 415 en vez de
+    devolver en silencio solo la primera página.
+    """
+    kind = detect_kind(data)
+    if kind == "pdf":
+        raise _unsupported("Los PDF se procesan con /v1/ocr/document")
+    if kind == "tiff":
+        if _tiff_page_count(data, limit=2) > 1:
+            raise _unsupported("El TIFF tiene varias páginas: usar /v1/ocr/document para procesarlas todas")
+
+
+class PageSource(ABC):
+    """
+    Documento multipágina que se rasteriza de a una página (`render(i)`), nunca entero.
+    No es thread-safe: las páginas se piden en secuencia (aunque cada una se procese en paralelo).
+    """
+
+    page_count: int
+
+    @abstractmethod
+    def render(self, index: int) -> np.ndarray:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class _SingleImage(PageSource):
+    def __init__(self, data: bytes) -> None:
+        self._data: Optional[bytes] = data
+        self.page_count = 1
+
+    def render(self, index: int) -> np.ndarray:
+        data, self._data = self._data, None
+        return decode_image(data)
+
+
+class _PdfPages(PageSource):
+    def __init__(self, data: bytes, dpi: int) -> None:
+        try:
+            import pymupdf
+        except ImportError:
+            raise _unsupported("Soporte PDF no disponible (falta el paquete pymupdf)")
+
+        try:
+            self._doc = pymupdf.open(stream=data, filetype="pdf")
+        except Exception:
+            raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", "PDF inválido")
+        self._dpi = dpi
+        self.page_count = self._doc.page_count
+
+    def render(self, index: int) -> np.ndarray:
+        page = self._doc.load_page(index)
+        # Tamaño del raster antes de generarlo: page.rect está en puntos (1/72").
+        zoom = self._dpi / 72.0
+        _check_page_pixels(index, int(round(page.rect.width * zoom)), int(round(page.rect.height * zoom)))
+        pix = page.get_pixmap(dpi=self._dpi, alpha=False)
+        rgb = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        if pix.n == 1:
+            return cv2.cvtColor(rgb, cv2.COLOR_GRAY2BGR)
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+    def close(self) -> None:
+        self._doc.close()
+
+
+class _TiffPages(PageSource):
+    def __init__(self, data: bytes) -> None:
+        try:
+            from PIL import Image
+        except ImportError:
+            raise _unsupported("Soporte TIFF multipágina no disponible (falta el paquete Pillow)")
+
+        try:
+            self._img: Any = Image.open(BytesIO(data))
+        except Exception:
+            raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", "TIFF inválido")
+        self.page_count = getattr(self._img, "n_frames", 1)
+
+    def render(self, index: int) -> np.ndarray:
+        self._img.seek(index)
+        w, h = self._img.size
+        _check_page_pixels(index, w, h)
+        rgb = np.asarray(self._img.convert("RGB"))
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+    def close(self) -> None:
+        self._img.close()
+
+
+def open_pages(data: bytes) -> PageSource:
+    kind = detect_kind(data)
+    if kind == "pdf":
+        src: PageSource = _PdfPages(data, settings.ocr_pdf_dpi)
+    elif kind == "tiff":
+        src = _TiffPages(data)
+    else:
+        src = _SingleImage(data)
+
+    if src.page_count > settings.ocr_max_pages:
+        src.close()
+        raise AppException(
+            413,
+            ErrorCodes.OCR_TOO_LARGE_413,
+            "Payload too large",
+            f"El documento excede {settings.ocr_max_pages} páginas",
+        )
+    return src
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+import cv2
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+from app.core.metrics import FIRST_REQUEST_SECONDS, READY, STARTUP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+WARMING = "warming"
+READY_STATUS = "ready"
+FAILED = "failed"
+
+_WARMUP_LINES = (
+    "FACTURA 0001-00012345  Total $ 1.234,56",
+    "Av. Siempre Viva 742 - CP 1406",
+    "Cantidad  Descripcion  Precio",
+    "2 x Cafe con leche      850,00",
+    "CUIT 30-71234567-8  IVA Resp. Inscripto",
+)
+
+
+def parse_sizes(raw: str) -> List[Tuple[int, int]]:
+    """"800x600,1240x1754" -> [(800, 600), (1240, 1754)]."""
+    sizes = []
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        w, _, h = part.strip().lower().partition("x")
+        sizes.append((int(w), int(h)))
+    return sizes
+
+
+def warmup_images(sizes: List[Tuple[int, int]]) -> List[np.ndarray]:
+    """Documentos sintéticos (texto negro sobre blanco) de cada tamaño: ejercitan det, cls y rec."""
+    images = []
+    for w, h in sizes:
+        img = np.full((h, w, 3), 255, dtype=np.uint8)
+        scale = max(0.5, w / 1600)
+        step = int(48 * scale)
+        for i, y in enumerate(range(step, h - step // 2, step)):
+            cv2.putText(
+                img,
+                _WARMUP_LINES[i % len(_WARMUP_LINES)],
+                (step // 2, y),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                scale,
+                (0, 0, 0),
+                max(1, int(2 * scale)),
+                cv2.LINE_AA,
+            )
+        images.append(img)
+    return images
+
+
+class EngineLoader:
+    """
+    Construye el engine OCR en background y lo calienta antes de marcar el servicio como listo.
+    El servidor HTTP contesta /health y /ready desde el primer momento; los requests OCR que llegan
+    antes esperan al engine (acotado) en vez de pagar ellos el arranque en frío.
+    """
+
+    def __init__(self, factory: Callable[[], Any], *, warmup_sizes: List[Tuple[int, int]]) -> None:
+        self._factory = factory
+        self._warmup_sizes = warmup_sizes
+        self._done = asyncio.Event()
+        self._status = PENDING
+        self._error: Optional[str] = None
+        self._phases: Dict[str, float] = {}
+        self._first_request: Optional[float] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    def start(self, state: Any) -> None:
+        self._task = asyncio.create_task(self._load(state))
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        READY.set(0)
+
+    def _phase(self, name: str, t0: float) -> None:
+        self._phases[name] = time.perf_counter() - t0
+        STARTUP_SECONDS.labels(name).set(self._phases[name])
+
+    async def _load(self, state: Any) -> None:
+        t0 = time.perf_counter()
+        try:
+            self._status = LOADING
+            engine = await run_in_threadpool(self._factory)
+            self._phase("load", t0)
+            state.ocr_engine = engine
+
+            warmup = getattr(engine, "warmup", None)
+            if self._warmup_sizes and callable(warmup):
+                self._status = WARMING
+                t1 = time.perf_counter()
+                await run_in_threadpool(warmup, warmup_images(self._warmup_sizes))
+                self._phase("warmup", t1)
+        except Exception as e:
+            logger.exception("OCR engine failed to start")
+            self._status = FAILED
+            self._error = repr(e)
+            self._done.set()  # quienes esperan reciben 503 en vez de colgarse
+            return
+
+        self._phase("total", t0)
+        self._status = READY_STATUS
+        state.ready = True
+        READY.set(1)
+        self._done.set()
+        logger.info("OCR engine ready in %.1fs", self._phases["total"])
+
+    async def wait(self, timeout: float) -> None:
+        if not self._done.is_set():
+            try:
+                await asyncio.wait_for(self._done.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise AppException(
+                    503,
+                    ErrorCodes.OCR_BUSY_503,
+                    "Service unavailable",
+                    "El motor OCR se está iniciando, reintenta más tarde",
+                    headers={"Retry-After": "5"},
+                )
+        if self._status == FAILED:
+            raise AppException(
+                503,
+                ErrorCodes.OCR_BUSY_503,
+                "Service unavailable",
+                "El motor OCR no pudo iniciarse",
+            )
+
+    def record_request(self, seconds: float) -> None:
+        if self._first_request is None and self._status == READY_STATUS:
+            self._first_request = seconds
+            FIRST_REQUEST_SECONDS.set(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "status": self._status,
+            "error": self._error,
+            "seconds": dict(self._phases),
+            "first_request_seconds": self._first_request,
+            "warmup_sizes": [f"{w}x{h}" for w, h in self._warmup_sizes],
+        }
+
+
+def create_engine_loader(factory: Callable[[], Any]) -> EngineLoader:
+    sizes = parse_sizes(settings.ocr_warmup_sizes) if settings.ocr_warmup else []
+    return EngineLoader(factory, warmup_sizes=sizes)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+import struct
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+from app.core.metrics import IMAGE_PIXELS, stage
+
+# Factor -> modo de decodificación reducida (libjpeg escala en la IDCT, sin decodificar a tamaño completo).
+_REDUCED_MODES = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Marcadores SOF (tamaño de frame) de JPEG; C4/C8/CC no son SOF.
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    i = 2
+    n = len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        (length,) = struct.unpack(">H", data[i + 2 : i + 4])
+        if marker in _JPEG_SOF:
+            h, w = struct.unpack(">HH", data[i + 5 : i + 9])
+            return w, h
+        i += 2 + length
+    return None
+
+
+def _webp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        w, h = struct.unpack("<HH", data[26:30])
+        return w & 0x3FFF, h & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    return None
+
+
+def read_image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(ancho, alto) leído del header, sin decodificar píxeles. None si el formato no se reconoce."""
+    head = bytes(data[:32])
+    if head.startswith(b"\xff\xd8"):
+        return _jpeg_size(data)
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and len(head) >= 24:
+        return struct.unpack(">II", head[16:24])
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return _webp_size(data)
+    if head.startswith(b"BM") and len(head) >= 26:
+        w, h = struct.unpack("<ii", head[18:26])
+        return abs(w), abs(h)
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        # Image.open es perezoso: solo lee el header.
+        with Image.open(BytesIO(data)) as im:
+            return im.size
+    except Exception:
+        return None
+
+
+def _reduction_for(size: Tuple[int, int], keep_side: int) -> int:
+    long_side = max(size)
+    for factor, _mode in _REDUCED_MODES:
+        if long_side // factor >= keep_side:
+            return factor
+    return 1
+
+
+def decode_image_for_ocr(data: bytes, *, keep_side: Optional[int] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Decodifica validando antes el tamaño declarado en el header contra OCR_MAX_PIXELS.
+    Con `keep_side`, un JPEG cuyo lado mayor lo excede varias veces se decodifica reducido
+    (1/2, 1/4 o 1/8) sin bajar de ese lado. Devuelve la imagen y {"reduction", "source_shape"}.
+    """
+    size = read_image_size(data)
+    factor = 1
+    if size is not None:
+        if keep_side and bytes(data[:2]) == b"\xff\xd8":
+            factor = _reduction_for(size, keep_side)
+
+        w, h = size
+        decoded_pixels = -(-w // factor) * -(-h // factor)
+        if settings.ocr_max_pixels and decoded_pixels > settings.ocr_max_pixels:
+            raise AppException(
+                413,
+                ErrorCodes.OCR_TOO_LARGE_413,
+                "Payload too large",
+                f"La imagen ({w}x{h}) excede el máximo de {settings.ocr_max_pixels} píxeles",
+            )
+
+    mode = dict(_REDUCED_MODES).get(factor, cv2.IMREAD_COLOR)
+    with stage("decode"):
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), mode)
+    if img is None:
+        raise ValueError("Invalid image bytes (decode failed)")
+    IMAGE_PIXELS.observe(img.shape[0] * img.shape[1])
+
+    source = {"h": size[1], "w": size[0]} if size is not None else {"h": img.shape[0], "w": img.shape[1]}
+    return img, {"reduction": factor, "source_shape": source}
+
+
+def with_decode_meta(out: Dict[str, Any], decode_meta: Dict[str, Any]) -> Dict[str, Any]:
+    # Solo si hubo reducción: `preprocess.original_shape` pasa a ser la imagen decodificada, no el archivo.
+    if out.get("preprocess") is not None and decode_meta["reduction"] > 1:
+        out["preprocess"]["decode"] = decode_meta
+    return out
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    return decode_image_for_ocr(data)[0]
@@ -1,37 +1,105 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 from urllib.parse import urlparse
-import socket
+import asyncio
 import ipaddress
+import logging
 
+import httpcore
 import httpx
 
 from app.core.config import settings
 from app.core.errors import AppException, ErrorCodes
+from app.core.metrics import BYTES, stage
+from app.services.dns_resolver import CachingResolver, ResolveError
 
+logger = logging.getLogger(__name__)
 
-def _is_private_host(hostname: str) -> bool:
+# Cliente compartido (pool de conexiones keep-alive) para toda la app.
+_client: Optional[httpx.AsyncClient] = None
+_http2_enabled = False
+_host_slots: Dict[str, "_HostSlot"] = {}
+_fetch_stats: Dict[str, int] = {"requests": 0, "connections_opened": 0}
+
+_resolver = CachingResolver(
+    ttl=settings.fetch_dns_ttl_seconds,
+    negative_ttl=settings.fetch_dns_negative_ttl_seconds,
+)
+
+
+def _is_private_ip(ip: str) -> bool:
+    ip_obj = ipaddress.ip_address(ip)
+    return (
+        ip_obj.is_private
+        or ip_obj.is_loopback
+        or ip_obj.is_link_local
+        or ip_obj.is_reserved
+        or ip_obj.is_multicast
+    )
+
+
+async def _resolve_allowed(hostname: str) -> List[str]:
     """
     Mitigación SSRF básica: bloquea hosts que resuelven a IPs privadas/loopback/link-local.
+    Devuelve las IPs validadas, que son las que se usan luego para conectar (sin segunda resolución).
     En entornos internos puedes habilitar ALLOW_PRIVATE_NETWORKS=true.
     """
     try:
-        infos = socket.getaddrinfo(hostname, None)
-        for family, *_rest, sockaddr in infos:
-            ip = sockaddr[0]
-            ip_obj = ipaddress.ip_address(ip)
-            if (
-                ip_obj.is_private
-                or ip_obj.is_loopback
-                or ip_obj.is_link_local
-                or ip_obj.is_reserved
-                or ip_obj.is_multicast
-            ):
-                return True
-        return False
-    except Exception:
-        return True
+        ips = await _resolver.resolve(hostname)
+    except ResolveError:
+        raise AppException(400, ErrorCodes.OCR_FETCH_400, "Invalid URL", f"No se pudo resolver el host: {hostname}")
+
+    if not settings.allow_private_networks and any(_is_private_ip(ip) for ip in ips):
+        raise AppException(
+            400,
+            ErrorCodes.OCR_FETCH_400,
+            "Invalid URL",
+            "El host resuelve a una red privada/loopback (bloqueado por seguridad)",
+        )
+    return list(ips)
+
+
+class _PinnedNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    Backend de red de httpcore que conecta a las IPs validadas por `_resolve_allowed`, en orden: si la
+    primera no responde (p.ej. AAAA en un pod solo IPv4) prueba la siguiente, como haría httpx.
+    Aplica también a los redirects: cada conexión nueva pasa por el check SSRF.
+    TLS/SNI siguen usando el hostname original.
+    """
+
+    def __init__(self) -> None:
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        error: Optional[Exception] = None
+        for ip in await _resolve_allowed(host):
+            try:
+                return await self._backend.connect_tcp(
+                    ip, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                error = exc
+        raise error or httpcore.ConnectError(f"Sin direcciones para {host}")
+
+    async def connect_unix_socket(
+        self,
+        path: str,
+        timeout: Optional[float] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
 
 
 def _default_headers(url: str) -> Dict[str, str]:
@@ -52,7 +120,126 @@ def _default_headers(url: str) -> Dict[str, str]:
     }
 
 
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _pin_transport(transport: httpx.AsyncHTTPTransport, *, http2: bool, limits: httpx.Limits) -> None:
+    """
+    httpx 0.27 no acepta `network_backend` en AsyncHTTPTransport: se reemplaza su pool de httpcore por uno
+    igual con el backend "pinned". Depende de `_pool` (httpx fijado en requirements; test_image_fetch falla
+    si el atributo desaparece o cambia de tipo).
+    """
+    if not isinstance(getattr(transport, "_pool", None), httpcore.AsyncConnectionPool):
+        raise RuntimeError("httpx.AsyncHTTPTransport no tiene el pool de httpcore esperado; revisar la versión de httpx")
+    transport._pool = httpcore.AsyncConnectionPool(
+        ssl_context=httpx.create_ssl_context(),
+        max_connections=limits.max_connections,
+        max_keepalive_connections=limits.max_keepalive_connections,
+        keepalive_expiry=limits.keepalive_expiry,
+        http1=True,
+        http2=http2,
+        network_backend=_PinnedNetworkBackend(),
+    )
+
+
+def init_http_client() -> httpx.AsyncClient:
+    global _client, _http2_enabled
+    if _client is None:
+        http2 = settings.fetch_http2
+        if http2 and not _http2_available():
+            logger.warning("FETCH_HTTP2=true but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+
+        limits = httpx.Limits(
+            max_connections=settings.fetch_max_connections,
+            max_keepalive_connections=settings.fetch_max_keepalive,
+            keepalive_expiry=settings.fetch_keepalive_seconds,
+        )
+        transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+        _pin_transport(transport, http2=http2, limits=limits)
+
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.fetch_timeout_seconds, connect=10.0),
+            transport=transport,
+            follow_redirects=True,
+            max_redirects=settings.fetch_max_redirects,
+        )
+        _http2_enabled = http2
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
+
+
+class _HostSlot:
+    __slots__ = ("semaphore", "users", "inflight")
+
+    def __init__(self) -> None:
+        self.semaphore = asyncio.Semaphore(settings.fetch_max_per_host)
+        self.users = 0  # esperando + descargando
+        self.inflight = 0
+
+
+@asynccontextmanager
+async def _host_slot(host: str) -> AsyncIterator[None]:
+    """
+    Limita las descargas concurrentes a un mismo host. Los hosts vienen del cliente: la entrada
+    se borra cuando nadie la usa, así el dict no crece con cada host distinto.
+    """
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = _HostSlot()
+    slot.users += 1
+    try:
+        async with slot.semaphore:
+            slot.inflight += 1
+            try:
+                yield
+            finally:
+                slot.inflight -= 1
+    finally:
+        slot.users -= 1
+        if not slot.users and _host_slots.get(host) is slot:
+            del _host_slots[host]
+
+
+async def _trace(event_name: str, info: Dict[str, Any]) -> None:
+    # httpcore solo abre TCP cuando no hay conexión keep-alive reutilizable.
+    if event_name == "connection.connect_tcp.complete":
+        _fetch_stats["connections_opened"] += 1
+
+
+def http_client_stats() -> Dict[str, Any]:
+    requests = _fetch_stats["requests"]
+    opened = _fetch_stats["connections_opened"]
+    return {
+        "requests": requests,
+        "connections_opened": opened,
+        "connection_reuse_ratio": (1.0 - opened / requests) if requests else 0.0,
+        "http2": _http2_enabled,
+        "inflight_by_host": {host: slot.inflight for host, slot in _host_slots.items() if slot.inflight},
+        "dns": _resolver.stats(),
+    }
+
+
 async def fetch_image_bytes(image_url: str, extra_headers: Optional[Dict[str, str]] = None) -> bytes:
+    with stage("fetch"):
+        data = await _fetch_image_bytes(image_url, extra_headers)
+    BYTES.labels("downloaded").inc(len(data))
+    return data
+
+
+async def _fetch_image_bytes(image_url: str, extra_headers: Optional[Dict[str, str]]) -> bytes:
     if not image_url or not image_url.strip():
         raise AppException(400, ErrorCodes.OCR_FETCH_400, "Invalid request", "image_url es requerido")
 
@@ -65,71 +252,21 @@ async def fetch_image_bytes(image_url: str, extra_headers: Optional[Dict[str, st
     if not parsed.netloc:
         raise AppException(400, ErrorCodes.OCR_FETCH_400, "Invalid URL", "URL inválida (sin host)")
 
-    if not settings.allow_private_networks and _is_private_host(parsed.hostname or ""):
-        raise AppException(
-            400,
-            ErrorCodes.OCR_FETCH_400,
-            "Invalid URL",
-            "El host resuelve a una red privada/loopback (bloqueado por seguridad)",
-        )
+    # Falla rápido con 400; el mismo lookup cacheado es el que usa luego la conexión.
+    await _resolve_allowed(parsed.hostname or "")
 
     headers = _default_headers(url)
     if extra_headers:
         # Permite que el caller pase cookies/token/referer custom si una web es especial.
         headers.update({str(k): str(v) for k, v in extra_headers.items()})
 
-    timeout = httpx.Timeout(settings.fetch_timeout_seconds, connect=10.0)
-    limits = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+    client = init_http_client()
 
+    host = parsed.hostname or ""
     try:
-        async with httpx.AsyncClient(
-            timeout=timeout,
-            follow_redirects=True,
-            limits=limits,
-            max_redirects=settings.fetch_max_redirects,
-        ) as client:
-            async with client.stream("GET", url, headers=headers) as resp:
-                if resp.status_code >= 400:
-                    raise AppException(
-                        502,
-                        ErrorCodes.OCR_FETCH_502,
-                        "Upstream fetch failed",
-                        f"No se pudo descargar la imagen (status {resp.status_code})",
-                    )
-
-                ctype = (resp.headers.get("content-type") or "").lower()
-                if "image" not in ctype:
-                    raise AppException(
-                        400,
-                        ErrorCodes.OCR_FETCH_400,
-                        "Invalid content",
-                        "La URL no parece apuntar a una imagen (content-type no es image/*)",
-                    )
-
-                # Si content-length ya excede, corta rápido
-                clen = resp.headers.get("content-length")
-                if clen and clen.isdigit() and int(clen) > settings.max_bytes:
-                    raise AppException(
-                        413,
-                        ErrorCodes.OCR_TOO_LARGE_413,
-                        "Payload too large",
-                        f"La imagen excede {settings.max_file_mb}MB",
-                    )
-
-                chunks = []
-                total = 0
-                async for chunk in resp.aiter_bytes(chunk_size=64 * 1024):
-                    total += len(chunk)
-                    if total > settings.max_bytes:
-                        raise AppException(
-                            413,
-                            ErrorCodes.OCR_TOO_LARGE_413,
-                            "Payload too large",
-                            f"La imagen excede {settings.max_file_mb}MB",
-                        )
-                    chunks.append(chunk)
-
-                return b"".join(chunks)
+        async with _host_slot(host):
+            _fetch_stats["requests"] += 1
+            return await _download(client, url, headers)
 
     except AppException:
         raise
@@ -139,4 +276,49 @@ async def fetch_image_bytes(image_url: str, extra_headers: Optional[Dict[str, st
             ErrorCodes.OCR_FETCH_502,
             "Upstream fetch failed",
             f"Error descargando la imagen: {str(e)}",
-        )
\ No newline at end of file
+        )
+
+
+async def _download(client: httpx.AsyncClient, url: str, headers: Dict[str, str]) -> bytes:
+    async with client.stream("GET", url, headers=headers, extensions={"trace": _trace}) as resp:
+        if resp.status_code >= 400:
+            raise AppException(
+                502,
+                ErrorCodes.OCR_FETCH_502,
+                "Upstream fetch failed",
+                f"No se pudo descargar la imagen (status {resp.status_code})",
+            )
+
+        ctype = (resp.headers.get("content-type") or "").lower()
+        if "image" not in ctype:
+            raise AppException(
+                400,
+                ErrorCodes.OCR_FETCH_400,
+                "Invalid content",
+                "La URL no parece apuntar a una imagen (content-type no es image/*)",
+            )
+
+        # Si content-length ya excede, corta rápido
+        clen = resp.headers.get("content-length")
+        if clen and clen.isdigit() and int(clen) > settings.max_bytes:
+            raise AppException(
+                413,
+                ErrorCodes.OCR_TOO_LARGE_413,
+                "Payload too large",
+                f"La imagen excede {settings.max_file_mb}MB",
+            )
+
+        chunks = []
+        total = 0
+        async for chunk in resp.aiter_bytes(chunk_size=64 * 1024):
+            total += len(chunk)
+            if total > settings.max_bytes:
+                raise AppException(
+                    413,
+                    ErrorCodes.OCR_TOO_LARGE_413,
+                    "Payload too large",
+                    f"La imagen excede {settings.max_file_mb}MB",
+                )
+            chunks.append(chunk)
+
+        return b"".join(chunks)
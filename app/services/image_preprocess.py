@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
+import threading
 
 import cv2
 import numpy as np
 
+from app.core.config import settings
+
 
 @dataclass(frozen=True)
 class PreprocessConfig:
@@ -18,34 +22,50 @@ class PreprocessConfig:
     pad_max_px: int
 
 
+def default_preprocess_config() -> PreprocessConfig:
+    return PreprocessConfig(
+        target_min_side=settings.ocr_target_min_side,
+        max_side=settings.ocr_max_side,
+        pad_lr_ratio=settings.ocr_pad_lr_ratio,
+        pad_top_ratio=settings.ocr_pad_top_ratio,
+        pad_bottom_ratio=settings.ocr_pad_bottom_ratio,
+        pad_min_px=settings.ocr_pad_min_px,
+        pad_max_px=settings.ocr_pad_max_px,
+    )
+
+
 def _clamp(v: int, lo: int, hi: int) -> int:
     return max(lo, min(hi, v))
 
 
-def preprocess_for_ocr(img_bgr: np.ndarray, cfg: PreprocessConfig) -> Tuple[np.ndarray, Dict]:
-    if img_bgr is None or img_bgr.size == 0:
-        raise ValueError("Empty image")
+class _CanvasPool(threading.local):
+    """Lienzos reutilizables por thread, indexados por shape (LRU chico: los tamaños de salida se repiten)."""
 
-    if img_bgr.dtype != np.uint8:
-        img_bgr = img_bgr.astype(np.uint8)
+    max_shapes = 4
 
-    h, w = img_bgr.shape[:2]
+    def __init__(self) -> None:
+        self.buffers: "OrderedDict[Tuple[int, ...], np.ndarray]" = OrderedDict()
+
+    def get(self, shape: Tuple[int, ...]) -> np.ndarray:
+        buf = self.buffers.pop(shape, None)
+        if buf is None:
+            buf = np.empty(shape, dtype=np.uint8)
+        self.buffers[shape] = buf
+        while len(self.buffers) > self.max_shapes:
+            self.buffers.popitem(last=False)
+        return buf
+
+
+_canvases = _CanvasPool()
 
+
+def _geometry(h: int, w: int, cfg: PreprocessConfig) -> Tuple[Dict[str, Any], Tuple[int, int, int, int]]:
+    # meta + rectángulo (x0, y0, ancho, alto) donde va el contenido dentro del lienzo final.
     pad_lr = _clamp(int(w * cfg.pad_lr_ratio), cfg.pad_min_px, cfg.pad_max_px)
     pad_top = _clamp(int(h * cfg.pad_top_ratio), cfg.pad_min_px, cfg.pad_max_px)
     pad_bottom = _clamp(int(h * cfg.pad_bottom_ratio), cfg.pad_min_px, cfg.pad_max_px)
 
-    padded = cv2.copyMakeBorder(
-        img_bgr,
-        top=pad_top,
-        bottom=pad_bottom,
-        left=pad_lr,
-        right=pad_lr,
-        borderType=cv2.BORDER_CONSTANT,
-        value=(255, 255, 255),
-    )
-
-    ph, pw = padded.shape[:2]
+    ph, pw = h + pad_top + pad_bottom, w + 2 * pad_lr
     min_side = min(ph, pw)
     max_side = max(ph, pw)
 
@@ -56,18 +76,94 @@ def preprocess_for_ocr(img_bgr: np.ndarray, cfg: PreprocessConfig) -> Tuple[np.n
         scale = cfg.max_side / float(max_side)
 
     if abs(scale - 1.0) >= 0.03:
-        interp = cv2.INTER_CUBIC if scale > 1.0 else cv2.INTER_AREA
-        new_w = int(round(pw * scale))
-        new_h = int(round(ph * scale))
-        out = cv2.resize(padded, (new_w, new_h), interpolation=interp)
+        out_h, out_w = int(round(ph * scale)), int(round(pw * scale))
+        x0, y0 = int(round(pad_lr * scale)), int(round(pad_top * scale))
+        cw = max(1, min(int(round(w * scale)), out_w - x0))
+        ch = max(1, min(int(round(h * scale)), out_h - y0))
     else:
-        out = padded
+        out_h, out_w = ph, pw
+        x0, y0, cw, ch = pad_lr, pad_top, w, h
 
     meta = {
         "padding": {"left": pad_lr, "right": pad_lr, "top": pad_top, "bottom": pad_bottom},
         "scale": scale,
         "original_shape": {"h": h, "w": w},
         "padded_shape": {"h": ph, "w": pw},
-        "final_shape": {"h": out.shape[0], "w": out.shape[1]},
+        "final_shape": {"h": out_h, "w": out_w},
     }
-    return out, meta
\ No newline at end of file
+    return meta, (x0, y0, cw, ch)
+
+
+def preprocess_meta(h: int, w: int, cfg: PreprocessConfig) -> Dict[str, Any]:
+    """El `meta` que devolvería preprocess_for_ocr para una imagen h x w, sin tocar píxeles."""
+    return _geometry(h, w, cfg)[0]
+
+
+def preprocess_for_ocr(
+    img_bgr: np.ndarray,
+    cfg: PreprocessConfig,
+    *,
+    reuse_buffer: bool = False,
+) -> Tuple[np.ndarray, Dict]:
+    """
+    Padding blanco + resize en una sola pasada: solo se redimensiona el contenido, escrito directo
+    en un lienzo blanco del tamaño final (el padding nunca se interpola).
+    Con `reuse_buffer=True` el lienzo sale de un pool por thread: el array devuelto es válido
+    hasta la próxima llamada en el mismo thread.
+    """
+    if img_bgr is None or img_bgr.size == 0:
+        raise ValueError("Empty image")
+
+    if img_bgr.dtype != np.uint8:
+        img_bgr = img_bgr.astype(np.uint8)
+
+    h, w = img_bgr.shape[:2]
+    meta, (x0, y0, cw, ch) = _geometry(h, w, cfg)
+    out_h, out_w = meta["final_shape"]["h"], meta["final_shape"]["w"]
+
+    shape = (out_h, out_w) + img_bgr.shape[2:]
+    out = _canvases.get(shape) if reuse_buffer else np.empty(shape, dtype=np.uint8)
+
+    # Solo se pinta de blanco el borde; el área de contenido se escribe una vez.
+    out[:y0] = 255
+    out[y0 + ch :] = 255
+    out[y0 : y0 + ch, :x0] = 255
+    out[y0 : y0 + ch, x0 + cw :] = 255
+
+    content = out[y0 : y0 + ch, x0 : x0 + cw]
+    if (cw, ch) != (w, h):
+        interp = cv2.INTER_CUBIC if meta["scale"] > 1.0 else cv2.INTER_AREA
+        cv2.resize(img_bgr, (cw, ch), dst=content, interpolation=interp)
+    else:
+        np.copyto(content, img_bgr)
+    return out, meta
+
+
+def _axis_scales(meta: Dict[str, Any]) -> Tuple[float, float]:
+    # Escala efectiva por eje: con |scale - 1| < 0.03 no hay resize aunque meta["scale"] != 1.
+    padded, final = meta["padded_shape"], meta["final_shape"]
+    return final["w"] / float(padded["w"]), final["h"] / float(padded["h"])
+
+
+def to_processed(points: np.ndarray, meta: Optional[Dict[str, Any]]) -> np.ndarray:
+    """Puntos (..., 2) en coordenadas de la imagen original -> coordenadas de la imagen preprocesada."""
+    out = np.array(points, dtype=np.float32)
+    if not meta:
+        return out
+    sx, sy = _axis_scales(meta)
+    reduction = meta.get("decode", {}).get("reduction", 1)
+    out[..., 0] = (out[..., 0] / reduction + meta["padding"]["left"]) * sx
+    out[..., 1] = (out[..., 1] / reduction + meta["padding"]["top"]) * sy
+    return out
+
+
+def to_original(points: np.ndarray, meta: Optional[Dict[str, Any]]) -> np.ndarray:
+    """Inversa de `to_processed`: quita escala y padding (y la reducción de decodificación, si hubo)."""
+    out = np.array(points, dtype=np.float32)
+    if not meta:
+        return out
+    sx, sy = _axis_scales(meta)
+    reduction = meta.get("decode", {}).get("reduction", 1)
+    out[..., 0] = (out[..., 0] / sx - meta["padding"]["left"]) * reduction
+    out[..., 1] = (out[..., 1] / sy - meta["padding"]["top"]) * reduction
+    return out
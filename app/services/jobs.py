@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes, problem_details
+from app.services.image_fetch import fetch_image_bytes
+from app.services.ocr_runner import run_ocr
+
+logger = logging.getLogger(__name__)
+
+JobRunner = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobStore:
+    """Estado y resultados de jobs en SQLite (sobreviven a un reinicio), con expiración por TTL."""
+
+    def __init__(self, path: Path, ttl_seconds: float) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, created REAL NOT NULL, updated REAL NOT NULL,"
+            " expires REAL NOT NULL, result TEXT, error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_expires ON jobs(expires)")
+
+    def create(self) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs(id, status, created, updated, expires) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, now, now, now + self._ttl),
+            )
+        return job_id
+
+    def update(
+        self,
+        job_id: str,
+        status: str,
+        *,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, updated = ?, expires = ?, result = ?, error = ? WHERE id = ?",
+                (
+                    status,
+                    now,
+                    now + self._ttl,
+                    json.dumps(result) if result is not None else None,
+                    json.dumps(error) if error is not None else None,
+                    job_id,
+                ),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            # Un job vencido se borra al pedirlo, sin esperar a la próxima purga.
+            self._db.execute("DELETE FROM jobs WHERE id = ? AND expires <= ?", (job_id, now))
+            row = self._db.execute(
+                "SELECT id, status, created, updated, expires, result, error FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "created": row[2],
+            "updated": row[3],
+            "expires": row[4],
+            "result": json.loads(row[5]) if row[5] else None,
+            "error": json.loads(row[6]) if row[6] else None,
+        }
+
+    def fail_interrupted(self, error: Dict[str, Any]) -> int:
+        # El payload de jobs en cola vive en memoria: tras un reinicio no se pueden retomar.
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET status = ?, updated = ?, error = ? WHERE status IN (?, ?)",
+                (FAILED, time.time(), json.dumps(error), QUEUED, RUNNING),
+            )
+            return cur.rowcount
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._db.execute("DELETE FROM jobs WHERE expires <= ?", (time.time(),)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class JobManager:
+    """
+    Cola acotada en proceso + N workers asyncio que comparten el engine OCR.
+    Si la cola está llena, `submit` responde 429 con Retry-After en vez de aceptar trabajo sin límite.
+    """
+
+    def __init__(
+        self, store: JobStore, run: JobRunner, *, queue_size: int, workers: int, purge_interval: float = 0.0
+    ) -> None:
+        self._store = store
+        self._run = run
+        self._purge_interval = purge_interval
+        self._queue: "asyncio.Queue[tuple[str, Dict[str, Any]]]" = asyncio.Queue(maxsize=queue_size)
+        self._workers = workers
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._reserved = 0
+        self._durations: List[float] = []
+        self._stats = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0, "purged": 0}
+
+    @property
+    def store(self) -> JobStore:
+        return self._store
+
+    async def start(self) -> None:
+        interrupted = await run_in_threadpool(
+            self._store.fail_interrupted,
+            problem_details(
+                "/v1/ocr/jobs",
+                500,
+                ErrorCodes.OCR_INTERNAL_500,
+                "Job interrupted",
+                "El servicio se reinició antes de completar el job",
+                "",
+            ),
+        )
+        if interrupted:
+            logger.warning("Marked %s interrupted OCR jobs as failed", interrupted)
+        self._stats["purged"] += await run_in_threadpool(self._store.purge_expired)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+        if self._purge_interval > 0:
+            self._tasks.append(asyncio.create_task(self._purge_loop()))
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        for t in self._tasks:
+            try:
+                await t
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _purge_loop(self) -> None:
+        # Sin esto, jobs y resultados vencidos quedarían en SQLite hasta el próximo reinicio.
+        while True:
+            await asyncio.sleep(self._purge_interval)
+            try:
+                self._stats["purged"] += await run_in_threadpool(self._store.purge_expired)
+            except sqlite3.Error:
+                logger.exception("Could not purge expired OCR jobs")
+
+    def retry_after_seconds(self) -> int:
+        recent = self._durations[-50:]
+        avg = sum(recent) / len(recent) if recent else 1.0
+        return max(1, math.ceil(self._queue.qsize() * avg / max(1, self._workers)))
+
+    async def submit(self, payload: Dict[str, Any]) -> str:
+        if self._queue.qsize() + self._reserved >= self._queue.maxsize:
+            self._stats["rejected"] += 1
+            raise AppException(
+                429,
+                ErrorCodes.OCR_QUEUE_FULL_429,
+                "Too many requests",
+                "La cola de jobs OCR está llena, reintenta más tarde",
+                headers={"Retry-After": str(self.retry_after_seconds())},
+            )
+
+        # Reserva el lugar antes del await: dos submits concurrentes no pueden pasar el check a la vez.
+        self._reserved += 1
+        try:
+            job_id = await run_in_threadpool(self._store.create)
+        finally:
+            self._reserved -= 1
+        self._queue.put_nowait((job_id, payload))
+        self._stats["submitted"] += 1
+        return job_id
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, payload = await self._queue.get()
+            t0 = time.perf_counter()
+            try:
+                await run_in_threadpool(self._store.update, job_id, RUNNING)
+                result = await self._run(payload)
+                await run_in_threadpool(self._store.update, job_id, DONE, result=result)
+                self._stats["done"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                instance = f"/v1/ocr/jobs/{job_id}"
+                trace_id = payload.get("trace_id", "")
+                if isinstance(e, AppException):
+                    error = problem_details(instance, e.status, e.code, e.title, e.detail, trace_id)
+                else:
+                    logger.exception("OCR job %s failed", job_id)
+                    error = problem_details(
+                        instance,
+                        500,
+                        ErrorCodes.OCR_INTERNAL_500,
+                        "Internal error",
+                        "An unexpected error occurred.",
+                        trace_id,
+                    )
+                await run_in_threadpool(self._store.update, job_id, FAILED, error=error)
+                self._stats["failed"] += 1
+            finally:
+                self._durations = self._durations[-99:] + [time.perf_counter() - t0]
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "workers": self._workers,
+        }
+
+
+def create_job_manager(state: Any) -> JobManager:
+    async def run(payload: Dict[str, Any]) -> Dict[str, Any]:
+        data = payload.get("data")
+        if data is None:
+            data = await fetch_image_bytes(payload["image_url"], extra_headers=payload.get("headers"))
+        return await run_ocr(
+            state,
+            data,
+            preprocess=payload["preprocess"],
+            return_blocks=payload["blocks"],
+            lang=payload.get("lang"),
+        )
+
+    return JobManager(
+        JobStore(Path(settings.ocr_jobs_db), settings.ocr_jobs_ttl_seconds),
+        run,
+        queue_size=settings.ocr_jobs_queue_size,
+        workers=settings.ocr_jobs_workers or settings.ocr_pool_size,
+        purge_interval=settings.ocr_jobs_purge_interval_seconds,
+    )
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import threading
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import stage
+from app.services.image_preprocess import default_preprocess_config, preprocess_meta, to_original, to_processed
+from app.services.result_cache import OcrResultCache
+
+HASH_BITS = 64
+
+
+def _dhash_bits(gray: np.ndarray, size: int) -> int:
+    # dHash: ¿cada píxel es más claro que su vecino de la derecha? (size x size bits)
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def image_hashes(img_bgr: np.ndarray) -> Tuple[int, int]:
+    """
+    (dHash de 64 bits para el índice, dHash de 256 bits para confirmar). Resistentes a
+    recompresión y cambios de tamaño; el fino separa documentos distintos con el mismo diseño.
+    """
+    gray = img_bgr if img_bgr.ndim == 2 else cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+    return _dhash_bits(gray, 8), _dhash_bits(gray, 16)
+
+
+def _hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class _Entry:
+    __slots__ = ("variant", "coarse", "fine", "key", "shape")
+
+    def __init__(self, variant: str, coarse: int, fine: int, key: str, shape: Tuple[int, int]) -> None:
+        self.variant = variant
+        self.coarse = coarse
+        self.fine = fine
+        self.key = key
+        self.shape = shape  # (h, w) del archivo original
+
+
+class MultiIndexHash:
+    """
+    Índice de hashes para búsqueda por distancia de Hamming (multi-index hashing): el hash se parte
+    en `max_distance + 1` tramos disjuntos y, por palomar, todo vecino a distancia <= max_distance
+    coincide exacto en al menos un tramo. Cada búsqueda mira solo esos buckets, no todo el índice.
+    """
+
+    def __init__(self, max_distance: int) -> None:
+        self.max_distance = max_distance
+        parts = max_distance + 1
+        bounds = np.linspace(0, HASH_BITS, parts + 1).astype(int).tolist()
+        self._spans = [(lo, hi - lo) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        self._tables: List[Dict[Tuple[str, int], Set[int]]] = [{} for _ in self._spans]
+
+    def _chunks(self, h: int) -> List[int]:
+        return [(h >> (HASH_BITS - lo - width)) & ((1 << width) - 1) for lo, width in self._spans]
+
+    def add(self, entry_id: int, variant: str, h: int) -> None:
+        for table, chunk in zip(self._tables, self._chunks(h)):
+            table.setdefault((variant, chunk), set()).add(entry_id)
+
+    def remove(self, entry_id: int, variant: str, h: int) -> None:
+        for table, chunk in zip(self._tables, self._chunks(h)):
+            bucket = table.get((variant, chunk))
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del table[(variant, chunk)]
+
+    def candidates(self, variant: str, h: int) -> Set[int]:
+        found: Set[int] = set()
+        for table, chunk in zip(self._tables, self._chunks(h)):
+            found |= table.get((variant, chunk), set())
+        return found
+
+
+class NearDuplicateCache:
+    """
+    Resultados de imágenes casi idénticas (recomprimidas o redimensionadas por un CDN): perceptual hash
+    -> clave del cache exacto. Los resultados siguen viviendo en OcrResultCache (memoria + disco);
+    acá solo hay hashes, acotados a `max_entries` con LRU.
+    """
+
+    def __init__(self, results: OcrResultCache, *, max_entries: int, max_distance: int, verify_distance: int) -> None:
+        self._results = results
+        self._max_entries = max_entries
+        self._verify_distance = verify_distance
+        self._index = MultiIndexHash(max_distance)
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._by_key: Dict[str, int] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "rejected": 0, "stale": 0, "evictions": 0}
+
+    def find(self, variant: str, coarse: int, fine: int) -> Optional[Tuple[_Entry, int]]:
+        """Entrada más cercana dentro de las dos distancias, o None."""
+        with self._lock:
+            self._stats["lookups"] += 1
+            best: Optional[Tuple[_Entry, int]] = None
+            rejected = False
+            for entry_id in self._index.candidates(variant, coarse):
+                entry = self._entries[entry_id]
+                distance = _hamming(entry.coarse, coarse)
+                if distance > self._index.max_distance:
+                    continue
+                if _hamming(entry.fine, fine) > self._verify_distance:
+                    rejected = True
+                    continue
+                if best is None or distance < best[1]:
+                    best = (entry, distance)
+            if best is not None:
+                self._entries.move_to_end(self._by_key[best[0].key])
+                self._stats["hits"] += 1
+            elif rejected:
+                self._stats["rejected"] += 1
+            return best
+
+    def add(self, variant: str, coarse: int, fine: int, key: str, shape: Tuple[int, int]) -> None:
+        with self._lock:
+            if key in self._by_key:
+                self._entries.move_to_end(self._by_key[key])
+                return
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(variant, coarse, fine, key, shape)
+            self._by_key[key] = entry_id
+            self._index.add(entry_id, variant, coarse)
+            while len(self._entries) > self._max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _drop(self, entry_id: int) -> None:
+        # Llamar con self._lock tomado.
+        entry = self._entries.pop(entry_id)
+        self._by_key.pop(entry.key, None)
+        self._index.remove(entry_id, entry.variant, entry.coarse)
+
+    def result(self, entry: _Entry) -> Optional[Dict[str, Any]]:
+        """Resultado cacheado de la entrada; si el cache exacto ya lo desalojó, se olvida el hash."""
+        out = self._results.peek(entry.key)
+        if out is None:
+            with self._lock:
+                entry_id = self._by_key.get(entry.key)
+                if entry_id is not None:
+                    self._drop(entry_id)
+                self._stats["stale"] += 1
+        return out
+
+    def bind(self) -> "NearDuplicateLookup":
+        return NearDuplicateLookup(self)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "max_distance": self._index.max_distance,
+            }
+
+
+def _rescale(points: np.ndarray, old_meta: Optional[Dict[str, Any]], new_meta: Optional[Dict[str, Any]], sx: float, sy: float) -> np.ndarray:
+    # Coordenadas de salida del resultado cacheado -> archivo original -> escala nueva -> salida nueva.
+    original = to_original(points, old_meta)
+    original[..., 0] *= sx
+    original[..., 1] *= sy
+    return to_processed(original, new_meta)
+
+
+def rescale_result(
+    cached: Dict[str, Any],
+    old_shape: Tuple[int, int],
+    new_meta: Optional[Dict[str, Any]],
+    new_shape: Tuple[int, int],
+) -> Dict[str, Any]:
+    """Adapta las cajas (bloques y, si están, líneas y párrafos) de un resultado a otra imagen."""
+    old_meta = cached.get("preprocess")
+    sx, sy = new_shape[1] / float(old_shape[1]), new_shape[0] / float(old_shape[0])
+    out = dict(cached)
+    out["preprocess"] = new_meta if old_meta is not None else None
+    new = out["preprocess"]
+
+    if cached["blocks"]:
+        quads = np.asarray([b["box"] for b in cached["blocks"]], dtype=np.float32).reshape(-1, 4, 2)
+        boxes = np.rint(_rescale(quads, old_meta, new, sx, sy)).astype(np.int32).tolist()
+        out["blocks"] = [{**b, "box": box} for b, box in zip(cached["blocks"], boxes)]
+    for name in ("lines", "paragraphs"):
+        if cached.get(name):
+            corners = np.asarray([g["box"] for g in cached[name]], dtype=np.float32).reshape(-1, 2, 2)
+            boxes = np.rint(_rescale(corners, old_meta, new, sx, sy)).astype(np.int32).reshape(-1, 4).tolist()
+            out[name] = [{**g, "box": box} for g, box in zip(cached[name], boxes)]
+    return out
+
+
+class NearDuplicateLookup:
+    """
+    Enlace de un request con el cache de casi-duplicados. run_ocr le fija la clave exacta y la
+    variante (parámetros sin la imagen); el engine la usa apenas tiene la imagen decodificada.
+    """
+
+    def __init__(self, cache: NearDuplicateCache) -> None:
+        self._cache = cache
+        self.key = ""
+        self.variant = ""
+
+    def get_or_compute(
+        self,
+        img_bgr: np.ndarray,
+        decode_meta: Dict[str, Any],
+        preprocess: bool,
+        compute: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        with stage("phash"):
+            coarse, fine = image_hashes(img_bgr)
+        source = decode_meta["source_shape"]
+        shape = (source["h"], source["w"])
+
+        found = self._cache.find(self.variant, coarse, fine)
+        if found is not None:
+            entry, distance = found
+            cached = self._cache.result(entry)
+            if cached is not None:
+                new_meta = None
+                if preprocess:
+                    new_meta = preprocess_meta(img_bgr.shape[0], img_bgr.shape[1], default_preprocess_config())
+                    if decode_meta["reduction"] > 1:
+                        new_meta["decode"] = decode_meta
+                cached.pop("near_duplicate", None)
+                out = rescale_result(cached, entry.shape, new_meta, shape)
+                out["near_duplicate"] = {"distance": distance}
+                return out
+
+        out = compute()
+        self._cache.add(self.variant, coarse, fine, self.key, shape)
+        return out
+
+
+def create_near_cache(results: Optional[OcrResultCache]) -> Optional[NearDuplicateCache]:
+    if results is None or settings.ocr_near_cache_max_entries <= 0:
+        return None
+    return NearDuplicateCache(
+        results,
+        max_entries=settings.ocr_near_cache_max_entries,
+        max_distance=settings.ocr_near_cache_max_distance,
+        verify_distance=settings.ocr_near_cache_verify_distance,
+    )
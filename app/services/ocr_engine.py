@@ -1,86 +1,358 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
-import threading
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+import copy
+import time
 
-import cv2
 import numpy as np
-from paddleocr import PaddleOCR
 
 from app.core.config import settings
-from app.services.image_preprocess import PreprocessConfig, preprocess_for_ocr
+from app.core.metrics import STARTUP_SECONDS, stage
+from app.services.image_preprocess import (
+    PreprocessConfig,
+    default_preprocess_config,
+    preprocess_for_ocr,
+    to_original,
+    to_processed,
+)
+from app.services.ocr_extract import extract_from_bytes
+from app.services.ocr_pool import OcrInstancePool
+from app.services.ocr_postprocess import assemble_result, build_result
+from app.services.ocr_stages import ALL_STAGES, OcrStages
+from app.services.rec_batcher import RecognitionBatcher
+
+
+_MODEL_FILES = ("inference.pdmodel", "inference.pdiparams")
+
+
+@lru_cache(maxsize=None)
+def load_paddle() -> SimpleNamespace:
+    """
+    Importa el stack de PaddleOCR la primera vez que se construye un engine (no al importar este
+    módulo): los tests, el tooling y el arranque del servidor HTTP no pagan por él.
+    """
+    t0 = time.perf_counter()
+    from paddleocr import PaddleOCR
+    from paddleocr.tools.infer.predict_rec import TextRecognizer
+    from paddleocr.tools.infer.predict_system import sorted_boxes
+    from paddleocr.tools.infer.utility import get_rotate_crop_image
+
+    STARTUP_SECONDS.labels("import").set(time.perf_counter() - t0)
+    return SimpleNamespace(
+        PaddleOCR=PaddleOCR,
+        TextRecognizer=TextRecognizer,
+        sorted_boxes=sorted_boxes,
+        get_rotate_crop_image=get_rotate_crop_image,
+    )
+
+
+def local_model_dirs(root: str, lang: str) -> Dict[str, str]:
+    """
+    det/cls/rec dentro de OCR_MODEL_DIR (rec/<lang>/ si existe, para servir varios idiomas con el
+    mismo detector). Si falta algún modelo se falla al cargar: nunca se descarga nada en runtime.
+    Un idioma distinto de OCR_LANG exige su rec/<lang>/: PaddleOCR toma el diccionario de `lang`, y con
+    el rec por defecto el modelo y el diccionario no coincidirían (texto basura, sin error).
+    """
+    dirs: Dict[str, str] = {}
+    missing: List[str] = []
+    for name in ("det", "cls", "rec"):
+        path = Path(root) / name
+        if name == "rec" and (path / lang).is_dir():
+            path = path / lang
+        elif name == "rec" and lang != settings.ocr_lang:
+            raise RuntimeError(f"Falta el modelo de reconocimiento para '{lang}': se espera {path / lang}")
+        missing += [str(path / f) for f in _MODEL_FILES if not (path / f).is_file()]
+        dirs[f"{name}_model_dir"] = str(path)
+    if missing:
+        raise RuntimeError(f"Faltan modelos OCR en {root}: {', '.join(missing)}")
+    return dirs
+
+
+def model_dirs(lang: str) -> Dict[str, str]:
+    """
+    Modelos a cargar para `lang`: los de OCR_MODEL_DIR. Sin ese directorio se falla al arrancar, salvo con
+    OCR_ALLOW_MODEL_DOWNLOAD=true (desarrollo), donde PaddleOCR descarga los suyos.
+    """
+    if settings.ocr_model_dir:
+        return local_model_dirs(settings.ocr_model_dir, lang)
+    if settings.ocr_allow_model_download:
+        return {}
+    raise RuntimeError(
+        "OCR_MODEL_DIR no está configurado: apuntarlo a los modelos det/cls/rec locales "
+        "(o OCR_ALLOW_MODEL_DOWNLOAD=true para que PaddleOCR los descargue, solo en desarrollo)"
+    )
+
+
+def _weights_bytes(model_dir: str) -> int:
+    total = 0
+    for name in _MODEL_FILES:
+        try:
+            total += (Path(model_dir) / name).stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+def _clone_detector(detector: Any) -> Any:
+    # Predictor clonado: comparte los pesos del modelo pero tiene sus propios tensores (uso desde otro thread).
+    clone = copy.copy(detector)
+    clone.predictor = detector.predictor.clone()
+    clone.input_tensor = clone.predictor.get_input_handle(clone.predictor.get_input_names()[0])
+    clone.output_tensors = [clone.predictor.get_output_handle(n) for n in clone.predictor.get_output_names()]
+    return clone
 
 
 class PaddleOcrEngine:
-    def __init__(self) -> None:
-        self._lock = threading.Lock()
-
-        self._pp_cfg = PreprocessConfig(
-            target_min_side=settings.ocr_target_min_side,
-            max_side=settings.ocr_max_side,
-            pad_lr_ratio=settings.ocr_pad_lr_ratio,
-            pad_top_ratio=settings.ocr_pad_top_ratio,
-            pad_bottom_ratio=settings.ocr_pad_bottom_ratio,
-            pad_min_px=settings.ocr_pad_min_px,
-            pad_max_px=settings.ocr_pad_max_px,
+    def __init__(
+        self,
+        *,
+        pool_size: Optional[int] = None,
+        lang: Optional[str] = None,
+        detector_donor: Optional["PaddleOcrEngine"] = None,
+    ) -> None:
+        self._pp_cfg: PreprocessConfig = default_preprocess_config()
+        self._paddle = load_paddle()
+        self._lang = lang or settings.ocr_lang
+        self._donor = detector_donor
+        self._det_model_dir: Optional[str] = None
+        self._weight_dirs: Dict[str, str] = {}
+        self._instances = 0
+        self._shared_detectors = 0
+        self._model_dirs = model_dirs(self._lang)
+
+        self._pool: OcrInstancePool[Any] = OcrInstancePool(
+            self._build_ocr,
+            size=pool_size or settings.ocr_pool_size,
+            timeout=settings.ocr_pool_timeout_seconds,
         )
 
-        self._ocr = PaddleOCR(
+        self._batcher: Optional[RecognitionBatcher] = None
+        if settings.ocr_rec_batch_window_ms > 0:
+            self._batcher = RecognitionBatcher(
+                self._build_batch_recognizer(),
+                window_ms=settings.ocr_rec_batch_window_ms,
+                max_batch=settings.ocr_rec_batch_max,
+            )
+
+    def _build_ocr(self) -> Any:
+        ocr = self._paddle.PaddleOCR(
             use_angle_cls=True,
-            lang=settings.ocr_lang,
+            lang=self._lang,
             drop_score=settings.ocr_drop_score,
+            det_limit_side_len=settings.ocr_det_limit_side_len,
+            det_limit_type="max",
+            cpu_threads=settings.ocr_threads_per_instance,
+            **self._model_dirs,
         )
+        self._det_model_dir = ocr.args.det_model_dir
+        self._weight_dirs = {name: getattr(ocr.args, f"{name}_model_dir", "") or "" for name in ("det", "cls", "rec")}
+        self._instances += 1
+        if self._donor is not None and not getattr(ocr.args, "use_onnx", False):
+            # Mismo modelo de detección que el engine donante (p.ej. es/en): se usa un clon de su
+            # predictor y el detector recién cargado se libera, así los pesos quedan una sola vez en memoria.
+            detector = self._donor.clone_detector(self._det_model_dir)
+            if detector is not None:
+                ocr.text_detector = detector
+                self._shared_detectors += 1
+        return ocr
+
+    def memory_bytes(self) -> int:
+        """
+        Huella estimada por el tamaño de los pesos cargados: det (salvo los compartidos), cls y rec por
+        instancia, más el reconocedor del batcher. No incluye buffers de inferencia.
+        """
+        det, cls, rec = (_weights_bytes(self._weight_dirs.get(n, "")) for n in ("det", "cls", "rec"))
+        own_detectors = self._instances - self._shared_detectors
+        batcher = rec if self._batcher is not None else 0
+        return own_detectors * det + self._instances * (cls + rec) + batcher
+
+    def clone_detector(self, det_model_dir: str) -> Optional[Any]:
+        """Detector que comparte pesos con los de este engine, si usa el mismo modelo de detección."""
+        if det_model_dir != self._det_model_dir:
+            return None
+        with self._pool.acquire() as ocr:
+            return _clone_detector(ocr.text_detector)
+
+    def _build_batch_recognizer(self):
+        # Reconocedor dedicado (mismo modelo/args que el pool) para el batcher entre requests.
+        with self._pool.acquire() as ocr:
+            args = copy.copy(ocr.args)
+        args.rec_batch_num = settings.ocr_rec_batch_max
+        recognizer = self._paddle.TextRecognizer(args)
+        return lambda crops: recognizer(crops)[0]
+
+    def warmup(self, images: List[np.ndarray]) -> None:
+        """
+        Pasa cada imagen por preprocess + det + cls + rec en todas las instancias del pool (y por el
+        batcher si está activo): la inicialización del grafo, la selección de kernels MKL-DNN para
+        cada tamaño y las primeras reservas de memoria no las paga el primer request real.
+        """
+        processed = [preprocess_for_ocr(img, self._pp_cfg)[0] for img in images]
+        with self._pool.acquire_all() as instances:
+            for ocr in instances:
+                for img in processed:
+                    ocr.ocr(img, cls=True)
+        if self._batcher is not None:
+            for img in processed:
+                self._run_ocr_batched(img, cls=True)
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"mode": "thread", "lang": self._lang, "pool": self._pool.stats()}
+        if self._shared_detectors:
+            out["shared_detectors"] = self._shared_detectors
+        if self._batcher is not None:
+            out["rec_batcher"] = self._batcher.stats()
+        return out
 
-    def extract_from_bytes(self, data: bytes, *, preprocess: bool, return_blocks: bool) -> Dict[str, Any]:
-        img = self._decode_image(data)
-        return self.extract(img, preprocess=preprocess, return_blocks=return_blocks)
+    def close(self) -> None:
+        if self._batcher is not None:
+            self._batcher.close()
 
-    def extract(self, img_bgr: np.ndarray, *, preprocess: bool, return_blocks: bool) -> Dict[str, Any]:
+    def extract_from_bytes(self, data: bytes, *, preprocess: bool, **options: Any) -> Dict[str, Any]:
+        # Decode, triage y cache de casi-duplicados son comunes (ver ocr_extract); acá solo cambia `extract`.
+        keep_side = self._pp_cfg.max_side if preprocess else None
+        return extract_from_bytes(self.extract, data, keep_side=keep_side, preprocess=preprocess, **options)
+
+    def extract(
+        self,
+        img_bgr: np.ndarray,
+        *,
+        preprocess: bool,
+        return_blocks: bool,
+        stages: OcrStages = ALL_STAGES,
+        regions: Optional[np.ndarray] = None,
+    ) -> Dict[str, Any]:
+        """
+        OCR de una imagen BGR. Con `regions` ((n, 4, 2) en coordenadas originales) no hay detección:
+        se reconocen solo esos recortes y sus cajas se devuelven en coordenadas originales.
+        """
         meta: Optional[Dict[str, Any]] = None
         if preprocess:
-            img_bgr, meta = preprocess_for_ocr(img_bgr, self._pp_cfg)
-
-        result = self._run_ocr(img_bgr)
-
-        blocks: List[Dict[str, Any]] = []
-        lines: List[str] = []
-
-        if result:
-            for page in result:
-                if not page:
-                    continue
-                for line in page:
-                    if not line or len(line) < 2:
-                        continue
-                    box = line[0]
-                    text = str(line[1][0]).strip()
-                    conf = float(line[1][1])
-
-                    if text:
-                        lines.append(text)
-
-                    if return_blocks:
-                        blocks.append(
-                            {
-                                "text": text,
-                                "confidence": conf,
-                                "box": [[int(round(p[0])), int(round(p[1]))] for p in box],
-                            }
-                        )
-
-        return {
-            "text": "\n".join(lines).strip(),
-            "blocks": blocks if return_blocks else [],
-            "preprocess": meta,
-        }
-
-    def _run_ocr(self, img_bgr: np.ndarray):
-        with self._lock:
-            return self._ocr.ocr(img_bgr, cls=True)
-
-    def _decode_image(self, data: bytes) -> np.ndarray:
-        arr = np.frombuffer(data, dtype=np.uint8)
-        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError("Invalid image bytes (decode failed)")
-        return img
\ No newline at end of file
+            # El lienzo es del pool del thread: se usa solo durante este _run_ocr.
+            with stage("preprocess"):
+                img_bgr, meta = preprocess_for_ocr(img_bgr, self._pp_cfg, reuse_buffer=True)
+
+        if regions is not None:
+            return self._extract_regions(img_bgr, regions, meta, return_blocks=return_blocks, cls=stages.cls)
+
+        # "inference" incluye la espera por una instancia libre (que además se reporta como pool_wait).
+        with stage("inference"):
+            result = self._run_ocr(img_bgr, stages)
+
+        with stage("postprocess"):
+            out = assemble_result(result, return_blocks=return_blocks)
+        out["preprocess"] = meta
+        return out
+
+    def _extract_regions(
+        self,
+        img_bgr: np.ndarray,
+        regions: np.ndarray,
+        meta: Optional[Dict[str, Any]],
+        *,
+        return_blocks: bool,
+        cls: bool,
+    ) -> Dict[str, Any]:
+        h, w = img_bgr.shape[:2]
+        quads = to_processed(regions, meta)
+        quads[..., 0] = np.clip(quads[..., 0], 0, w - 1)
+        quads[..., 1] = np.clip(quads[..., 1], 0, h - 1)
+
+        with stage("inference"):
+            crops = [self._paddle.get_rotate_crop_image(img_bgr, quad) for quad in quads]
+
+            # Todos los recortes van juntos a un único llamado del reconocedor (o al batcher compartido).
+            if self._batcher is not None:
+                if cls:
+                    with self._pool.acquire() as ocr:
+                        crops, _, _ = ocr.text_classifier(crops)
+                rec_res = self._batcher.recognize(crops)
+            else:
+                with self._pool.acquire() as ocr:
+                    if cls and ocr.use_angle_cls:
+                        crops, _, _ = ocr.text_classifier(crops)
+                    rec_res, _ = ocr.text_recognizer(crops)
+
+        with stage("postprocess"):
+            # Las regiones vuelven en el orden en que las mandó el cliente.
+            out = build_result(
+                to_original(quads, meta),
+                [str(text).strip() for text, _ in rec_res],
+                [float(conf) for _, conf in rec_res],
+                return_blocks=return_blocks,
+                reorder=False,
+            )
+        out["preprocess"] = meta
+        return out
+
+    def _run_ocr(self, img_bgr: np.ndarray, stages: OcrStages) -> List[Tuple[Any, Optional[Tuple[str, float]]]]:
+        """Lista de (caja, (texto, confidence) | None) según las etapas pedidas."""
+        if not stages.det:
+            return self._recognize_whole(img_bgr, stages.cls)
+
+        if not stages.rec:
+            # Directo al detector (PaddleOCR.ocr(rec=False) falla con más de una caja en esta versión).
+            with self._pool.acquire() as ocr:
+                dt_boxes, _ = ocr.text_detector(img_bgr)
+            if dt_boxes is None or len(dt_boxes) == 0:
+                return []
+            return [(box.tolist(), None) for box in self._paddle.sorted_boxes(dt_boxes)]
+
+        if self._batcher is not None:
+            return self._run_ocr_batched(img_bgr, stages.cls)
+
+        with self._pool.acquire() as ocr:
+            result = ocr.ocr(img_bgr, cls=stages.cls)
+        return [
+            (line[0], line[1])
+            for page in result or []
+            if page
+            for line in page
+            if line and len(line) >= 2
+        ]
+
+    def _run_ocr_batched(self, img_bgr: np.ndarray, cls: bool):
+        # Detección + clasificador con la instancia del pool; el reconocimiento va al
+        # batcher compartido, así la instancia queda libre para el siguiente request.
+        with self._pool.acquire() as ocr:
+            dt_boxes, _ = ocr.text_detector(img_bgr)
+            if dt_boxes is None or len(dt_boxes) == 0:
+                return []
+            dt_boxes = self._paddle.sorted_boxes(dt_boxes)
+            crops = [self._paddle.get_rotate_crop_image(img_bgr, box) for box in dt_boxes]
+            if cls and ocr.use_angle_cls:
+                crops, _, _ = ocr.text_classifier(crops)
+            drop_score = ocr.drop_score
+
+        rec_res = self._batcher.recognize(crops)
+        return [(box.tolist(), res) for box, res in zip(dt_boxes, rec_res) if res[1] >= drop_score]
+
+    def _recognize_whole(self, img_bgr: np.ndarray, cls: bool):
+        # Solo reconocimiento: la imagen (ya recortada por el cliente) es una única línea.
+        if self._batcher is not None:
+            crops = [img_bgr]
+            if cls:
+                with self._pool.acquire() as ocr:
+                    crops, _, _ = ocr.text_classifier(crops)
+            rec_res = self._batcher.recognize(crops)
+        else:
+            with self._pool.acquire() as ocr:
+                rec_res = ocr.ocr(img_bgr, det=False, cls=cls)[0]
+
+        h, w = img_bgr.shape[:2]
+        return [([[0, 0], [w, 0], [w, h], [0, h]], res) for res in rec_res]
+
+
+def create_ocr_engine():
+    if settings.ocr_execution_mode == "process":
+        from app.services.ocr_process_pool import ProcessOcrEngine
+
+        return ProcessOcrEngine(
+            workers=settings.ocr_pool_size,
+            timeout=settings.ocr_process_timeout_seconds,
+            startup_timeout=settings.ocr_process_startup_seconds,
+        )
+    return PaddleOcrEngine()
\ No newline at end of file
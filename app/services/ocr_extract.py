@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from app.services.image_decode import decode_image_for_ocr, with_decode_meta
+from app.services.near_cache import NearDuplicateLookup
+from app.services.ocr_regions import check_regions_within
+from app.services.ocr_stages import ALL_STAGES, OcrStages
+from app.services.ocr_triage import TriageConfig, run_triaged
+
+
+def extract_from_bytes(
+    extract: Callable[..., Dict[str, Any]],
+    data: bytes,
+    *,
+    keep_side: Optional[int],
+    preprocess: bool,
+    return_blocks: bool,
+    stages: OcrStages = ALL_STAGES,
+    regions: Optional[np.ndarray] = None,
+    on_decoded: Optional[Callable[[], None]] = None,
+    triage: Optional[TriageConfig] = None,
+    near: Optional[NearDuplicateLookup] = None,
+) -> Dict[str, Any]:
+    """
+    Flujo común de los engines para bytes: decodificar -> (cache de casi-duplicados) -> (triage) ->
+    `extract(img, ...)`. Cada engine pone solo su `extract` (en el proceso o despachado a un worker).
+    Con regiones se decodifica a resolución completa (`keep_side=None`): los recortes conservan todo el detalle.
+    """
+    img, decode_meta = decode_image_for_ocr(data, keep_side=keep_side if regions is None else None)
+    if regions is not None:
+        check_regions_within(regions, img.shape[0], img.shape[1])
+    if on_decoded is not None:
+        on_decoded()  # los bytes comprimidos ya no hacen falta durante la inferencia
+
+    def run() -> Dict[str, Any]:
+        def call() -> Dict[str, Any]:
+            return extract(img, preprocess=preprocess, return_blocks=return_blocks, stages=stages, regions=regions)
+
+        # El triage solo aplica a páginas completas con detección (regiones y rec-only ya dicen dónde hay texto).
+        if triage is not None and regions is None and stages.det:
+            return run_triaged(img, triage, call)
+        return call()
+
+    if near is not None and regions is None:
+        out = near.get_or_compute(img, decode_meta, preprocess, run)
+    else:
+        out = run()
+    return with_decode_meta(out, decode_meta)
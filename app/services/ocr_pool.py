@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Generic, Iterator, List, Set, TypeVar
+import queue
+import threading
+import time
+
+from app.core.errors import AppException, ErrorCodes
+from app.core.metrics import record_stage
+
+T = TypeVar("T")
+
+_WAIT_WINDOW = 1024
+
+
+class OcrInstancePool(Generic[T]):
+    """
+    Pool de instancias OCR independientes. Cada request toma una instancia
+    (espera acotada por `timeout`) y la devuelve al terminar, así N instancias
+    procesan N imágenes en paralelo en vez de serializar todo tras un único lock.
+    """
+
+    def __init__(self, factory: Callable[[], T], *, size: int, timeout: float) -> None:
+        if size < 1:
+            raise ValueError("Pool size must be >= 1")
+
+        self._size = size
+        self._timeout = timeout
+        self._idle: "queue.LifoQueue[T]" = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(factory())
+
+        self._stats_lock = threading.Lock()
+        self._acquired = 0
+        self._timeouts = 0
+        self._in_use = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recent_waits: Deque[float] = deque(maxlen=_WAIT_WINDOW)
+        self._held: Set[int] = set()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @contextmanager
+    def acquire(self) -> Iterator[T]:
+        t0 = time.perf_counter()
+        try:
+            instance = self._idle.get(timeout=self._timeout)
+        except queue.Empty:
+            record_stage("pool_wait", time.perf_counter() - t0)
+            with self._stats_lock:
+                self._timeouts += 1
+            raise AppException(
+                503,
+                ErrorCodes.OCR_BUSY_503,
+                "Service busy",
+                f"No hay motores OCR libres tras {self._timeout:.1f}s de espera",
+            )
+
+        waited = time.perf_counter() - t0
+        record_stage("pool_wait", waited)
+        with self._stats_lock:
+            self._acquired += 1
+            self._in_use += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._recent_waits.append(waited)
+
+        try:
+            yield instance
+        finally:
+            with self._stats_lock:
+                self._in_use -= 1
+                held = id(instance) in self._held
+                self._held.discard(id(instance))
+            if not held:
+                self._idle.put(instance)
+
+    def hold(self, instance: T) -> None:
+        """
+        Dentro de `acquire`: la instancia no vuelve al pool al salir (p.ej. se está reiniciando);
+        quien la retiene la devuelve con `put_back` cuando vuelve a estar lista.
+        """
+        with self._stats_lock:
+            self._held.add(id(instance))
+
+    def put_back(self, instance: T) -> None:
+        self._idle.put(instance)
+
+    @contextmanager
+    def acquire_all(self) -> Iterator[List[T]]:
+        """Toma todas las instancias (warm-up y mantenimiento); espera sin límite a que se liberen."""
+        instances = [self._idle.get() for _ in range(self._size)]
+        try:
+            yield instances
+        finally:
+            for instance in instances:
+                self._idle.put(instance)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            recent: List[float] = sorted(self._recent_waits)
+            acquired = self._acquired
+            return {
+                "size": self._size,
+                "in_use": self._in_use,
+                "acquired": acquired,
+                "timeouts": self._timeouts,
+                "wait_seconds": {
+                    "avg": (self._wait_total / acquired) if acquired else 0.0,
+                    "max": self._wait_max,
+                    "p50": _percentile(recent, 0.50),
+                    "p95": _percentile(recent, 0.95),
+                    "p99": _percentile(recent, 0.99),
+                },
+            }
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+RecResult = Tuple[str, float]
+Line = Tuple[Sequence[Sequence[float]], Optional[RecResult]]
+
+# Umbrales del layout, en múltiplos de la altura mediana de las cajas (o de la línea).
+_ROW_OVERLAP = 0.25  # solape vertical tolerado entre dos filas separables
+_COLUMN_GAP = 0.5  # hueco horizontal mínimo para separar columnas
+_CUT_SLACK = 0.5  # se corta en todos los huecos a menos de esto del más ancho
+_COLUMN_RATIO = 0.5  # columna de texto: hueco < esto * ancho mediano de las cajas (si no, es una tabla)
+_SAME_LINE = 0.5  # solape vertical (sobre la caja más baja) para estar en la misma línea
+_PARAGRAPH_GAP = 0.8  # interlineado máximo dentro de un párrafo
+_PARAGRAPH_HEIGHTS = 1.5  # relación máxima de alturas entre líneas del mismo párrafo
+_MAX_SKEW = np.deg2rad(15.0)  # más inclinado que esto no se corrige (texto vertical, rotado, etc.)
+
+
+def _deskewed_bounds(quads: np.ndarray) -> np.ndarray:
+    """(N, 4) x0, y0, x1, y1 de cada caja tras rotar la página por su inclinación mediana."""
+    top = quads[:, 1] - quads[:, 0]
+    wide = np.abs(top[:, 0]) > np.abs(quads[:, 3, 1] - quads[:, 0, 1])
+    angle = float(np.median(np.arctan2(top[wide, 1], top[wide, 0]))) if wide.any() else 0.0
+    pts = quads
+    if 1e-3 < abs(angle) <= _MAX_SKEW:
+        c, s = np.cos(angle), np.sin(angle)
+        pts = np.empty_like(quads)
+        pts[..., 0] = quads[..., 0] * c + quads[..., 1] * s
+        pts[..., 1] = quads[..., 1] * c - quads[..., 0] * s
+    return np.concatenate([pts.min(axis=1), pts.max(axis=1)], axis=1)
+
+
+def _gaps(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Orden por `lo` y hueco entre cada elemento y todo lo anterior (negativo = se solapan)."""
+    order = np.argsort(lo, kind="stable")
+    reach = np.maximum.accumulate(hi[order])
+    return order, lo[order][1:] - reach[:-1]
+
+
+def _xy_cut(bounds: np.ndarray, idx: np.ndarray, unit: float, out: List[np.ndarray]) -> None:
+    if len(idx) == 1:
+        out.append(idx)
+        return
+    b = bounds[idx]
+    y_order, y_gaps = _gaps(b[:, 1], b[:, 3])
+    x_order, x_gaps = _gaps(b[:, 0], b[:, 2])
+    y_ok = y_gaps > -_ROW_OVERLAP * unit
+    x_ok = x_gaps > _COLUMN_GAP * unit
+
+    # Filas primero (formularios, tablas, facturas), salvo columnas de texto: un canal angosto
+    # entre líneas anchas que recorre todo el bloque.
+    use_x = x_ok.any() and (
+        not y_ok.any() or x_gaps.max() < _COLUMN_RATIO * float(np.median(b[:, 2] - b[:, 0]))
+    )
+    if use_x:
+        order, gaps, ok = x_order, x_gaps, x_ok
+    elif y_ok.any():
+        order, gaps, ok = y_order, y_gaps, y_ok
+    else:
+        # Sin cortes posibles: por centro vertical y después de izquierda a derecha.
+        out.append(idx[np.lexsort((b[:, 0], b[:, 1] + b[:, 3]))])
+        return
+
+    # Se corta en los huecos casi tan anchos como el mayor: título / cuerpo antes que renglón a renglón.
+    cuts = np.flatnonzero(ok & (gaps >= gaps[ok].max() - _CUT_SLACK * unit)) + 1
+    if len(cuts) == len(idx) - 1:  # una caja por parte (el caso típico: renglones sueltos)
+        out.append(idx[order])
+        return
+    edges = [0, *cuts.tolist(), len(idx)]
+    for start, end in zip(edges[:-1], edges[1:]):
+        _xy_cut(bounds, idx[order[start:end]], unit, out)
+
+
+def reading_order(quads: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Orden de lectura de cajas (N, 4, 2) por XY-cut recursivo sobre la página enderezada.
+    Devuelve (orden, línea de cada caja en ese orden, párrafo de cada línea); líneas y párrafos
+    quedan numerados de forma consecutiva en el orden de lectura.
+    """
+    n = len(quads)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+
+    bounds = _deskewed_bounds(quads)
+    heights = bounds[:, 3] - bounds[:, 1]
+    unit = max(float(np.median(heights)), 1.0)
+    parts: List[np.ndarray] = []
+    _xy_cut(bounds, np.arange(n), unit, parts)
+    order = np.concatenate(parts)
+
+    # Líneas: cajas consecutivas que se solapan en vertical y siguen hacia la derecha.
+    b = bounds[order]
+    h = np.maximum(b[:, 3] - b[:, 1], 1e-6)
+    overlap = np.minimum(b[1:, 3], b[:-1, 3]) - np.maximum(b[1:, 1], b[:-1, 1])
+    same_line = (overlap >= _SAME_LINE * np.minimum(h[1:], h[:-1])) & (b[1:, 0] >= b[:-1, 0])
+    line_ids = np.concatenate([[0], np.cumsum(~same_line)])
+
+    # Párrafos: líneas consecutivas de la misma columna, con interlineado y altura parecidos.
+    starts = np.flatnonzero(np.concatenate([[True], ~same_line]))
+    lx0 = np.minimum.reduceat(b[:, 0], starts)
+    ly0 = np.minimum.reduceat(b[:, 1], starts)
+    lx1 = np.maximum.reduceat(b[:, 2], starts)
+    ly1 = np.maximum.reduceat(b[:, 3], starts)
+    lh = np.maximum(ly1 - ly0, 1e-6)
+    gap = ly0[1:] - ly1[:-1]
+    tallest = np.maximum(lh[1:], lh[:-1])
+    same_para = (
+        (gap >= -_ROW_OVERLAP * tallest)
+        & (gap <= _PARAGRAPH_GAP * tallest)
+        & (np.minimum(lx1[1:], lx1[:-1]) > np.maximum(lx0[1:], lx0[:-1]))
+        & (tallest <= _PARAGRAPH_HEIGHTS * np.minimum(lh[1:], lh[:-1]))
+    )
+    para_ids = np.concatenate([[0], np.cumsum(~same_para)])
+    return order, line_ids, para_ids
+
+
+def _line_texts(texts: Sequence[str], line_ids: np.ndarray) -> List[str]:
+    joined: List[List[str]] = [[] for _ in range(int(line_ids[-1]) + 1)] if len(line_ids) else []
+    for text, line in zip(texts, line_ids.tolist()):
+        if text:
+            joined[line].append(text)
+    return [" ".join(parts) for parts in joined]
+
+
+def build_result(
+    quads: np.ndarray,
+    texts: Sequence[str],
+    confidences: Sequence[Optional[float]],
+    *,
+    return_blocks: bool,
+    reorder: bool = True,
+) -> Dict[str, Any]:
+    """
+    `text` + `blocks` desde cajas (N, 4, 2) ya en las coordenadas de salida. Con `reorder` los bloques
+    van en orden de lectura y `text` une los de una misma línea con espacios; sin él (regiones pedidas
+    por el cliente) se respeta el orden recibido, un bloque por renglón.
+    """
+    quads = np.asarray(quads, dtype=np.float32).reshape(-1, 4, 2)
+    if reorder and len(quads):
+        order, line_ids, _ = reading_order(quads)
+        texts = [texts[i] for i in order.tolist()]
+        confidences = [confidences[i] for i in order.tolist()]
+        quads = quads[order]
+        text = "\n".join(t for t in _line_texts(texts, line_ids) if t)
+    else:
+        text = "\n".join(t for t in texts if t)
+
+    blocks: List[Dict[str, Any]] = []
+    if return_blocks:
+        boxes = np.rint(quads).astype(np.int32).tolist()
+        blocks = [
+            {"text": t, "confidence": c, "box": box} for t, c, box in zip(texts, confidences, boxes)
+        ]
+    return {"text": text.strip(), "blocks": blocks}
+
+
+def assemble_result(lines: Iterable[Line], *, return_blocks: bool) -> Dict[str, Any]:
+    """
+    Arma `text` + `blocks` a partir de las líneas del engine: (caja, (texto, confidence) | None).
+    Sin reconocimiento (solo det) el bloque tiene la caja, sin texto ni confidence.
+    """
+    boxes: List[Sequence[Sequence[float]]] = []
+    texts: List[str] = []
+    confidences: List[Optional[float]] = []
+    for box, rec in lines:
+        boxes.append(box)
+        texts.append(str(rec[0]).strip() if rec is not None else "")
+        confidences.append(float(rec[1]) if rec is not None else None)
+    return build_result(np.asarray(boxes, dtype=np.float32), texts, confidences, return_blocks=return_blocks)
+
+
+def _bbox(quads: np.ndarray, starts: np.ndarray) -> List[List[int]]:
+    # Caja alineada a los ejes (x0, y0, x1, y1) de cada grupo contiguo de cajas.
+    lo = np.minimum.reduceat(quads.min(axis=1), starts, axis=0)
+    hi = np.maximum.reduceat(quads.max(axis=1), starts, axis=0)
+    return np.rint(np.concatenate([lo, hi], axis=1)).astype(np.int32).tolist()
+
+
+def layout_from_blocks(blocks: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    `lines` y `paragraphs` en orden de lectura a partir de los bloques de una respuesta.
+    Cada línea referencia los índices de sus bloques y cada párrafo los de sus líneas.
+    """
+    if not blocks:
+        return {"lines": [], "paragraphs": []}
+
+    quads = np.asarray([b["box"] for b in blocks], dtype=np.float32).reshape(-1, 4, 2)
+    order, line_ids, para_ids = reading_order(quads)
+    texts = [str(blocks[i]["text"] or "") for i in order.tolist()]
+    line_texts = _line_texts(texts, line_ids)
+
+    line_starts = np.flatnonzero(np.diff(line_ids, prepend=-1))
+    line_blocks = np.split(order, line_starts[1:])
+    lines = [
+        {"text": text, "box": box, "blocks": members.tolist()}
+        for text, box, members in zip(line_texts, _bbox(quads[order], line_starts), line_blocks)
+    ]
+
+    para_starts = np.flatnonzero(np.diff(para_ids, prepend=-1))
+    para_lines = np.split(np.arange(len(lines)), para_starts[1:])
+    # Caja del párrafo: desde el primer bloque de su primera línea hasta el último de la última.
+    para_box_starts = line_starts[para_starts]
+    paragraphs = [
+        {"text": "\n".join(line_texts[j] for j in members if line_texts[j]), "box": box, "lines": members.tolist()}
+        for box, members in zip(_bbox(quads[order], para_box_starts), para_lines)
+    ]
+    return {"lines": lines, "paragraphs": paragraphs}
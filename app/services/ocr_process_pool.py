@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+from importlib import import_module
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+import multiprocessing
+import threading
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+from app.core.metrics import record_stages, start_request_timings
+from app.services.ocr_extract import extract_from_bytes
+from app.services.ocr_pool import OcrInstancePool
+from app.services.ocr_registry import rss_bytes
+from app.services.ocr_stages import ALL_STAGES, OcrStages
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINE_FACTORY = "app.services.ocr_process_pool:build_worker_engine"
+
+_MIN_SHM_BYTES = 8 * 1024 * 1024
+_RESTART_BACKOFF_SECONDS = 1.0
+
+
+def build_worker_engine(**engine_kwargs: Any):
+    # Cada proceso ya es una unidad de paralelismo: una sola instancia PaddleOCR por worker.
+    # El warm-up corre en el worker antes de avisar "ready" (también al reiniciarlo tras un crash).
+    from app.services.engine_loader import parse_sizes, warmup_images
+    from app.services.ocr_engine import PaddleOcrEngine
+
+    engine = PaddleOcrEngine(pool_size=1, **engine_kwargs)
+    if settings.ocr_warmup:
+        engine.warmup(warmup_images(parse_sizes(settings.ocr_warmup_sizes)))
+    return engine
+
+
+def _load_factory(path: str) -> Callable[[], Any]:
+    module_name, _, attr = path.partition(":")
+    return getattr(import_module(module_name), attr)
+
+
+def _worker_main(conn: Connection, factory_path: str, factory_kwargs: Dict[str, Any]) -> None:
+    """
+    Loop del proceso worker: carga el engine una vez y atiende imágenes que llegan
+    por memoria compartida (solo viaja por el pipe el nombre/shape/dtype, no los píxeles).
+    """
+    engine = _load_factory(factory_path)(**factory_kwargs)
+    conn.send(("ready", None))
+
+    shm: Optional[shared_memory.SharedMemory] = None
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+
+        shm_name, shape, dtype, kwargs = msg
+        if shm is None or shm.name != shm_name:
+            if shm is not None:
+                shm.close()
+            shm = shared_memory.SharedMemory(name=shm_name)
+
+        img = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        try:
+            # Las etapas medidas en el worker viajan con el resultado y se registran en el proceso API.
+            timings = start_request_timings()
+            conn.send(("ok", (engine.extract(img, **kwargs), timings)))
+        except AppException as e:
+            conn.send(("app_error", (e.status, e.code, e.title, e.detail)))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+        finally:
+            del img
+
+    if shm is not None:
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+
+class _WorkerSlot:
+    """Un proceso worker + su pipe + su segmento de memoria compartida (reutilizado entre requests)."""
+
+    def __init__(
+        self,
+        ctx,
+        factory_path: str,
+        index: int,
+        startup_timeout: float,
+        factory_kwargs: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._ctx = ctx
+        self._factory_path = factory_path
+        self._factory_kwargs = factory_kwargs or {}
+        self._index = index
+        self._startup_timeout = startup_timeout
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self.restarts = 0
+        self._start()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._proc.pid
+
+    def _start(self) -> None:
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._proc = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self._factory_path, self._factory_kwargs),
+            name=f"ocr-worker-{self._index}",
+            daemon=True,
+        )
+        self._proc.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._ready = False
+
+    def wait_ready(self) -> None:
+        if self._ready:
+            return
+        if not self._conn.poll(self._startup_timeout):
+            raise TimeoutError("OCR worker did not become ready")
+        kind, _ = self._conn.recv()
+        if kind != "ready":
+            raise RuntimeError("OCR worker failed to start")
+        self._ready = True
+
+    def restart(self) -> None:
+        self.kill()
+        self.restarts += 1
+        self._start()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def kill(self) -> None:
+        try:
+            self._conn.close()
+        except OSError:
+            pass
+        if self._proc.is_alive():
+            self._proc.kill()
+        self._proc.join(timeout=5)
+
+    def close(self) -> None:
+        if self._proc.is_alive():
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+            self._proc.join(timeout=5)
+        self.kill()
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _buffer_for(self, nbytes: int) -> shared_memory.SharedMemory:
+        if self._shm is None or self._shm.size < nbytes:
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+            size = max(nbytes, _MIN_SHM_BYTES, 2 * (self._shm.size if self._shm else 0))
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        return self._shm
+
+    def run(self, img: np.ndarray, kwargs: Dict[str, Any], timeout: float) -> Tuple[str, Any]:
+        self.wait_ready()
+
+        img = np.ascontiguousarray(img)
+        shm = self._buffer_for(img.nbytes)
+        dst = np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)
+        dst[...] = img
+        del dst
+
+        self._conn.send((shm.name, img.shape, img.dtype.str, kwargs))
+        if not self._conn.poll(timeout):
+            raise TimeoutError("OCR worker timed out")
+        return self._conn.recv()
+
+
+class ProcessOcrEngine:
+    """
+    Ejecuta el OCR en procesos worker (cada uno con su engine precargado) para
+    saltarse el GIL. La imagen se decodifica aquí y viaja por memoria compartida;
+    si un worker muere o se cuelga se mata y se levanta otro.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int,
+        timeout: float,
+        startup_timeout: float,
+        engine_factory: str = DEFAULT_ENGINE_FACTORY,
+        engine_kwargs: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._timeout = timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = [
+            _WorkerSlot(self._ctx, engine_factory, i, startup_timeout, engine_kwargs) for i in range(workers)
+        ]
+
+        for slot in self._slots:
+            slot.wait_ready()
+
+        # El pool solo reparte slots; la espera acotada y sus métricas vienen de ahí.
+        slots = iter(self._slots)
+        self._pool: OcrInstancePool[_WorkerSlot] = OcrInstancePool(
+            lambda: next(slots),
+            size=workers,
+            timeout=timeout,
+        )
+
+        self._stats_lock = threading.Lock()
+        self._crashes = 0
+        self._hangs = 0
+        self._closed = False
+
+    def extract_from_bytes(self, data: bytes, *, preprocess: bool, **options: Any) -> Dict[str, Any]:
+        # Se decodifica en el proceso de la API (ver ocr_extract); solo `extract` va al worker.
+        keep_side = settings.ocr_max_side if preprocess else None
+        return extract_from_bytes(self.extract, data, keep_side=keep_side, preprocess=preprocess, **options)
+
+    def extract(
+        self,
+        img_bgr: np.ndarray,
+        *,
+        preprocess: bool,
+        return_blocks: bool,
+        stages: OcrStages = ALL_STAGES,
+        regions: Optional[np.ndarray] = None,
+    ) -> Dict[str, Any]:
+        kwargs = {
+            "preprocess": preprocess,
+            "return_blocks": return_blocks,
+            "stages": stages,
+            "regions": regions,
+        }
+
+        with self._pool.acquire() as slot:
+            try:
+                kind, payload = slot.run(img_bgr, kwargs, self._timeout)
+            except TimeoutError:
+                with self._stats_lock:
+                    self._hangs += 1
+                logger.warning("OCR worker %s timed out, restarting", slot.pid)
+                self._restart(slot)
+                raise AppException(
+                    504,
+                    ErrorCodes.OCR_TIMEOUT_504,
+                    "OCR timeout",
+                    f"El OCR no terminó en {self._timeout:.0f}s",
+                )
+            except (EOFError, OSError):
+                with self._stats_lock:
+                    self._crashes += 1
+                logger.warning("OCR worker %s crashed, restarting", slot.pid)
+                self._restart(slot)
+                raise AppException(
+                    500,
+                    ErrorCodes.OCR_INTERNAL_500,
+                    "Internal error",
+                    "El proceso OCR terminó inesperadamente",
+                )
+
+        if kind == "ok":
+            result, timings = payload
+            record_stages(timings)
+            return result
+        if kind == "app_error":
+            raise AppException(*payload)
+        raise RuntimeError(f"OCR worker error: {payload}")
+
+    def _restart(self, slot: _WorkerSlot) -> None:
+        # Llamar dentro de acquire(). El slot queda fuera del pool hasta que el worker nuevo cargó el
+        # modelo (y el warm-up): ningún request espera esa carga fuera de su propio timeout.
+        self._pool.hold(slot)
+        slot.restart()
+        threading.Thread(target=self._return_when_ready, args=(slot,), name="ocr-worker-restart", daemon=True).start()
+
+    def _return_when_ready(self, slot: _WorkerSlot) -> None:
+        while not self._closed:
+            try:
+                slot.wait_ready()
+                break
+            except (TimeoutError, RuntimeError, EOFError, OSError):
+                if self._closed:
+                    return
+                logger.warning("Restarted OCR worker %s did not become ready, retrying", slot.pid)
+                time.sleep(_RESTART_BACKOFF_SECONDS)
+                slot.restart()
+        if not self._closed:
+            self._pool.put_back(slot)
+
+    def memory_bytes(self) -> int:
+        """RSS sumado de los workers (la memoria del engine vive ahí, no en el proceso API)."""
+        return sum(rss_bytes(str(s.pid)) for s in self._slots if s.pid is not None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            crashes, hangs = self._crashes, self._hangs
+        return {
+            "mode": "process",
+            "pool": self._pool.stats(),
+            "workers": [{"pid": s.pid, "restarts": s.restarts, "ready": s.ready} for s in self._slots],
+            "crashes": crashes,
+            "hangs": hangs,
+        }
+
+    def close(self) -> None:
+        self._closed = True
+        for slot in self._slots:
+            slot.close()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import Any, List, Optional
+import json
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+
+
+def _invalid(detail: str) -> AppException:
+    return AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", detail)
+
+
+def _as_quad(region: Any, index: int) -> List[List[float]]:
+    try:
+        arr = np.asarray(region, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise _invalid(f"regions[{index}]: se espera [x1, y1, x2, y2] o 4 puntos [[x, y], ...]")
+    # json.loads acepta NaN/Infinity, y toda comparación con NaN es False: se rechazan antes de validar.
+    if not np.isfinite(arr).all():
+        raise _invalid(f"regions[{index}]: las coordenadas deben ser números finitos")
+
+    if arr.shape == (4,):
+        x1, y1, x2, y2 = arr.tolist()
+        if x2 <= x1 or y2 <= y1:
+            raise _invalid(f"regions[{index}]: rectángulo vacío")
+        return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+    if arr.shape == (4, 2):
+        return arr.tolist()
+    raise _invalid(f"regions[{index}]: se espera [x1, y1, x2, y2] o 4 puntos [[x, y], ...]")
+
+
+def parse_regions(raw: Any) -> Optional[np.ndarray]:
+    """
+    Regiones en coordenadas de la imagen original: rectángulos [x1, y1, x2, y2] o quads
+    [[x, y] x 4] en sentido horario desde arriba a la izquierda. Acepta la lista o su JSON.
+    Devuelve un array (n, 4, 2) float32, o None si no vinieron regiones.
+    """
+    if raw is None or raw == "":
+        return None
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raise _invalid("regions debe ser una lista JSON")
+    if not isinstance(raw, list) or not raw:
+        raise _invalid("regions debe ser una lista no vacía")
+    if len(raw) > settings.ocr_max_regions:
+        raise _invalid(f"Máximo {settings.ocr_max_regions} regiones por request")
+
+    return np.asarray([_as_quad(region, i) for i, region in enumerate(raw)], dtype=np.float32)
+
+
+def check_regions_within(regions: np.ndarray, height: int, width: int) -> None:
+    """
+    Valida las regiones contra el tamaño de la imagen decodificada: una región que cae entera fuera
+    de la imagen es un error del cliente (recortada quedaría vacía y devolvería un resultado vacío).
+    """
+    for i, quad in enumerate(regions):
+        x1, y1 = quad.min(axis=0)
+        x2, y2 = quad.max(axis=0)
+        if x2 <= 0 or y2 <= 0 or x1 >= width or y1 >= height:
+            raise _invalid(f"regions[{i}]: fuera de la imagen ({width}x{height})")
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set
+import logging
+import os
+import threading
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+from app.core.metrics import ENGINE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+
+def rss_bytes(pid: str = "self") -> int:
+    """Memoria residente de un proceso (Linux, /proc); 0 si no se puede medir."""
+    try:
+        with open(f"/proc/{pid}/statm", "r", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def supported_langs() -> Set[str]:
+    return settings.ocr_langs | {settings.ocr_lang}
+
+
+def resolve_lang(lang: Optional[str]) -> str:
+    """Idioma pedido (o OCR_LANG si no viene); 400 si no está en OCR_LANGS."""
+    value = (lang or "").strip().lower() or settings.ocr_lang
+    if value not in supported_langs():
+        raise AppException(
+            400,
+            ErrorCodes.OCR_VALIDATION_400,
+            "Validation failed",
+            f"Idioma no soportado: {value} (disponibles: {', '.join(sorted(supported_langs()))})",
+        )
+    return value
+
+
+class _Entry:
+    def __init__(self, engine: Any, size: int) -> None:
+        self.engine = engine
+        self.size = size
+        self.users = 0
+        self.evicted = False
+
+
+class OcrEngineRegistry:
+    """
+    Engines OCR de otros idiomas, cargados bajo demanda (el de OCR_LANG vive aparte y nunca se descarga).
+    LRU acotado por memoria: al pasar `max_bytes` se desalojan los menos usados; un engine desalojado
+    con requests en curso se cierra cuando termina el último. El tamaño de cada engine es `engine_bytes`
+    si se fijó, o si no lo que reporta su `memory_bytes()` (no el RSS del proceso, que incluye lo que
+    asignan los requests en curso).
+    """
+
+    def __init__(self, build: Callable[[str], Any], *, max_bytes: int, engine_bytes: int = 0) -> None:
+        self._build = build
+        self._max_bytes = max_bytes
+        self._engine_bytes = engine_bytes
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._engines: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._evicted: Dict[int, _Entry] = {}  # desalojados que todavía tienen requests en curso
+        self._bytes = 0
+        self._stats = {"hits": 0, "loads": 0, "evictions": 0, "load_failures": 0}
+
+    def acquire(self, lang: str) -> Any:
+        """Engine de `lang` (lo carga si hace falta). Bloqueante: llamar desde un thread y luego `release`."""
+        entry = self._take(lang)
+        if entry is not None:
+            return entry.engine
+
+        with self._load_lock:
+            # Otro thread pudo cargarlo mientras se esperaba el lock.
+            entry = self._take(lang, count_hit=False)
+            if entry is not None:
+                return entry.engine
+
+            try:
+                engine = self._build(lang)
+            except Exception:
+                with self._lock:
+                    self._stats["load_failures"] += 1
+                raise
+            measure = getattr(engine, "memory_bytes", None)
+            size = self._engine_bytes or (measure() if callable(measure) else 0)
+
+            with self._lock:
+                entry = _Entry(engine, size)
+                entry.users = 1
+                self._engines[lang] = entry
+                self._bytes += size
+                self._stats["loads"] += 1
+                ENGINE_EVENTS.labels("load").inc()
+                to_close = self._evict_over_budget(keep=lang)
+            logger.info("Loaded OCR engine for %s (%.0f MiB)", lang, size / 2**20)
+
+        for evicted in to_close:
+            _close(evicted)
+        return engine
+
+    def release(self, lang: str, engine: Any) -> None:
+        with self._lock:
+            entry = self._engines.get(lang)
+            if entry is None or entry.engine is not engine:
+                entry = self._evicted.get(id(engine))
+                if entry is None:
+                    return
+            entry.users -= 1
+            close_now = entry.evicted and entry.users == 0
+            if close_now:
+                del self._evicted[id(engine)]
+        if close_now:
+            _close(engine)
+
+    def _take(self, lang: str, *, count_hit: bool = True) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._engines.get(lang)
+            if entry is None:
+                return None
+            self._engines.move_to_end(lang)
+            entry.users += 1
+            if count_hit:
+                self._stats["hits"] += 1
+                ENGINE_EVENTS.labels("hit").inc()
+            return entry
+
+    def _evict_over_budget(self, *, keep: str) -> List[Any]:
+        # Llamar con self._lock tomado. Devuelve los engines que se pueden cerrar ya (sin usuarios).
+        to_close: List[Any] = []
+        for lang in list(self._engines):
+            if self._max_bytes <= 0 or self._bytes <= self._max_bytes:
+                break
+            if lang == keep:
+                continue
+            entry = self._engines.pop(lang)
+            self._bytes -= entry.size
+            self._stats["evictions"] += 1
+            ENGINE_EVENTS.labels("evict").inc()
+            entry.evicted = True
+            logger.info("Evicted OCR engine for %s", lang)
+            if entry.users == 0:
+                to_close.append(entry.engine)
+            else:
+                self._evicted[id(entry.engine)] = entry
+        return to_close
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "loaded": {lang: {"bytes": e.size, "in_use": e.users} for lang, e in self._engines.items()},
+                "draining": len(self._evicted),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+            }
+
+    def close(self) -> None:
+        # Al apagar también se cierran los desalojados que aún no terminaron de drenar.
+        with self._lock:
+            engines = [e.engine for e in self._engines.values()] + [e.engine for e in self._evicted.values()]
+            self._engines.clear()
+            self._evicted.clear()
+            self._bytes = 0
+        for engine in engines:
+            _close(engine)
+
+
+def _close(engine: Any) -> None:
+    close = getattr(engine, "close", None)
+    if callable(close):
+        close()
+
+
+def create_engine_registry(state: Any) -> Optional[OcrEngineRegistry]:
+    if not settings.ocr_langs - {settings.ocr_lang}:
+        return None
+
+    def build(lang: str) -> Any:
+        if settings.ocr_execution_mode == "process":
+            from app.services.ocr_process_pool import ProcessOcrEngine
+
+            return ProcessOcrEngine(
+                workers=settings.ocr_pool_size,
+                timeout=settings.ocr_process_timeout_seconds,
+                startup_timeout=settings.ocr_process_startup_seconds,
+                engine_kwargs={"lang": lang},
+            )
+
+        from app.services.ocr_engine import PaddleOcrEngine
+
+        # El detector se comparte con el engine de OCR_LANG cuando usan el mismo modelo.
+        default = getattr(state, "ocr_engine", None)
+        return PaddleOcrEngine(lang=lang, detector_donor=default if isinstance(default, PaddleOcrEngine) else None)
+
+    return OcrEngineRegistry(
+        build,
+        max_bytes=settings.ocr_engines_max_mb * 1024 * 1024,
+        engine_bytes=settings.ocr_engine_mb * 1024 * 1024,
+    )
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+import time
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import stage
+from app.services.admission import deadline_exceeded
+from app.services.image_preprocess import default_preprocess_config
+from app.services.near_cache import NearDuplicateCache, NearDuplicateLookup
+from app.services.ocr_postprocess import layout_from_blocks
+from app.services.ocr_stages import ALL_STAGES, OcrStages
+from app.services.ocr_tiling import extract_tiled_from_bytes, tile_size
+from app.services.ocr_triage import default_triage_config
+from app.services.result_cache import OcrResultCache, cache_key
+
+
+def create_result_cache() -> Optional[OcrResultCache]:
+    if settings.ocr_cache_max_mb <= 0:
+        return None
+    return OcrResultCache(
+        max_bytes=settings.ocr_cache_max_mb * 1024 * 1024,
+        disk_path=Path(settings.ocr_cache_dir) / "ocr_results.sqlite3" if settings.ocr_cache_dir else None,
+        disk_max_bytes=settings.ocr_cache_disk_max_mb * 1024 * 1024,
+    )
+
+
+def _before_deadline(compute: Callable[[], Dict[str, Any]], deadline: Optional[float]) -> Callable[[], Dict[str, Any]]:
+    # Se revisa justo antes de la inferencia: el trabajo pudo esperar en el threadpool o en el pool de engines.
+    if deadline is None:
+        return compute
+
+    def run() -> Dict[str, Any]:
+        if time.monotonic() >= deadline:
+            raise deadline_exceeded()
+        return compute()
+
+    return run
+
+
+async def _wait_for_engine(state: Any) -> None:
+    # Durante el arranque (carga + warm-up) se espera al engine, acotado como la espera por una instancia.
+    loader = getattr(state, "engine_loader", None)
+    if loader is not None:
+        await loader.wait(settings.ocr_pool_timeout_seconds)
+
+
+def _on_engine(state: Any, lang: str, call: Callable[[Any], Dict[str, Any]]) -> Callable[[], Dict[str, Any]]:
+    """
+    `call(engine)` con el engine del idioma. Los de OCR_LANGS se toman del registry dentro del cómputo
+    (ya en el threadpool): un hit del cache no carga el modelo, y la carga no bloquea el event loop.
+    """
+    registry = getattr(state, "engine_registry", None)
+    if registry is None or lang == settings.ocr_lang:
+        engine = state.ocr_engine
+        return lambda: call(engine)
+
+    def run() -> Dict[str, Any]:
+        engine = registry.acquire(lang)
+        try:
+            return call(engine)
+        finally:
+            registry.release(lang, engine)
+
+    return run
+
+
+async def _run_cached(
+    state: Any,
+    key_data: bytes,
+    compute: Callable[[], Dict[str, Any]],
+    *,
+    preprocess: bool,
+    return_blocks: bool,
+    stages: OcrStages,
+    lang: str,
+    near: Optional[NearDuplicateLookup] = None,
+    **key_extra: Any,
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    loader = getattr(state, "engine_loader", None)
+    cache: Optional[OcrResultCache] = getattr(state, "result_cache", None)
+    if cache is None:
+        out = await run_in_threadpool(compute)
+        if loader is not None:
+            loader.record_request(time.perf_counter() - t0)
+        return out
+
+    params: Dict[str, Any] = {
+        "preprocess": preprocess,
+        "blocks": return_blocks,
+        "stages": asdict(stages),
+        "lang": lang,
+        "drop_score": settings.ocr_drop_score,
+        "pp": asdict(default_preprocess_config()),
+        **key_extra,
+    }
+    key = cache_key(key_data, **params)
+    store = None
+    if near is not None:
+        # Los casi-duplicados solo se comparten entre requests con los mismos parámetros. Un hit es el
+        # resultado de otra imagen: no se guarda bajo la clave exacta de esta (la verían requests sin opt-in).
+        near.key, near.variant = key, cache_key(b"", **params)
+        store = _not_near_duplicate
+    out, info = await run_in_threadpool(cache.get_or_compute, key, compute, store)
+    near_info = out.pop("near_duplicate", None)
+    if near_info is not None and info["status"] == "miss":
+        info = {"status": "near_hit", **near_info}
+    out["cache"] = info
+    if loader is not None:
+        loader.record_request(time.perf_counter() - t0)
+    return out
+
+
+def _not_near_duplicate(out: Dict[str, Any]) -> bool:
+    return "near_duplicate" not in out
+
+
+def _call_tiled(data: bytes, engine: Any, **kwargs: Any) -> Dict[str, Any]:
+    return extract_tiled_from_bytes(engine, data, **kwargs)
+
+
+def _call_extract_from_bytes(data: bytes, engine: Any, **kwargs: Any) -> Dict[str, Any]:
+    return engine.extract_from_bytes(data, **kwargs)
+
+
+def _call_extract(img: np.ndarray, engine: Any, **kwargs: Any) -> Dict[str, Any]:
+    return engine.extract(img, **kwargs)
+
+
+def _with_layout(call: Callable[[Any], Dict[str, Any]], return_blocks: bool, engine: Any) -> Dict[str, Any]:
+    # `call` pide los bloques siempre: las líneas y párrafos salen de sus cajas.
+    out = call(engine)
+    if "lines" not in out:  # un hit de casi-duplicado ya trae el layout reescalado
+        with stage("postprocess"):
+            out.update(layout_from_blocks(out["blocks"]))
+    if not return_blocks:
+        out["blocks"] = []
+    return out
+
+
+async def run_ocr(
+    state: Any,
+    data: bytes,
+    *,
+    preprocess: bool,
+    return_blocks: bool,
+    stages: OcrStages = ALL_STAGES,
+    regions: Optional[np.ndarray] = None,
+    tiled: bool = False,
+    deadline: Optional[float] = None,
+    lang: Optional[str] = None,
+    release: Optional[Callable[[], None]] = None,
+    layout: bool = False,
+    triage: Optional[bool] = None,
+    near_duplicates: bool = False,
+) -> Dict[str, Any]:
+    """
+    OCR de una imagen (CPU-bound, en threadpool) pasando por el cache de resultados si está activo.
+    Con `regions` solo se reconocen esas zonas (sin detección); con `tiled` se procesa a resolución
+    nativa en tiles paralelos (ver ocr_tiling).
+    Con `deadline` (time.monotonic) el trabajo se descarta con 504 si vence antes de empezar la inferencia.
+    `lang` (ya validado, ver ocr_registry.resolve_lang) elige el engine; None = OCR_LANG.
+    `release` se llama apenas la imagen está decodificada, para soltar los bytes comprimidos
+    (p.ej. UploadBuffer.release) antes de la inferencia.
+    Con `layout` se agregan `lines` y `paragraphs` en orden de lectura (ver ocr_postprocess).
+    `triage` (None = OCR_TRIAGE) descarta antes de la inferencia las imágenes sin texto (ver ocr_triage).
+    Con `near_duplicates` una imagen casi idéntica a una ya procesada (recomprimida, redimensionada)
+    reutiliza ese resultado con las cajas reescaladas (ver near_cache).
+    """
+    lang = lang or settings.ocr_lang
+    await _wait_for_engine(state)
+    key_extra: Dict[str, Any] = {}
+    hooks: Dict[str, Any] = {"on_decoded": release} if release is not None else {}
+    engine_blocks = return_blocks or layout
+    if tiled:
+        call = partial(_call_tiled, data, return_blocks=engine_blocks, stages=stages, **hooks)
+        key_extra["tiled"] = [
+            tile_size(),
+            settings.ocr_tile_overlap,
+            settings.ocr_tile_merge_threshold,
+        ]
+    else:
+        call = partial(
+            _call_extract_from_bytes,
+            data,
+            preprocess=preprocess,
+            return_blocks=engine_blocks,
+            stages=stages,
+            regions=regions,
+            **hooks,
+        )
+        if regions is not None:
+            key_extra["regions"] = regions.tolist()
+        elif (settings.ocr_triage if triage is None else triage) and stages.det:
+            cfg = default_triage_config()
+            call = partial(call, triage=cfg)
+            key_extra["triage"] = [cfg.max_side, cfg.min_std, cfg.min_edge_density, cfg.text_check, cfg.min_text_score]
+    near = None
+    near_cache: Optional[NearDuplicateCache] = getattr(state, "near_cache", None)
+    if near_duplicates and near_cache is not None and not tiled and regions is None:
+        near = near_cache.bind()
+        call = partial(call, near=near)
+    if layout:
+        call = partial(_with_layout, call, return_blocks)
+        key_extra["layout"] = True
+    compute = _before_deadline(_on_engine(state, lang, call), deadline)
+    return await _run_cached(
+        state,
+        data,
+        compute,
+        preprocess=preprocess,
+        return_blocks=return_blocks,
+        stages=stages,
+        lang=lang,
+        near=near,
+        **key_extra,
+    )
+
+
+async def run_ocr_page(
+    state: Any,
+    img: np.ndarray,
+    *,
+    doc_digest: str,
+    page: int,
+    preprocess: bool,
+    return_blocks: bool,
+    lang: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Igual que `run_ocr` para una página ya rasterizada; se cachea por (hash del documento, página)."""
+    lang = lang or settings.ocr_lang
+    await _wait_for_engine(state)
+    call = partial(_call_extract, img, preprocess=preprocess, return_blocks=return_blocks)
+    return await _run_cached(
+        state,
+        doc_digest.encode("ascii"),
+        _on_engine(state, lang, call),
+        preprocess=preprocess,
+        return_blocks=return_blocks,
+        stages=ALL_STAGES,
+        lang=lang,
+        page=page,
+        dpi=settings.ocr_pdf_dpi,
+    )
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from app.core.errors import AppException, ErrorCodes
+
+
+@dataclass(frozen=True)
+class OcrStages:
+    """
+    Etapas del pipeline a ejecutar: detección (`det`), clasificador de ángulo (`cls`) y reconocimiento (`rec`).
+    Sin `rec` se devuelven solo las cajas; sin `det` la imagen entera se reconoce como una única línea.
+    """
+
+    det: bool = True
+    cls: bool = True
+    rec: bool = True
+
+    def validate(self) -> "OcrStages":
+        if not self.det and not self.rec:
+            raise AppException(
+                400,
+                ErrorCodes.OCR_VALIDATION_400,
+                "Validation failed",
+                "Se necesita al menos una etapa: det o rec",
+            )
+        return self
+
+
+ALL_STAGES = OcrStages()
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import contextvars
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.errors import AppException, ErrorCodes
+from app.services.image_decode import decode_image_for_ocr
+from app.services.ocr_stages import ALL_STAGES, OcrStages
+from app.services.ocr_postprocess import build_result
+
+Tile = Tuple[int, int, int, int]  # x0, y0, x1, y1
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _tile_executor() -> ThreadPoolExecutor:
+    # Un solo executor para todos los requests tiled: acota los tiles en vuelo a la capacidad del engine.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ocr_tile_concurrency or settings.ocr_pool_size,
+                thread_name_prefix="ocr-tile",
+            )
+        return _executor
+
+
+def _starts(length: int, size: int, overlap: int) -> List[int]:
+    if length <= size:
+        return [0]
+    step = size - overlap
+    starts = list(range(0, length - size, step))
+    starts.append(length - size)  # el último tile se alinea al borde, sin tiles angostos
+    return starts
+
+
+def tile_size() -> int:
+    """
+    Lado de los tiles: OCR_TILE_SIZE sin pasar de OCR_DET_LIMIT_SIDE_LEN. Un tile más grande lo achicaría
+    el propio detector (limit_type=max) y se perdería la resolución nativa que busca el modo tiled.
+    """
+    return min(settings.ocr_tile_size, settings.ocr_det_limit_side_len)
+
+
+def tile_grid(h: int, w: int, size: int, overlap: int) -> List[Tile]:
+    """Tiles de `size` x `size` que cubren la imagen, solapados `overlap` px entre vecinos."""
+    if not 0 <= overlap < size:
+        raise ValueError("overlap must be in [0, size)")
+    return [
+        (x, y, min(x + size, w), min(y + size, h))
+        for y in _starts(h, size, overlap)
+        for x in _starts(w, size, overlap)
+    ]
+
+
+def merge_overlaps(quads: np.ndarray, tile_ids: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    NMS entre tiles sobre los rectángulos envolventes de las cajas (vectorizado por paso).
+    Usa intersección / área de la caja menor en vez de IoU: una línea cortada por el borde de un tile
+    queda contenida en la misma línea completa del tile vecino, con IoU bajo pero solapamiento total.
+    Se prioriza la caja más grande (la completa); nunca se suprimen cajas del mismo tile.
+    Devuelve los índices a conservar.
+    """
+    if len(quads) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    x1, y1 = quads[:, :, 0].min(axis=1), quads[:, :, 1].min(axis=1)
+    x2, y2 = quads[:, :, 0].max(axis=1), quads[:, :, 1].max(axis=1)
+    areas = np.maximum(x2 - x1, 1e-6) * np.maximum(y2 - y1, 1e-6)
+
+    order = np.argsort(-areas, kind="stable")
+    keep: List[int] = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        overlap = iw * ih / np.minimum(areas[i], areas[rest])
+
+        duplicate = (overlap >= threshold) & (tile_ids[rest] != tile_ids[i])
+        order = rest[~duplicate]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def extract_tiled(
+    engine: Any,
+    img_bgr: np.ndarray,
+    *,
+    return_blocks: bool,
+    stages: OcrStages = ALL_STAGES,
+) -> Dict[str, Any]:
+    """
+    OCR a resolución nativa: tiles solapados procesados en paralelo (hasta OCR_TILE_CONCURRENCY a la vez),
+    cajas llevadas a coordenadas originales y duplicados de las zonas de solapamiento fusionados.
+    """
+    h, w = img_bgr.shape[:2]
+    size, overlap = tile_size(), settings.ocr_tile_overlap
+    tiles = tile_grid(h, w, size, overlap)
+    if len(tiles) > settings.ocr_tile_max_tiles:
+        raise AppException(
+            413,
+            ErrorCodes.OCR_TOO_LARGE_413,
+            "Payload too large",
+            f"La imagen ({w}x{h}) requiere {len(tiles)} tiles; el máximo es {settings.ocr_tile_max_tiles}",
+        )
+
+    executor = _tile_executor()
+    # Cada tile corre en una copia del contexto: sus etapas suman al Server-Timing del request.
+    futures = [
+        executor.submit(
+            contextvars.copy_context().run,
+            engine.extract,
+            np.ascontiguousarray(img_bgr[y0:y1, x0:x1]),
+            preprocess=False,
+            return_blocks=True,
+            stages=stages,
+        )
+        for x0, y0, x1, y1 in tiles
+    ]
+
+    quads: List[np.ndarray] = []
+    tile_ids: List[int] = []
+    found: List[Tuple[str, Optional[float]]] = []
+    try:
+        for tile_id, ((x0, y0, _, _), fut) in enumerate(zip(tiles, futures)):
+            blocks = fut.result()["blocks"]
+            quads.append(np.asarray([b["box"] for b in blocks], dtype=np.float32).reshape(-1, 4, 2) + (x0, y0))
+            tile_ids.extend([tile_id] * len(blocks))
+            found.extend((b["text"], b["confidence"]) for b in blocks)
+    except BaseException:
+        for fut in futures:
+            fut.cancel()
+        raise
+
+    all_quads = np.concatenate(quads) if quads else np.zeros((0, 4, 2), dtype=np.float32)
+    keep = merge_overlaps(all_quads, np.asarray(tile_ids), settings.ocr_tile_merge_threshold)
+
+    out = build_result(
+        all_quads[keep],
+        [found[i][0] for i in keep],
+        [found[i][1] for i in keep],
+        return_blocks=return_blocks,
+    )
+    return {
+        **out,
+        "preprocess": {
+            "original_shape": {"h": h, "w": w},
+            "tiling": {
+                "tiles": len(tiles),
+                "tile_size": size,
+                "overlap": overlap,
+                "merged": len(found) - len(keep),
+            },
+        },
+    }
+
+
+def extract_tiled_from_bytes(
+    engine: Any,
+    data: bytes,
+    *,
+    return_blocks: bool,
+    stages: OcrStages = ALL_STAGES,
+    on_decoded: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    img, _ = decode_image_for_ocr(data)  # resolución completa: es el objetivo del modo tiled
+    if on_decoded is not None:
+        on_decoded()
+    return extract_tiled(engine, img, return_blocks=return_blocks, stages=stages)
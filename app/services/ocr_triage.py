@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Optional
+import logging
+import random
+import threading
+import time
+import uuid
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import TRIAGE, stage
+from app.core.trace import get_trace_id
+
+logger = logging.getLogger(__name__)
+
+PASSED = "passed"
+SKIPPED = "skipped"
+AUDITED = "audited"
+
+_EDGE_LEVEL = 32  # gradiente morfológico (niveles de gris) a partir del cual un píxel es borde
+_RECENT = 50
+
+
+@dataclass(frozen=True)
+class TriageConfig:
+    max_side: int
+    min_std: float
+    min_edge_density: float
+    text_check: bool
+    min_text_score: float
+    audit_rate: float
+
+
+def default_triage_config() -> TriageConfig:
+    return TriageConfig(
+        max_side=settings.ocr_triage_max_side,
+        min_std=settings.ocr_triage_min_std,
+        min_edge_density=settings.ocr_triage_min_edge_density,
+        text_check=settings.ocr_triage_text_check,
+        min_text_score=settings.ocr_triage_min_text_score,
+        audit_rate=settings.ocr_triage_audit_rate,
+    )
+
+
+def _small_gray(img_bgr: np.ndarray, max_side: int) -> np.ndarray:
+    gray = img_bgr if img_bgr.ndim == 2 else cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape[:2]
+    scale = max_side / float(max(h, w))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def triage_scores(img_bgr: np.ndarray, cfg: TriageConfig) -> Dict[str, float]:
+    """
+    Medidas baratas sobre una copia chica en grises: contraste (desvío), densidad de bordes y,
+    si está activo, la fracción de la imagen cubierta por trazos con forma de texto.
+    """
+    gray = _small_gray(img_bgr, cfg.max_side)
+    scores = {"std": float(gray.std())}
+
+    grad = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    edges = (grad >= _EDGE_LEVEL).astype(np.uint8)
+    scores["edge_density"] = float(edges.mean())
+
+    if cfg.text_check:
+        # Las letras de una palabra se funden en un componente ancho y bajo al cerrar en horizontal;
+        # fotos y texturas dan manchas sin esa forma.
+        words = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+        _, _, stats, _ = cv2.connectedComponentsWithStats(words, connectivity=8)
+        w, h, area = stats[1:, 2], stats[1:, 3], stats[1:, 4]
+        textlike = (w >= 1.5 * h) & (h >= 3) & (h <= 0.2 * gray.shape[0]) & (area >= 0.3 * w * h)
+        scores["text_score"] = float(area[textlike].sum()) / gray.size
+    return scores
+
+
+def triage_reason(scores: Dict[str, float], cfg: TriageConfig) -> Optional[str]:
+    """Motivo para no correr OCR ("blank", "no_edges", "no_text") o None si puede haber texto."""
+    if scores["std"] < cfg.min_std:
+        return "blank"
+    if scores["edge_density"] < cfg.min_edge_density:
+        return "no_edges"
+    if "text_score" in scores and scores["text_score"] < cfg.min_text_score:
+        return "no_text"
+    return None
+
+
+class _TriageAudit:
+    """Contadores y últimos falsos negativos (imágenes descartadas en las que el OCR sí encontró texto)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts = {PASSED: 0, SKIPPED: 0, AUDITED: 0, "false_negative": 0}
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=_RECENT)
+
+    def count(self, result: str) -> None:
+        TRIAGE.labels(result).inc()
+        with self._lock:
+            self._counts[result] += 1
+
+    def false_negative(self, img_bgr: np.ndarray, reason: str, scores: Dict[str, float], text: str) -> None:
+        self.count("false_negative")
+        entry = {"traceId": get_trace_id(), "time": time.time(), "reason": reason, "scores": scores, "text": text[:200]}
+        logger.warning("Triage false negative (%s): %s", reason, entry)
+
+        audit_dir = settings.ocr_triage_audit_dir
+        if audit_dir:
+            # Nombre generado: el traceId viene del X-Request-Id del cliente y no debe llegar a una ruta.
+            path = Path(audit_dir) / f"{int(entry['time'])}-{uuid.uuid4().hex}.png"
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                cv2.imwrite(str(path), _small_gray(img_bgr, 1024))
+                entry["file"] = str(path)
+            except (OSError, cv2.error):
+                logger.exception("Could not save triage audit image")
+
+        with self._lock:
+            self._recent.append(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counts, "recent_false_negatives": list(self._recent)}
+
+
+_AUDIT = _TriageAudit()
+
+
+def triage_stats() -> Dict[str, Any]:
+    return {"enabled": settings.ocr_triage, **_AUDIT.stats()}
+
+
+def run_triaged(img_bgr: np.ndarray, cfg: TriageConfig, extract: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Corre `extract` salvo que el triage esté seguro de que no hay texto: en ese caso devuelve un
+    resultado vacío. Una fracción `audit_rate` de esos descartes se procesa igual para medir
+    falsos negativos. El resultado lleva `triage` con el veredicto y las medidas.
+    """
+    with stage("triage"):
+        scores = triage_scores(img_bgr, cfg)
+        reason = triage_reason(scores, cfg)
+
+    info: Dict[str, Any] = {"status": PASSED, "scores": scores}
+    if reason is None:
+        _AUDIT.count(PASSED)
+        out = extract()
+    elif cfg.audit_rate <= 0 or random.random() >= cfg.audit_rate:
+        _AUDIT.count(SKIPPED)
+        info.update(status=SKIPPED, reason=reason)
+        out = {"text": "", "blocks": [], "preprocess": None}
+    else:
+        _AUDIT.count(AUDITED)
+        out = extract()
+        missed = bool(out.get("text") or out.get("blocks"))
+        info.update(status=AUDITED, reason=reason, false_negative=missed)
+        if missed:
+            _AUDIT.false_negative(img_bgr, reason, scores, out.get("text") or "")
+    out["triage"] = info
+    return out
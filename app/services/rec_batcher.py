@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Sequence, Tuple
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RecResult = Tuple[str, float]
+Recognizer = Callable[[List[np.ndarray]], List[RecResult]]
+
+
+class _Pending:
+    __slots__ = ("crops", "results", "remaining", "next_idx", "future")
+
+    def __init__(self, crops: Sequence[np.ndarray]) -> None:
+        self.crops = crops
+        self.results: List[Any] = [None] * len(crops)
+        self.remaining = len(crops)
+        self.next_idx = 0
+        self.future: "Future[List[RecResult]]" = Future()
+
+
+class RecognitionBatcher:
+    """
+    Junta los recortes de texto de requests concurrentes durante una ventana corta
+    (o hasta `max_batch` recortes) y los reconoce en un único batch compartido.
+    Cada request recibe sus resultados en su propio Future, en el mismo orden.
+    """
+
+    def __init__(self, recognize: Recognizer, *, window_ms: float, max_batch: int) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch must be >= 1")
+
+        self._recognize = recognize
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+
+        self._cond = threading.Condition()
+        self._pending: Deque[_Pending] = deque()
+        self._closed = False
+
+        self._stats_lock = threading.Lock()
+        self._by_size: Dict[int, List[float]] = {}  # size -> [batches, seconds]
+
+        self._thread = threading.Thread(target=self._loop, name="ocr-rec-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, crops: Sequence[np.ndarray]) -> "Future[List[RecResult]]":
+        item = _Pending(crops)
+        if not crops:
+            item.future.set_result([])
+            return item.future
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("RecognitionBatcher is closed")
+            self._pending.append(item)
+            self._cond.notify()
+        return item.future
+
+    def recognize(self, crops: Sequence[np.ndarray]) -> List[RecResult]:
+        return self.submit(crops).result()
+
+    def _take(self, batch: List[Tuple[_Pending, int]]) -> None:
+        while self._pending and len(batch) < self._max_batch:
+            head = self._pending[0]
+            while head.next_idx < len(head.crops) and len(batch) < self._max_batch:
+                batch.append((head, head.next_idx))
+                head.next_idx += 1
+            if head.next_idx >= len(head.crops):
+                self._pending.popleft()
+
+    def _collect(self) -> List[Tuple[_Pending, int]]:
+        batch: List[Tuple[_Pending, int]] = []
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+
+            deadline = time.monotonic() + self._window
+            while not self._closed:
+                self._take(batch)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self._max_batch or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+
+            t0 = time.perf_counter()
+            try:
+                results = self._recognize([item.crops[idx] for item, idx in batch])
+            except Exception as e:
+                logger.exception("Batched recognition failed")
+                for item, _ in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+
+            elapsed = time.perf_counter() - t0
+            with self._stats_lock:
+                acc = self._by_size.setdefault(len(batch), [0, 0.0])
+                acc[0] += 1
+                acc[1] += elapsed
+
+            for (item, idx), res in zip(batch, results):
+                if item.future.done():
+                    continue
+                item.results[idx] = res
+                item.remaining -= 1
+                if item.remaining == 0:
+                    item.future.set_result(item.results)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            by_size = {
+                str(size): {
+                    "batches": int(batches),
+                    "seconds": seconds,
+                    "lines_per_second": (size * batches / seconds) if seconds > 0 else 0.0,
+                }
+                for size, (batches, seconds) in sorted(self._by_size.items())
+            }
+        with self._cond:
+            queued = sum(len(p.crops) - p.next_idx for p in self._pending)
+        return {
+            "window_ms": self._window * 1000.0,
+            "max_batch": self._max_batch,
+            "queued_lines": queued,
+            "by_batch_size": by_size,
+        }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            pending = list(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+        for item in pending:
+            if not item.future.done():
+                item.future.set_exception(RuntimeError("RecognitionBatcher is closed"))
+        self._thread.join(timeout=5)
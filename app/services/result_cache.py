@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from app.core.serialization import dumps, loads
+
+CacheInfo = Dict[str, Any]
+
+
+def cache_key(data: bytes, **params: Any) -> str:
+    """sha256 de los bytes de la imagen + todos los parámetros que afectan al resultado."""
+    h = hashlib.sha256(data)
+    h.update(json.dumps(params, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class _DiskTier:
+    """Tier persistente en SQLite (sobrevive reinicios), acotado por bytes con desalojo LRU."""
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results(accessed)")
+        self._bytes = int(self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0])
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            return bytes(row[0])
+
+    def put(self, key: str, value: bytes) -> None:
+        with self._lock:
+            old = self._db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                self._bytes -= int(old[0])
+            self._db.execute(
+                "INSERT OR REPLACE INTO results(key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self._bytes += len(value)
+
+            while self._bytes > self._max_bytes:
+                row = self._db.execute("SELECT key, size FROM results ORDER BY accessed LIMIT 1").fetchone()
+                if row is None:
+                    break
+                self._db.execute("DELETE FROM results WHERE key = ?", (row[0],))
+                self._bytes -= int(row[1])
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = int(self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0])
+            return {"entries": entries, "bytes": self._bytes, "max_bytes": self._max_bytes, "evictions": self.evictions}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class OcrResultCache:
+    """
+    Cache de resultados OCR direccionado por contenido: LRU en memoria (acotado por bytes)
+    + tier opcional en disco. Requests idénticos en vuelo comparten un único cómputo.
+    Los resultados se guardan serializados (JSON compacto), así cada hit devuelve una copia independiente.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int,
+        disk_path: Optional[Path] = None,
+        disk_max_bytes: int = 0,
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, "Future[bytes]"] = {}
+        self._disk = _DiskTier(disk_path, disk_max_bytes) if disk_path else None
+
+        self._hits: Dict[str, int] = {"memory": 0, "disk": 0, "inflight": 0}
+        self._misses = 0
+        self._evictions = 0
+
+    def _remember(self, key: str, value: bytes) -> None:
+        # Llamar con self._lock tomado.
+        if len(value) > self._max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._memory[key] = value
+        self._bytes += len(value)
+        while self._bytes > self._max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._evictions += 1
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Dict[str, Any]],
+        store: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Tuple[Dict[str, Any], CacheInfo]:
+        """
+        Resultado bajo `key`: memoria, request en curso, disco o `compute()`. Con `store`, un resultado
+        computado para el que devuelve False no se guarda (p.ej. un hit de casi-duplicado: es de otra
+        imagen), y quien esperaba el mismo key lo computa por su cuenta.
+        """
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._hits["memory"] += 1
+                return loads(value), {"status": "hit", "tier": "memory"}
+
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                owner: "Future[bytes]" = Future()
+                self._inflight[key] = owner
+
+        if waiting is not None:
+            value = waiting.result()
+            if value is None:  # el dueño no guardó su resultado
+                return self.get_or_compute(key, compute, store)
+            with self._lock:
+                self._hits["inflight"] += 1
+            return loads(value), {"status": "hit", "tier": "inflight"}
+
+        try:
+            value = self._disk.get(key) if self._disk is not None else None
+            if value is not None:
+                info: CacheInfo = {"status": "hit", "tier": "disk"}
+            else:
+                out = compute()
+                if store is not None and not store(out):
+                    with self._lock:
+                        self._inflight.pop(key, None)
+                    owner.set_result(None)
+                    return out, {"status": "miss"}
+                value = dumps(out)
+                info = {"status": "miss"}
+                if self._disk is not None:
+                    self._disk.put(key, value)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            owner.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._remember(key, value)
+            if info["status"] == "hit":
+                self._hits["disk"] += 1
+            else:
+                self._misses += 1
+        owner.set_result(value)
+        return loads(value), info
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Resultado guardado bajo `key` (memoria o disco) sin computarlo ni contarlo como hit/miss."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+        if value is None and self._disk is not None:
+            value = self._disk.get(key)
+        return loads(value) if value is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {
+                "hits": dict(self._hits),
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "memory": {"entries": len(self._memory), "bytes": self._bytes, "max_bytes": self._max_bytes},
+                "inflight": len(self._inflight),
+            }
+        if self._disk is not None:
+            out["disk"] = self._disk.stats()
+        return out
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
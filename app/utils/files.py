@@ -1,18 +1,31 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Optional, Tuple, Union
 from uuid import uuid4
+import io
+import mmap
 
 from fastapi import UploadFile
 
-from app.core.errors import AppError, ErrorCodes
+from app.core.errors import AppException, ErrorCodes
 
 CHUNK_SIZE = 1024 * 1024  # 1MB
 
+
 def _ext(filename: str) -> str:
     return Path(filename).suffix.lower()
 
+
+def too_large(max_bytes: int) -> AppException:
+    return AppException(
+        413,
+        ErrorCodes.OCR_TOO_LARGE_413,
+        "Payload too large",
+        f"El archivo excede {max_bytes // (1024 * 1024)}MB",
+    )
+
+
 async def save_upload_file(
     upload: UploadFile,
     dst_dir: Path,
@@ -20,11 +33,11 @@ async def save_upload_file(
     allowed_ext: set[str],
 ) -> Tuple[Path, str]:
     if not upload.filename:
-        raise AppError(400, ErrorCodes.VALIDATION_400, "Invalid request", "File has no name")
+        raise AppException(400, ErrorCodes.OCR_VALIDATION_400, "Validation failed", "Archivo sin nombre")
 
     ext = _ext(upload.filename)
     if ext not in allowed_ext:
-        raise AppError(415, ErrorCodes.UNSUPPORTED_415, "Unsupported media type", f"Unsupported file extension: {ext}")
+        raise AppException(415, ErrorCodes.OCR_UNSUPPORTED_415, "Unsupported media type", f"Formato no soportado: {ext}")
 
     dst_name = f"{uuid4().hex}{ext}"
     dst_path = dst_dir / dst_name
@@ -37,11 +50,82 @@ async def save_upload_file(
                 break
             size += len(chunk)
             if size > max_bytes:
-                try:
-                    dst_path.unlink(missing_ok=True)
-                finally:
-                    raise AppError(413, ErrorCodes.TOO_LARGE_413, "Payload too large", f"Max file size is {max_bytes} bytes")
+                f.close()
+                dst_path.unlink(missing_ok=True)
+                raise too_large(max_bytes)
             f.write(chunk)
 
     await upload.close()
     return dst_path, dst_name
+
+
+def _disk_fileno(file: Any) -> Optional[int]:
+    # SpooledTemporaryFile queda en memoria hasta spool_max_size y después pasa a un archivo real (`_file`).
+    # No se llama a file.fileno() directo: en un spool en memoria eso fuerza el volcado a disco.
+    raw = getattr(file, "_file", file)
+    if isinstance(raw, io.BytesIO):
+        return None
+    try:
+        return raw.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+class UploadBuffer:
+    """
+    Bytes de un upload listos para decodificar. Los chicos se leen a memoria; los grandes (los que
+    Starlette ya volcó a un temporal en disco) se mapean con mmap en vez de copiarse al heap.
+    `release()` suelta los bytes comprimidos en cuanto la imagen está decodificada.
+    """
+
+    def __init__(self, upload: UploadFile, data: Union[bytes, mmap.mmap]) -> None:
+        self._upload = upload
+        self._data: Union[bytes, mmap.mmap] = data
+        self.mapped = isinstance(data, mmap.mmap)
+
+    @property
+    def data(self) -> Union[bytes, mmap.mmap]:
+        return self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def release(self) -> None:
+        """Cierra el mmap y el temporal (idempotente). Si quedan vistas vivas, se reintenta al final."""
+        data, self._data = self._data, b""
+        if isinstance(data, mmap.mmap) and not data.closed:
+            try:
+                data.close()
+            except BufferError:
+                self._data = data
+                return
+        self._upload.file.close()
+
+
+async def read_upload_chunked(upload: UploadFile, max_bytes: int) -> UploadBuffer:
+    """
+    Lee un upload de a CHUNK_SIZE y corta con 413 apenas se pasa de `max_bytes` (si el tamaño ya se
+    conoce, sin leer nada). Los que están en disco se mapean enteros (np.frombuffer trabaja sobre el mmap).
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise too_large(max_bytes)
+
+    fileno = _disk_fileno(upload.file)
+    if fileno is not None and upload.size:
+        mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        if len(mapped) > max_bytes:
+            mapped.close()
+            raise too_large(max_bytes)
+        return UploadBuffer(upload, mapped)
+
+    chunks = []
+    size = 0
+    while True:
+        chunk = await upload.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large(max_bytes)
+        chunks.append(chunk)
+    return UploadBuffer(upload, chunks[0] if len(chunks) == 1 else b"".join(chunks))
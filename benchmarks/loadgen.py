@@ -0,0 +1,392 @@
+"""
+Generador de carga end-to-end: throughput, latencias de cola y errores por `code` de problem details.
+
+Corre un corpus (documentos sintéticos o un directorio de imágenes) contra /v1/ocr, /v1/ocr/from-url
+(servidas por un servidor de imágenes local) o /v1/ocr/batch, en lazo cerrado (`--concurrency`) o
+abierto (`--rate` req/s con llegadas de Poisson). `--sweep` repite la corrida en varios niveles y
+muestra la curva de saturación.
+
+    # contra un servicio ya levantado
+    PYTHONPATH=. python -m benchmarks.loadgen --url http://localhost:8000 --concurrency 8 --duration 30
+
+    # servicio en proceso con engine falso de latencia configurable (sin Paddle)
+    PYTHONPATH=. python -m benchmarks.loadgen --in-process --fake-latency-ms 80 --sweep 1,2,4,8,16
+
+    # lazo abierto contra /v1/ocr/from-url
+    PYTHONPATH=. python -m benchmarks.loadgen --in-process --endpoint from-url --rate 20 --duration 20
+
+Para `from-url` contra un servicio externo, éste necesita ALLOW_PRIVATE_NETWORKS=true (las imágenes
+se sirven desde 127.0.0.1).
+"""
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import socket
+import sys
+import threading
+import time
+
+import httpx
+
+from benchmarks.synthetic import corpus
+
+_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff"}
+
+
+class FakeLatencyEngine:
+    """
+    Engine falso (como el de tests/conftest.py) con latencia configurable y capacidad acotada:
+    `capacity` requests a la vez, como un pool de OCR_POOL_SIZE instancias.
+    """
+
+    def __init__(self, *, latency_ms: float, jitter_ms: float = 0.0, capacity: int = 1) -> None:
+        self._latency = latency_ms / 1000.0
+        self._jitter = jitter_ms / 1000.0
+        self._slots = threading.Semaphore(capacity)
+        self._capacity = capacity
+
+    def extract_from_bytes(
+        self, data: bytes, *, preprocess: bool, return_blocks: bool, on_decoded: Any = None, **options: Any
+    ):
+        if on_decoded is not None:
+            on_decoded()
+        return self.extract(None, preprocess=preprocess, return_blocks=return_blocks, **options)
+
+    def extract(self, img: Any, *, preprocess: bool, return_blocks: bool, **options: Any) -> Dict[str, Any]:
+        with self._slots:
+            time.sleep(max(0.0, random.gauss(self._latency, self._jitter)))
+        block = {"text": "FAKE", "confidence": 0.99, "box": [[0, 0], [10, 0], [10, 10], [0, 10]]}
+        return {"text": "FAKE", "blocks": [block] if return_blocks else [], "preprocess": None}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "fake", "capacity": self._capacity}
+
+
+# ----------------
+# Corpus / servers
+# ----------------
+
+def load_corpus(images_dir: Optional[str]) -> List[Tuple[str, bytes]]:
+    if not images_dir:
+        return sorted(corpus().items())
+    files = sorted(p for p in Path(images_dir).iterdir() if p.suffix.lower() in _EXTS)
+    if not files:
+        raise SystemExit(f"No hay imágenes en {images_dir}")
+    return [(p.name, p.read_bytes()) for p in files]
+
+
+def _unique(data: bytes, nonce: int) -> bytes:
+    # Bytes extra después del fin de imagen: los decoders los ignoran, pero el cache de resultados no.
+    return data + b"\x00loadgen" + nonce.to_bytes(8, "big")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_image_server(images: Dict[str, bytes], *, unique: bool) -> Tuple[ThreadingHTTPServer, str]:
+    """Servidor HTTP local que sirve el corpus (stand-in de un CDN) para /v1/ocr/from-url."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            parsed = urlparse(self.path)
+            data = images.get(parsed.path.lstrip("/"))
+            if data is None:
+                self.send_error(404)
+                return
+            nonce = parse_qs(parsed.query).get("n")
+            if unique and nonce:
+                data = _unique(data, int(nonce[0]))
+            ext = Path(parsed.path).suffix.lower().lstrip(".")
+            self.send_response(200)
+            self.send_header("Content-Type", f"image/{'jpeg' if ext == 'jpg' else ext}")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, name="loadgen-images", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def start_in_process_service(engine: Optional[Any]) -> Tuple[Any, str]:
+    """Levanta la app con uvicorn en un thread; con `engine` reemplaza al engine real."""
+    import uvicorn
+
+    import app.main as main_module
+    from app.core.config import settings
+
+    settings.allow_private_networks = True  # el servidor de imágenes es 127.0.0.1
+    if engine is not None:
+        main_module.create_ocr_engine = lambda: engine
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(main_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="loadgen-service", daemon=True).start()
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 600  # el engine real puede tardar en cargar modelos y calentarse
+    while not (server.started and _is_ready(base_url)):
+        if time.monotonic() > deadline:
+            raise SystemExit("El servicio no arrancó")
+        time.sleep(0.05)
+    return server, base_url
+
+
+def _is_ready(base_url: str) -> bool:
+    try:
+        return httpx.get(f"{base_url}/ready", timeout=5).status_code == 200
+    except httpx.HTTPError:
+        return False
+
+
+# ----------------
+# Load generation
+# ----------------
+
+class RequestFactory:
+    def __init__(
+        self,
+        endpoint: str,
+        images: List[Tuple[str, bytes]],
+        *,
+        image_base: str,
+        batch_size: int,
+        unique: bool,
+        query: str,
+    ) -> None:
+        self._endpoint = endpoint
+        self._images = images
+        self._image_base = image_base
+        self._batch_size = batch_size
+        self._unique = unique
+        self._query = f"?{query}" if query else ""
+        self._counter = itertools.count()
+
+    def build(self) -> Dict[str, Any]:
+        n = next(self._counter)
+        name, data = self._images[n % len(self._images)]
+        if self._unique:
+            data = _unique(data, n)
+
+        if self._endpoint == "ocr":
+            return {"url": f"/v1/ocr{self._query}", "files": {"file": (name, data)}}
+        if self._endpoint == "from-url":
+            image_url = f"{self._image_base}/{name}" + (f"?n={n}" if self._unique else "")
+            return {"url": f"/v1/ocr/from-url{self._query}", "json": {"image_url": image_url}}
+
+        files = []
+        for i in range(self._batch_size):
+            item_name, item = self._images[(n + i) % len(self._images)]
+            files.append(("files", (item_name, _unique(item, n * self._batch_size + i) if self._unique else item)))
+        return {"url": f"/v1/ocr/batch{self._query}", "files": files}
+
+
+def _error_code(response: httpx.Response) -> Optional[str]:
+    if response.status_code < 400:
+        if response.headers.get("content-type", "").startswith("application/x-ndjson"):
+            for line in response.text.splitlines():
+                item = json.loads(line)
+                if not item.get("ok", True):
+                    return item.get("error", {}).get("code", "ITEM-ERROR")
+        return None
+    try:
+        return response.json().get("code") or f"HTTP-{response.status_code}"
+    except ValueError:
+        return f"HTTP-{response.status_code}"
+
+
+async def _send(client: httpx.AsyncClient, factory: RequestFactory, samples: List[Tuple[float, Optional[str]]]) -> None:
+    req = factory.build()
+    t0 = time.perf_counter()
+    try:
+        response = await client.post(req.pop("url"), **req)
+        code = _error_code(response)
+    except httpx.HTTPError as e:
+        code = f"TRANSPORT-{type(e).__name__}"
+    samples.append((time.perf_counter() - t0, code))
+
+
+async def run_level(
+    base_url: str,
+    factory: RequestFactory,
+    *,
+    concurrency: int,
+    rate: Optional[float],
+    duration: float,
+    timeout: float,
+) -> Dict[str, Any]:
+    """Lazo cerrado (`concurrency` clientes en loop) o abierto (`rate` llegadas/s, Poisson)."""
+    samples: List[Tuple[float, Optional[str]]] = []
+    limits = httpx.Limits(max_connections=None if rate else concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        stop_at = start + duration
+
+        if rate:
+            tasks = []
+            next_at = start
+            while next_at < stop_at:
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                tasks.append(asyncio.create_task(_send(client, factory, samples)))
+                next_at += random.expovariate(rate)
+            await asyncio.gather(*tasks)
+        else:
+
+            async def worker() -> None:
+                while time.perf_counter() < stop_at:
+                    await _send(client, factory, samples)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return summarize(samples, elapsed, concurrency=concurrency, rate=rate)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(
+    samples: List[Tuple[float, Optional[str]]],
+    elapsed: float,
+    *,
+    concurrency: int,
+    rate: Optional[float],
+) -> Dict[str, Any]:
+    latencies = sorted(lat for lat, _ in samples)
+    ok = [lat for lat, code in samples if code is None]
+    errors: Dict[str, int] = {}
+    for _, code in samples:
+        if code is not None:
+            errors[code] = errors.get(code, 0) + 1
+
+    return {
+        "concurrency": concurrency,
+        "target_rate": rate,
+        "requests": len(samples),
+        "ok": len(ok),
+        "seconds": elapsed,
+        "rps": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "goodput": len(ok) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            name: _percentile(latencies, q) * 1000.0 for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+        }
+        | {"max": (latencies[-1] * 1000.0) if latencies else 0.0},
+        "error_rate": (len(samples) - len(ok)) / len(samples) if samples else 0.0,
+        "errors": errors,
+    }
+
+
+def print_report(levels: List[Dict[str, Any]]) -> None:
+    print(
+        f"{'conc':>5} {'rate':>7} {'reqs':>7} {'rps':>8} {'goodput':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'err %':>6}  errors"
+    )
+    for r in levels:
+        lat = r["latency_ms"]
+        rate = f"{r['target_rate']:.1f}" if r["target_rate"] else "-"
+        errors = ", ".join(f"{code}={n}" for code, n in sorted(r["errors"].items()))
+        print(
+            f"{r['concurrency']:>5} {rate:>7} {r['requests']:>7} {r['rps']:>8.1f} {r['goodput']:>8.1f} "
+            f"{lat['p50']:>8.1f} {lat['p95']:>8.1f} {lat['p99']:>8.1f} {lat['max']:>8.1f} "
+            f"{r['error_rate'] * 100:>6.1f}  {errors}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="URL base de un servicio ya levantado")
+    target.add_argument("--in-process", action="store_true", help="levanta la app en este proceso")
+    parser.add_argument("--fake-latency-ms", type=float, help="(in-process) engine falso con esta latencia")
+    parser.add_argument("--fake-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--fake-capacity", type=int, default=1, help="requests simultáneos del engine falso")
+    parser.add_argument("--endpoint", choices=("ocr", "from-url", "batch"), default="ocr")
+    parser.add_argument("--batch-size", type=int, default=8, help="items por request en --endpoint batch")
+    parser.add_argument("--images", help="directorio de imágenes (default: corpus sintético)")
+    parser.add_argument("--query", default="", help='query string extra, p.ej. "cls=false&blocks=false"')
+    parser.add_argument("--no-unique", dest="unique", action="store_false", help="permite hits del cache de resultados")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, help="lazo abierto: requests por segundo")
+    parser.add_argument("--sweep", help="niveles separados por coma (de concurrencia, o de rate si se usa --rate)")
+    parser.add_argument("--duration", type=float, default=15.0, help="segundos por nivel")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", dest="json_out", help="guarda el reporte en este archivo")
+    args = parser.parse_args(argv)
+
+    images = load_corpus(args.images)
+    image_server, image_base = start_image_server(dict(images), unique=args.unique)
+
+    service = None
+    base_url = args.url
+    if args.in_process:
+        engine = None
+        if args.fake_latency_ms is not None:
+            engine = FakeLatencyEngine(
+                latency_ms=args.fake_latency_ms, jitter_ms=args.fake_jitter_ms, capacity=args.fake_capacity
+            )
+        service, base_url = start_in_process_service(engine)
+
+    factory = RequestFactory(
+        args.endpoint,
+        images,
+        image_base=image_base,
+        batch_size=args.batch_size,
+        unique=args.unique,
+        query=args.query,
+    )
+
+    levels = [float(x) for x in args.sweep.split(",")] if args.sweep else [args.rate or args.concurrency]
+    results = []
+    try:
+        for level in levels:
+            concurrency = args.concurrency if args.rate else int(level)
+            rate = level if args.rate else None
+            results.append(
+                asyncio.run(
+                    run_level(
+                        base_url,
+                        factory,
+                        concurrency=concurrency,
+                        rate=rate,
+                        duration=args.duration,
+                        timeout=args.timeout,
+                    )
+                )
+            )
+            if len(levels) == 1:
+                print_report(results)
+    finally:
+        image_server.shutdown()
+        if service is not None:
+            service.should_exit = True
+
+    if len(levels) > 1:
+        print("Saturation curve:")
+        print_report(results)
+
+    if args.json_out:
+        report = {"endpoint": args.endpoint, "base_url": base_url, "levels": results}
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Bytes asignados y tiempo por llamada de preprocess_for_ocr frente a la versión anterior
+(copyMakeBorder + resize del frame completo).
+
+    PYTHONPATH=. python -m benchmarks.preprocess_alloc [--runs 20]
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, Tuple
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app.services.image_preprocess import PreprocessConfig, default_preprocess_config, preprocess_for_ocr
+
+# (nombre, alto, ancho): foto de celular, captura de pantalla, recorte chico (se agranda)
+SHAPES = (("phone_photo", 3024, 4032), ("screenshot", 1080, 1920), ("small_crop", 200, 600))
+
+
+def legacy_preprocess(img_bgr: np.ndarray, cfg: PreprocessConfig) -> Tuple[np.ndarray, Dict]:
+    h, w = img_bgr.shape[:2]
+    pad_lr = max(cfg.pad_min_px, min(cfg.pad_max_px, int(w * cfg.pad_lr_ratio)))
+    pad_top = max(cfg.pad_min_px, min(cfg.pad_max_px, int(h * cfg.pad_top_ratio)))
+    pad_bottom = max(cfg.pad_min_px, min(cfg.pad_max_px, int(h * cfg.pad_bottom_ratio)))
+    padded = cv2.copyMakeBorder(
+        img_bgr, pad_top, pad_bottom, pad_lr, pad_lr, cv2.BORDER_CONSTANT, value=(255, 255, 255)
+    )
+    ph, pw = padded.shape[:2]
+    scale = 1.0
+    if min(ph, pw) < cfg.target_min_side:
+        scale = cfg.target_min_side / float(min(ph, pw))
+    if max(ph, pw) * scale > cfg.max_side:
+        scale = cfg.max_side / float(max(ph, pw))
+    if abs(scale - 1.0) >= 0.03:
+        interp = cv2.INTER_CUBIC if scale > 1.0 else cv2.INTER_AREA
+        padded = cv2.resize(padded, (int(round(pw * scale)), int(round(ph * scale))), interpolation=interp)
+    return padded, {}
+
+
+def measure(fn: Callable[[np.ndarray], object], img: np.ndarray, runs: int) -> Tuple[float, float]:
+    fn(img)  # warm-up (y llena el pool de lienzos)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        tracemalloc.reset_peak()
+        fn(img)
+    elapsed = (time.perf_counter() - t0) / runs
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024), elapsed * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    cfg = default_preprocess_config()
+    variants = {
+        "legacy": lambda img: legacy_preprocess(img, cfg),
+        "single_pass": lambda img: preprocess_for_ocr(img, cfg),
+        "pooled": lambda img: preprocess_for_ocr(img, cfg, reuse_buffer=True),
+    }
+
+    print(f"{'shape':<12} {'variant':<12} {'peak MiB':>9} {'ms/call':>8}")
+    for name, h, w in SHAPES:
+        img = np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8)
+        for variant, fn in variants.items():
+            mib, ms = measure(fn, img, args.runs)
+            print(f"{name:<12} {variant:<12} {mib:9.2f} {ms:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
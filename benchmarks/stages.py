@@ -0,0 +1,197 @@
+"""
+Microbenchmarks por etapa sobre documentos sintéticos (benchmarks/synthetic.py):
+decode, preprocess, armado del resultado (postprocess) y, si PaddleOCR está disponible,
+inferencia end-to-end. Reporta tiempo, throughput y pico de memoria, y guarda/compara un baseline JSON.
+
+    PYTHONPATH=. python -m benchmarks.stages --out benchmarks/baseline.json
+    PYTHONPATH=. python -m benchmarks.stages --compare benchmarks/baseline.json
+    PYTHONPATH=. python -m benchmarks.stages --e2e   # incluye inferencia real (requiere paddleocr + modelos)
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app.services.image_decode import decode_image_for_ocr
+from app.services.image_preprocess import default_preprocess_config, preprocess_for_ocr
+from app.services.ocr_postprocess import assemble_result
+from benchmarks.synthetic import SPECS, DocSpec, encode, render_document
+
+SCHEMA_VERSION = 1
+
+
+def measure(fn: Callable[[], Any], *, runs: int, warmup: int = 1, work: float = 1.0) -> Dict[str, float]:
+    """
+    Tiempo por llamada (media/p50/p95), throughput (`work` unidades por llamada / s) y pico de memoria
+    Python/NumPy (tracemalloc, en una pasada aparte para no inflar los tiempos).
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples: List[float] = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "mean_ms": mean * 1000.0,
+        "p50_ms": samples[len(samples) // 2] * 1000.0,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000.0,
+        "throughput": work / mean if mean > 0 else 0.0,
+        "peak_mib": peak / (1024 * 1024),
+    }
+
+
+def _engine_lines(spec: DocSpec, lines) -> List[Any]:
+    # Lo que devuelve el engine para este documento: una caja + (texto, confidence) por renglón.
+    out = []
+    for text, (x1, y1, x2, y2) in lines:
+        box = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32) + 0.4
+        out.append((box.tolist(), (text, 0.97)))
+    return out
+
+
+def bench_spec(spec: DocSpec, *, runs: int, e2e_engine: Optional[Any]) -> Dict[str, Dict[str, Any]]:
+    img, lines = render_document(spec)
+    cfg = default_preprocess_config()
+    mpx = spec.width * spec.height / 1e6
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for ext in (".jpg", ".png"):
+        data = encode(img, ext)
+        results[f"decode{ext}"] = {
+            **measure(lambda: decode_image_for_ocr(data, keep_side=cfg.max_side), runs=runs, work=mpx),
+            "unit": "Mpx/s",
+            "input_bytes": len(data),
+        }
+
+    results["preprocess"] = {
+        **measure(lambda: preprocess_for_ocr(img, cfg, reuse_buffer=True), runs=runs, work=mpx),
+        "unit": "Mpx/s",
+    }
+
+    engine_lines = _engine_lines(spec, lines)
+    results["postprocess"] = {
+        **measure(lambda: assemble_result(engine_lines, return_blocks=True), runs=runs * 10, work=len(lines)),
+        "unit": "lines/s",
+        "lines": len(lines),
+    }
+
+    if e2e_engine is not None:
+        data = encode(img, ".jpg")
+        results["e2e"] = {
+            **measure(
+                lambda: e2e_engine.extract_from_bytes(data, preprocess=True, return_blocks=True),
+                runs=max(1, runs // 5),
+                work=1.0,
+            ),
+            "unit": "images/s",
+        }
+    return results
+
+
+def _load_engine() -> Optional[Any]:
+    try:
+        from app.services.ocr_engine import PaddleOcrEngine
+
+        return PaddleOcrEngine(pool_size=1)
+    except Exception as e:  # paddle no instalado o modelos no disponibles
+        print(f"[e2e] omitido: {e!r}", file=sys.stderr)
+        return None
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_suite(*, runs: int, e2e: bool, specs=SPECS) -> Dict[str, Any]:
+    engine = _load_engine() if e2e else None
+    return {
+        "schema": SCHEMA_VERSION,
+        "env": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "runs": runs,
+        "results": {spec.name: bench_spec(spec, runs=runs, e2e_engine=engine) for spec in specs},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], *, threshold: float) -> List[str]:
+    """Líneas de reporte; las que empeoran más de `threshold` (fracción) se marcan con REGRESSION."""
+    report = []
+    for doc, stages in current["results"].items():
+        for stage_name, cur in stages.items():
+            base = baseline.get("results", {}).get(doc, {}).get(stage_name)
+            if not base:
+                continue
+            delta = (cur["p50_ms"] - base["p50_ms"]) / base["p50_ms"] if base["p50_ms"] else 0.0
+            mark = "  REGRESSION" if delta > threshold else ""
+            report.append(
+                f"{doc:<22} {stage_name:<12} p50 {base['p50_ms']:9.2f} -> {cur['p50_ms']:9.2f} ms "
+                f"({delta:+.1%})  peak {base['peak_mib']:7.2f} -> {cur['peak_mib']:7.2f} MiB{mark}"
+            )
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--e2e", action="store_true", help="incluye inferencia real con PaddleOCR")
+    parser.add_argument("--out", help="guarda los resultados en este JSON (baseline)")
+    parser.add_argument("--compare", help="compara contra un baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="empeoramiento tolerado (p50)")
+    args = parser.parse_args(argv)
+
+    current = run_suite(runs=args.runs, e2e=args.e2e)
+
+    print(f"{'document':<22} {'stage':<12} {'p50 ms':>9} {'p95 ms':>9} {'throughput':>16} {'peak MiB':>9}")
+    for doc, stages in current["results"].items():
+        for stage_name, r in stages.items():
+            tp = f"{r['throughput']:.1f} {r['unit']}"
+            print(f"{doc:<22} {stage_name:<12} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {tp:>16} {r['peak_mib']:9.2f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report = compare(current, baseline, threshold=args.threshold)
+        print()
+        print("\n".join(report))
+        if any(line.endswith("REGRESSION") for line in report):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
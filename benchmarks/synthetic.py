@@ -0,0 +1,85 @@
+"""
+Documentos sintéticos deterministas (texto renderizado con las fuentes Hershey de OpenCV,
+sin assets descargados) para benchmarks y pruebas de carga.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+_WORDS = (
+    "factura total fecha cliente importe subtotal iva cantidad precio unidad codigo "
+    "descripcion pago tarjeta efectivo cambio gracias por su compra sucursal caja numero"
+).split()
+
+_FONTS = (cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX, cv2.FONT_HERSHEY_COMPLEX)
+
+
+@dataclass(frozen=True)
+class DocSpec:
+    name: str
+    width: int
+    height: int
+    font_scale: float  # tamaño del texto (1.0 ~ 22 px de alto)
+    density: float  # fracción de renglones con texto
+    seed: int = 0
+
+
+# Tamaños, resoluciones y densidades representativos del tráfico real.
+SPECS: Tuple[DocSpec, ...] = (
+    DocSpec("receipt_small_text", 600, 1600, 0.5, 0.9),
+    DocSpec("screenshot", 1920, 1080, 0.7, 0.5),
+    DocSpec("a4_300dpi_dense", 2480, 3508, 1.2, 0.95),
+    DocSpec("phone_photo_sparse", 4032, 3024, 2.0, 0.25),
+)
+
+
+def _sentence(rng: np.random.Generator, n_words: int) -> str:
+    return " ".join(_WORDS[i] for i in rng.integers(0, len(_WORDS), n_words))
+
+
+def render_document(spec: DocSpec) -> Tuple[np.ndarray, List[Tuple[str, Tuple[int, int, int, int]]]]:
+    """Imagen BGR + líneas dibujadas [(texto, (x1, y1, x2, y2))]. Misma spec -> mismos píxeles."""
+    rng = np.random.default_rng(spec.seed)
+    img = np.full((spec.height, spec.width, 3), 255, dtype=np.uint8)
+    thickness = max(1, int(round(spec.font_scale * 1.5)))
+    (_, line_h), baseline = cv2.getTextSize("Ag", _FONTS[0], spec.font_scale, thickness)
+    step = int((line_h + baseline) * 1.8)
+    margin = max(8, spec.width // 40)
+
+    lines: List[Tuple[str, Tuple[int, int, int, int]]] = []
+    y = margin + line_h
+    while y + baseline < spec.height - margin:
+        if rng.random() < spec.density:
+            font = _FONTS[int(rng.integers(0, len(_FONTS)))]
+            text = _sentence(rng, int(rng.integers(2, 9)))
+            (tw, _), _ = cv2.getTextSize(text, font, spec.font_scale, thickness)
+            while tw > spec.width - 2 * margin and " " in text:
+                text = text.rsplit(" ", 1)[0]
+                (tw, _), _ = cv2.getTextSize(text, font, spec.font_scale, thickness)
+            shade = int(rng.integers(0, 80))
+            cv2.putText(img, text, (margin, y), font, spec.font_scale, (shade, shade, shade), thickness, cv2.LINE_AA)
+            lines.append((text, (margin, y - line_h, margin + tw, y + baseline)))
+        y += step
+    return img, lines
+
+
+def encode(img: np.ndarray, ext: str = ".jpg", quality: int = 90) -> bytes:
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if ext in (".jpg", ".jpeg") else []
+    ok, buf = cv2.imencode(ext, img, params)
+    if not ok:
+        raise ValueError(f"encode failed for {ext}")
+    return buf.tobytes()
+
+
+def corpus(formats: Tuple[str, ...] = (".jpg", ".png")) -> Dict[str, bytes]:
+    """Todos los SPECS codificados en cada formato: {"<spec><ext>": bytes}."""
+    out: Dict[str, bytes] = {}
+    for spec in SPECS:
+        img, _ = render_document(spec)
+        for ext in formats:
+            out[spec.name + ext] = encode(img, ext)
+    return out
@@ -6,7 +6,19 @@ from app.main import app
 
 
 class FakeOcrEngine:
-    def extract_from_bytes(self, data: bytes, *, preprocess: bool, return_blocks: bool):
+    def extract_from_bytes(
+        self, data: bytes, *, preprocess: bool, return_blocks: bool, on_decoded=None, triage=None, near=None, **options
+    ):
+        self.last_size = len(data)
+        self.last_triage = triage
+        self.last_near = near
+        if on_decoded is not None:
+            on_decoded()
+        return self.extract(None, preprocess=preprocess, return_blocks=return_blocks, **options)
+
+    def extract(self, img, *, preprocess: bool, return_blocks: bool, stages=None, regions=None):
+        self.last_stages = stages
+        self.last_regions = regions
         return {
             "text": "FAKE OCR TEXT",
             "blocks": [
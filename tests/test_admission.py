@@ -0,0 +1,81 @@
+import asyncio
+import io
+import time
+
+import pytest
+
+from app.core.errors import AppException
+from app.services.admission import AdmissionController
+
+
+def test_admission_queues_then_rejects_when_full():
+    async def scenario():
+        ctl = AdmissionController(limit=1, queue_size=1, queue_timeout=5)
+        release = asyncio.Event()
+        order = []
+
+        async def job(name):
+            async with ctl.admit():
+                order.append(name)
+                await release.wait()
+
+        first = asyncio.create_task(job("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(job("second"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AppException) as exc:
+            async with ctl.admit():
+                pass
+        assert exc.value.status == 429
+        assert "Retry-After" in exc.value.headers
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert order == ["first", "second"]
+        assert ctl.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_admission_drops_expired_and_disconnected_waiters():
+    async def scenario():
+        ctl = AdmissionController(limit=1, queue_size=4, queue_timeout=5)
+
+        async def gone():
+            return True
+
+        async with ctl.admit():
+            with pytest.raises(AppException) as exc:
+                async with ctl.admit(deadline=time.monotonic() + 0.05):
+                    pass
+            assert exc.value.status == 504
+
+            with pytest.raises(AppException) as exc:
+                async with ctl.admit(is_disconnected=gone):
+                    pass
+            assert exc.value.status == 499
+
+        stats = ctl.stats()
+        assert (stats["active"], stats["waiting"]) == (0, 0)
+        assert (stats["expired"], stats["disconnected"]) == (1, 1)
+
+    asyncio.run(scenario())
+
+
+def test_invalid_deadline_header_is_rejected(client):
+    r = client.post(
+        "/v1/ocr",
+        files={"file": ("a.png", io.BytesIO(b"img"), "image/png")},
+        headers={"X-Request-Timeout-Ms": "soon"},
+    )
+    assert r.status_code == 400
+
+
+def test_deadline_header_is_accepted(client):
+    r = client.post(
+        "/v1/ocr",
+        files={"file": ("a.png", io.BytesIO(b"img"), "image/png")},
+        headers={"X-Request-Timeout-Ms": "5000"},
+    )
+    assert r.status_code == 200
@@ -0,0 +1,22 @@
+import numpy as np
+
+from benchmarks.stages import compare, run_suite
+from benchmarks.synthetic import SPECS, render_document
+
+
+def test_synthetic_documents_are_deterministic():
+    a, lines_a = render_document(SPECS[0])
+    b, lines_b = render_document(SPECS[0])
+    assert np.array_equal(a, b)
+    assert lines_a == lines_b and lines_a
+    assert (a < 128).any()  # hay texto dibujado
+
+
+def test_stage_suite_runs_without_paddle_and_compares():
+    result = run_suite(runs=1, e2e=False, specs=SPECS[:1])
+    stages = result["results"][SPECS[0].name]
+    assert {"decode.jpg", "decode.png", "preprocess", "postprocess"} <= set(stages)
+    assert all(r["p50_ms"] >= 0 and r["peak_mib"] >= 0 for r in stages.values())
+
+    slower = {"results": {SPECS[0].name: {k: {**v, "p50_ms": v["p50_ms"] / 10} for k, v in stages.items()}}}
+    assert any("REGRESSION" in line for line in compare(result, slower, threshold=0.1))
@@ -0,0 +1,123 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main as main_module
+from app.core.config import settings
+from app.main import app
+from app.services.engine_loader import parse_sizes, warmup_images
+from tests.conftest import FakeOcrEngine
+
+
+class WarmingEngine(FakeOcrEngine):
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.warmed = []
+
+    def warmup(self, images):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model missing")
+        self.warmed = [img.shape for img in images]
+
+
+@pytest.fixture
+def start_app(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "ocr_jobs_db", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(settings, "ocr_warmup_sizes", "320x240,200x400")
+    previous = dict(app.state._state)
+    clients = []
+
+    def start(engine):
+        monkeypatch.setattr(main_module, "create_ocr_engine", lambda: engine)
+        client = TestClient(app).__enter__()
+        clients.append(client)
+        return client
+
+    yield start
+    for client in clients:
+        client.__exit__(None, None, None)
+    app.state._state.clear()
+    app.state._state.update(previous)
+
+
+def _wait_ready(client):
+    for _ in range(200):
+        r = client.get("/ready")
+        if r.json()["startup"] in ("ready", "failed"):
+            return r
+        time.sleep(0.01)
+    raise AssertionError("engine did not start")
+
+
+def test_not_ready_until_warmup_completes(start_app):
+    engine = WarmingEngine(delay=0.3)
+    client = start_app(engine)
+
+    r = client.get("/ready")
+    assert r.status_code == 503 and r.json()["ready"] is False
+    assert client.get("/health").status_code == 200
+
+    # Un request durante el warm-up espera al engine en vez de fallar.
+    r = client.post("/v1/ocr", files={"file": ("a.png", b"img", "image/png")})
+    assert r.status_code == 200
+
+    assert _wait_ready(client).status_code == 200
+    assert engine.warmed == [(240, 320, 3), (400, 200, 3)]
+    startup = client.get("/stats").json()["startup"]
+    assert startup["status"] == "ready"
+    assert {"load", "warmup", "total"} <= set(startup["seconds"])
+    assert startup["first_request_seconds"] is not None
+    assert "ocr_startup_seconds" in client.get("/metrics").text
+
+
+def test_failed_startup_stays_not_ready(start_app):
+    client = start_app(WarmingEngine(fail=True))
+    r = _wait_ready(client)
+    assert r.status_code == 503 and r.json()["startup"] == "failed"
+
+    r = client.post("/v1/ocr", files={"file": ("a.png", b"img", "image/png")})
+    assert r.status_code == 503
+    assert r.json()["code"] == "OCR-BUSY-503"
+
+
+def test_warmup_images_contain_text():
+    images = warmup_images(parse_sizes("640x480, 300x900"))
+    assert [img.shape for img in images] == [(480, 640, 3), (900, 300, 3)]
+    assert all((img < 128).any() for img in images)
+
+
+def test_models_are_required_unless_download_is_allowed(monkeypatch, tmp_path):
+    from app.services.ocr_engine import model_dirs
+
+    monkeypatch.setattr(settings, "ocr_model_dir", "")
+    monkeypatch.setattr(settings, "ocr_allow_model_download", False)
+    with pytest.raises(RuntimeError, match="OCR_MODEL_DIR"):
+        model_dirs("es")
+
+    monkeypatch.setattr(settings, "ocr_allow_model_download", True)
+    assert model_dirs("es") == {}
+
+    for name in ("det", "cls", "rec"):
+        (tmp_path / name).mkdir()
+        for f in ("inference.pdmodel", "inference.pdiparams"):
+            (tmp_path / name / f).write_bytes(b"")
+    monkeypatch.setattr(settings, "ocr_model_dir", str(tmp_path))
+    assert model_dirs("es")["rec_model_dir"] == str(tmp_path / "rec")
+
+
+def test_extra_language_requires_its_own_rec_model(monkeypatch, tmp_path):
+    from app.services.ocr_engine import local_model_dirs
+
+    for name in ("det", "cls", "rec", "rec/en"):
+        (tmp_path / name).mkdir()
+        for f in ("inference.pdmodel", "inference.pdiparams"):
+            (tmp_path / name / f).write_bytes(b"")
+    monkeypatch.setattr(settings, "ocr_lang", "es")
+
+    assert local_model_dirs(str(tmp_path), "es")["rec_model_dir"] == str(tmp_path / "rec")
+    assert local_model_dirs(str(tmp_path), "en")["rec_model_dir"] == str(tmp_path / "rec" / "en")
+    with pytest.raises(RuntimeError, match="rec/fr"):
+        local_model_dirs(str(tmp_path), "fr")
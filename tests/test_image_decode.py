@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.core.errors import AppException
+from app.services.image_decode import decode_image_for_ocr, read_image_size
+
+
+def _encode(ext, w, h):
+    img = np.full((h, w, 3), 200, dtype=np.uint8)
+    ok, buf = cv2.imencode(ext, img)
+    assert ok
+    return buf.tobytes()
+
+
+@pytest.mark.parametrize("ext", [".jpg", ".png", ".webp", ".bmp"])
+def test_read_image_size_from_header(ext):
+    assert read_image_size(_encode(ext, 321, 123)) == (321, 123)
+
+
+def test_large_jpeg_is_decoded_reduced():
+    img, info = decode_image_for_ocr(_encode(".jpg", 4000, 3000), keep_side=1000)
+    assert info == {"reduction": 4, "source_shape": {"h": 3000, "w": 4000}}
+    assert img.shape[:2] == (750, 1000)
+
+
+def test_png_and_small_images_are_decoded_full_size():
+    img, info = decode_image_for_ocr(_encode(".png", 4000, 3000), keep_side=1000)
+    assert info["reduction"] == 1 and img.shape[:2] == (3000, 4000)
+
+    img, info = decode_image_for_ocr(_encode(".jpg", 800, 600), keep_side=1000)
+    assert info["reduction"] == 1 and img.shape[:2] == (600, 800)
+
+
+def test_pixel_budget_rejects_before_decoding(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_max_pixels", 1000)
+    with pytest.raises(AppException) as exc:
+        decode_image_for_ocr(_encode(".png", 100, 100))
+    assert exc.value.status == 413
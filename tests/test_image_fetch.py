@@ -0,0 +1,180 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpcore
+import pytest
+
+from app.core.config import settings
+from app.core.errors import AppException
+from app.services import image_fetch
+from app.services.dns_resolver import CachingResolver, ResolveError
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b"\x89PNG fake"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def image_server(monkeypatch):
+    monkeypatch.setattr(settings, "allow_private_networks", True)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/img.png"
+    server.shutdown()
+
+
+def test_fetches_reuse_pooled_connection(image_server):
+    async def run():
+        before = image_fetch.http_client_stats()
+        try:
+            for _ in range(3):
+                assert await image_fetch.fetch_image_bytes(image_server) == _ImageHandler.body
+            return before, image_fetch.http_client_stats()
+        finally:
+            await image_fetch.close_http_client()
+
+    before, after = asyncio.run(run())
+
+    assert after["requests"] - before["requests"] == 3
+    assert after["connections_opened"] - before["connections_opened"] == 1
+
+
+def test_dns_is_cached_and_pinned_to_connection(image_server, monkeypatch):
+    lookups = []
+
+    async def fake_lookup(host):
+        lookups.append(host)
+        return ["127.0.0.1"]
+
+    resolver = CachingResolver(ttl=60, negative_ttl=5, lookup=fake_lookup)
+    monkeypatch.setattr(image_fetch, "_resolver", resolver)
+    # "img.test" solo existe en el resolver falso: si la conexión resolviera de nuevo, fallaría.
+    url = image_server.replace("127.0.0.1", "img.test")
+
+    async def run():
+        try:
+            for _ in range(3):
+                assert await image_fetch.fetch_image_bytes(url) == _ImageHandler.body
+        finally:
+            await image_fetch.close_http_client()
+
+    asyncio.run(run())
+    assert lookups == ["img.test"]
+
+
+def test_unreachable_address_falls_back_to_next(image_server, monkeypatch):
+    async def fake_lookup(host):
+        # 127.0.0.2 no tiene nada escuchando (el server está en 127.0.0.1): conexión rechazada.
+        return ["127.0.0.2", "127.0.0.1"]
+
+    monkeypatch.setattr(image_fetch, "_resolver", CachingResolver(ttl=60, negative_ttl=5, lookup=fake_lookup))
+    url = image_server.replace("127.0.0.1", "dual.test")
+
+    async def run():
+        try:
+            return await image_fetch.fetch_image_bytes(url)
+        finally:
+            await image_fetch.close_http_client()
+
+    assert asyncio.run(run()) == _ImageHandler.body
+
+
+def test_private_hosts_are_blocked(monkeypatch):
+    async def fake_lookup(host):
+        return ["10.0.0.7"]
+
+    monkeypatch.setattr(image_fetch, "_resolver", CachingResolver(ttl=60, negative_ttl=5, lookup=fake_lookup))
+
+    with pytest.raises(AppException) as exc:
+        asyncio.run(image_fetch.fetch_image_bytes("https://intranet.test/img.png"))
+    assert exc.value.status == 400
+
+
+def test_failed_lookups_are_negatively_cached():
+    calls = []
+
+    async def failing_lookup(host):
+        calls.append(host)
+        raise OSError("NXDOMAIN")
+
+    resolver = CachingResolver(ttl=60, negative_ttl=60, lookup=failing_lookup)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(ResolveError):
+                await resolver.resolve("missing.test")
+
+    asyncio.run(run())
+    assert calls == ["missing.test"]
+    assert resolver.stats()["negative_hits"] == 1
+
+
+def test_host_slots_are_dropped_when_idle(image_server):
+    async def run():
+        try:
+            bodies = await asyncio.gather(*(image_fetch.fetch_image_bytes(image_server) for _ in range(3)))
+            return bodies, dict(image_fetch._host_slots)
+        finally:
+            await image_fetch.close_http_client()
+
+    bodies, slots = asyncio.run(run())
+
+    assert bodies == [_ImageHandler.body] * 3
+    assert slots == {}
+
+
+def test_transport_pool_is_replaced_with_pinned_backend():
+    # Depende de un atributo privado de httpx: si una versión nueva lo cambia, este test lo avisa.
+    async def run():
+        try:
+            pool = image_fetch.init_http_client()._transport._pool
+            assert isinstance(pool, httpcore.AsyncConnectionPool)
+            assert isinstance(pool._network_backend, image_fetch._PinnedNetworkBackend)
+        finally:
+            await image_fetch.close_http_client()
+
+    asyncio.run(run())
+
+
+def test_cancelled_lookup_does_not_block_waiters():
+    calls = []
+
+    async def run():
+        gate = asyncio.Event()  # nunca se libera: el primer lookup solo termina cancelado
+
+        async def slow_lookup(host):
+            calls.append(host)
+            if len(calls) == 1:
+                await gate.wait()
+            return ["127.0.0.1"]
+
+        resolver = CachingResolver(ttl=60, negative_ttl=5, lookup=slow_lookup)
+        owner = asyncio.create_task(resolver.resolve("slow.test"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(resolver.resolve("slow.test"))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        ips = await asyncio.wait_for(waiter, timeout=2)
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return ips, resolver.stats()
+
+    ips, stats = asyncio.run(run())
+
+    assert ips == ["127.0.0.1"]
+    assert calls == ["slow.test", "slow.test"]
+    assert stats["inflight"] == 0
@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+from app.services.image_preprocess import default_preprocess_config, preprocess_for_ocr
+
+
+def _reference(img, cfg, meta):
+    # Implementación anterior: padding completo + resize de todo el frame.
+    p = meta["padding"]
+    padded = cv2.copyMakeBorder(
+        img, p["top"], p["bottom"], p["left"], p["right"], cv2.BORDER_CONSTANT, value=(255, 255, 255)
+    )
+    f = meta["final_shape"]
+    if (f["h"], f["w"]) == padded.shape[:2]:
+        return padded
+    interp = cv2.INTER_CUBIC if meta["scale"] > 1.0 else cv2.INTER_AREA
+    return cv2.resize(padded, (f["w"], f["h"]), interpolation=interp)
+
+
+def test_single_pass_matches_pad_then_resize():
+    cfg = default_preprocess_config()
+    for h, w in ((3000, 4000), (300, 900), (1100, 1500)):
+        img = np.full((h, w, 3), 40, dtype=np.uint8)
+        out, meta = preprocess_for_ocr(img, cfg)
+
+        ref = _reference(img, cfg, meta)
+        assert out.shape == ref.shape
+        assert meta["padded_shape"] == {
+            "h": h + meta["padding"]["top"] + meta["padding"]["bottom"],
+            "w": w + 2 * meta["padding"]["left"],
+        }
+        # Solo pueden diferir los píxeles del límite contenido/padding.
+        assert np.mean(np.abs(out.astype(int) - ref.astype(int)) > 8) < 0.02
+        assert (out[0] == 255).all() and (out[-1] == 255).all()
+
+
+def test_reused_canvas_comes_from_thread_pool():
+    cfg = default_preprocess_config()
+    img = np.zeros((500, 700, 3), dtype=np.uint8)
+    a, meta_a = preprocess_for_ocr(img, cfg, reuse_buffer=True)
+    b, meta_b = preprocess_for_ocr(img, cfg, reuse_buffer=True)
+    assert a is b
+    assert meta_a == meta_b
+    assert preprocess_for_ocr(img, cfg)[0] is not a
@@ -0,0 +1,27 @@
+import httpx
+
+from benchmarks.loadgen import FakeLatencyEngine, RequestFactory, _error_code, summarize
+
+
+def test_summary_reports_percentiles_and_errors_by_code():
+    samples = [(i / 1000.0, None) for i in range(1, 99)] + [(0.5, "OCR-BUSY-503"), (0.6, "OCR-BUSY-503")]
+    report = summarize(samples, 2.0, concurrency=4, rate=None)
+    assert report["requests"] == 100 and report["ok"] == 98
+    assert report["rps"] == 50.0 and report["goodput"] == 49.0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"] <= report["latency_ms"]["max"] == 600.0
+    assert report["errors"] == {"OCR-BUSY-503": 2}
+
+
+def test_requests_defeat_the_result_cache_and_errors_use_problem_code():
+    factory = RequestFactory("ocr", [("a.png", b"img")], image_base="", batch_size=1, unique=True, query="")
+    first, second = factory.build(), factory.build()
+    assert first["files"]["file"][1] != second["files"]["file"][1]
+
+    problem = httpx.Response(429, json={"code": "OCR-QUEUE-FULL-429"})
+    assert _error_code(problem) == "OCR-QUEUE-FULL-429"
+    item = httpx.Response(200, text='{"ok": false, "error": {"code": "OCR-DECODE-400"}}\n',
+                          headers={"content-type": "application/x-ndjson"})
+    assert _error_code(item) == "OCR-DECODE-400"
+
+    out = FakeLatencyEngine(latency_ms=0).extract_from_bytes(b"", preprocess=True, return_blocks=True)
+    assert out["text"] == "FAKE" and out["blocks"]
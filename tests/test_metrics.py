@@ -0,0 +1,49 @@
+import contextvars
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.metrics import record_stage, stage, start_request_timings
+
+
+def test_requests_get_server_timing_header(client):
+    r = client.post("/v1/ocr", files={"file": ("a.png", io.BytesIO(b"metrics"), "image/png")})
+    assert r.status_code == 200
+    timing = r.headers["Server-Timing"]
+    assert "serialize;dur=" in timing
+    assert "total;dur=" in timing
+
+
+def test_metrics_endpoint_exposes_stage_histograms_and_counters(client):
+    with stage("inference"):
+        pass
+    client.post("/v1/ocr", files={"file": ("a.txt", io.BytesIO(b"x"), "text/plain")})
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert 'ocr_stage_seconds_count{stage="inference"}' in body
+    assert 'ocr_bytes_total{direction="uploaded"}' in body
+    assert 'ocr_errors_total{code="OCR-UNSUPPORTED-415"}' in body
+    assert 'ocr_http_request_seconds_count{method="POST",route="/v1/ocr",status="200"}' in body
+    assert "ocr_http_requests_in_flight" in body
+
+
+def test_stage_timings_from_parallel_threads_are_not_lost():
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # fuerza cambios de thread en medio del read-modify-write
+    try:
+        timings = start_request_timings()
+
+        def work():
+            for _ in range(2000):
+                record_stage("tile", 0.001)
+
+        with ThreadPoolExecutor(8) as pool:
+            for fut in [pool.submit(contextvars.copy_context().run, work) for _ in range(8)]:
+                fut.result()
+    finally:
+        sys.setswitchinterval(previous)
+
+    assert round(timings["tile"]) == 8 * 2000
@@ -0,0 +1,155 @@
+import io
+
+import cv2
+import numpy as np
+
+from app.main import app
+from app.services.ocr_extract import extract_from_bytes
+from app.services.near_cache import (
+    MultiIndexHash,
+    NearDuplicateCache,
+    NearDuplicateLookup,
+    _hamming,
+    image_hashes,
+)
+from app.services.result_cache import OcrResultCache
+
+
+def _document(lines, size=(800, 600)):
+    img = np.full((size[0], size[1], 3), 255, np.uint8)
+    for k, text in enumerate(lines):
+        cv2.putText(img, text, (40, 80 + k * 60), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+    return img
+
+
+def _recompressed(img, scale):
+    small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    ok, jpg = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    assert ok
+    return cv2.imdecode(jpg, cv2.IMREAD_COLOR)
+
+
+def _decode_meta(img):
+    return {"reduction": 1, "source_shape": {"h": img.shape[0], "w": img.shape[1]}}
+
+
+def test_multi_index_finds_neighbours_within_distance():
+    index = MultiIndexHash(max_distance=4)
+    base = 0x0123456789ABCDEF
+    index.add(1, "v", base)
+    index.add(2, "v", base ^ 0xFFFF_FFFF_0000_0000)
+    index.add(3, "otra", base)
+
+    near = base ^ 0b1011  # 3 bits distintos
+    assert 1 in index.candidates("v", near)
+    assert 3 not in index.candidates("v", near)
+
+    index.remove(1, "v", base)
+    assert 1 not in index.candidates("v", near)
+
+
+def test_recompressed_copy_is_close_and_other_document_is_not():
+    original = _document(["FACTURA A 0001-00012345", "CUIT 30-71234567-8", "TOTAL 12.500,00"])
+    copy = _recompressed(original, 0.5)
+    other = _document(["REMITO R 0002-00000077", "Av. Corrientes 1234", "Firma y aclaracion"])
+
+    coarse, fine = image_hashes(original)
+    copy_coarse, copy_fine = image_hashes(copy)
+    other_coarse, other_fine = image_hashes(other)
+
+    assert _hamming(coarse, copy_coarse) <= 4 and _hamming(fine, copy_fine) <= 16
+    assert _hamming(fine, other_fine) > 16
+
+
+def test_near_duplicate_reuses_result_with_rescaled_boxes():
+    results = OcrResultCache(max_bytes=1024 * 1024)
+    near = NearDuplicateCache(results, max_entries=10, max_distance=4, verify_distance=16)
+    original = _document(["FACTURA A 0001-00012345", "TOTAL 12.500,00"])
+    copy = _recompressed(original, 0.5)
+    calls = []
+    block = {"text": "FACTURA", "confidence": 0.9, "box": [[40, 50], [440, 50], [440, 90], [40, 90]]}
+
+    def lookup(key, img):
+        bound = near.bind()
+        bound.key, bound.variant = key, "params"
+
+        def compute():
+            calls.append(key)
+            return bound.get_or_compute(
+                img, _decode_meta(img), False, lambda: {"text": "FACTURA", "blocks": [block], "preprocess": None}
+            )
+
+        return results.get_or_compute(key, compute)
+
+    lookup("a", original)
+    out, info = lookup("b", copy)
+
+    assert info["status"] == "miss" and calls == ["a", "b"]
+    assert out["near_duplicate"]["distance"] <= 4
+    assert out["blocks"][0]["box"] == [[20, 25], [220, 25], [220, 45], [20, 45]]
+    assert near.stats()["hits"] == 1
+
+
+def test_evicted_result_is_not_reused():
+    results = OcrResultCache(max_bytes=1024 * 1024)
+    near = NearDuplicateCache(results, max_entries=10, max_distance=4, verify_distance=16)
+    img = _document(["FACTURA A 0001-00012345"])
+    coarse, fine = image_hashes(img)
+    near.add("params", coarse, fine, "gone", img.shape[:2])
+
+    bound = NearDuplicateLookup(near)
+    bound.key, bound.variant = "new", "params"
+    out = bound.get_or_compute(img, _decode_meta(img), False, lambda: {"text": "", "blocks": [], "preprocess": None})
+
+    assert "near_duplicate" not in out
+    assert near.stats()["stale"] == 1
+
+
+def test_near_duplicates_query_param(client, monkeypatch):
+    results = OcrResultCache(max_bytes=1024 * 1024)
+    monkeypatch.setattr(app.state, "result_cache", results, raising=False)
+    near = NearDuplicateCache(results, max_entries=10, max_distance=4, verify_distance=16)
+    monkeypatch.setattr(app.state, "near_cache", near, raising=False)
+    engine = client.app.state.ocr_engine
+
+    r = client.post("/v1/ocr?near_duplicates=true", files={"file": ("a.png", io.BytesIO(b"near"), "image/png")})
+    assert r.status_code == 200
+    assert isinstance(engine.last_near, NearDuplicateLookup) and engine.last_near.key
+
+    client.post("/v1/ocr", files={"file": ("a.png", io.BytesIO(b"near 2"), "image/png")})
+    assert engine.last_near is None
+
+
+def test_near_hit_is_not_stored_under_the_exact_key(client, monkeypatch):
+    results = OcrResultCache(max_bytes=1024 * 1024)
+    monkeypatch.setattr(app.state, "result_cache", results, raising=False)
+    near = NearDuplicateCache(results, max_entries=10, max_distance=4, verify_distance=16)
+    monkeypatch.setattr(app.state, "near_cache", near, raising=False)
+    engine = client.app.state.ocr_engine
+    calls = []
+
+    def extract(img, **options):
+        calls.append(img.shape)
+        return {**engine.extract(img, **options), "preprocess": None}  # sin meta falso que reescalar
+
+    def decoding_extract_from_bytes(data, *, preprocess, **options):
+        # Como los engines reales: decode + cache de casi-duplicados (ver ocr_extract).
+        return extract_from_bytes(extract, data, keep_side=None, preprocess=preprocess, **options)
+
+    monkeypatch.setattr(engine, "extract_from_bytes", decoding_extract_from_bytes)
+    original = _document(["FACTURA A 0001-00012345", "TOTAL 12.500,00"])
+    png_a = cv2.imencode(".png", original)[1].tobytes()
+    png_b = cv2.imencode(".png", _recompressed(original, 0.5))[1].tobytes()
+
+    def post(data, query=""):
+        r = client.post(f"/v1/ocr{query}", files={"file": ("a.png", io.BytesIO(data), "image/png")})
+        assert r.status_code == 200
+        return r.json()["data"]["cache"]
+
+    assert post(png_a, "?near_duplicates=true")["status"] == "miss"
+    assert post(png_b, "?near_duplicates=true")["status"] == "near_hit"
+    assert len(calls) == 1
+
+    # Sin opt-in, B se procesa: el hit anterior no quedó guardado como resultado exacto de B.
+    assert post(png_b)["status"] == "miss"
+    assert len(calls) == 2
@@ -0,0 +1,39 @@
+import io
+import json
+
+from app.api.v1 import batch as batch_module
+
+
+def test_batch_streams_one_line_per_item(client, monkeypatch):
+    async def fake_fetch(url, extra_headers=None):
+        return b"fake image bytes"
+
+    monkeypatch.setattr(batch_module, "fetch_image_bytes", fake_fetch)
+
+    r = client.post(
+        "/v1/ocr/batch",
+        files=[
+            ("files", ("a.png", io.BytesIO(b"img a"), "image/png")),
+            ("files", ("b.txt", io.BytesIO(b"not an image"), "text/plain")),
+        ],
+        data={"urls": ["https://example.com/c.png"]},
+    )
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    by_index = {line["index"]: line for line in lines}
+    assert sorted(by_index) == [0, 1, 2]
+
+    assert by_index[0]["ok"] is True
+    assert by_index[0]["data"]["text"] == "FAKE OCR TEXT"
+    assert by_index[1]["ok"] is False
+    assert by_index[1]["error"]["status"] == 415
+    assert by_index[2]["source"] == "url"
+    assert by_index[2]["ok"] is True
+
+
+def test_batch_requires_items(client):
+    r = client.post("/v1/ocr/batch", data={})
+    assert r.status_code == 400
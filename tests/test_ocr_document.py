@@ -0,0 +1,67 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+
+def _pages(r):
+    assert r.status_code == 200
+    return sorted(json.loads(line)["page"] for line in r.text.splitlines())
+
+
+def test_multipage_tiff_streams_every_page(client):
+    Image = pytest.importorskip("PIL.Image")
+    frames = [Image.fromarray(np.full((40, 60, 3), v, dtype=np.uint8)) for v in (0, 128, 255)]
+    buf = io.BytesIO()
+    frames[0].save(buf, format="TIFF", save_all=True, append_images=frames[1:])
+
+    r = client.post("/v1/ocr/document", files={"file": ("scan.tiff", io.BytesIO(buf.getvalue()), "image/tiff")})
+    assert _pages(r) == [0, 1, 2]
+
+
+def test_pdf_streams_every_page(client):
+    pymupdf = pytest.importorskip("pymupdf")
+    doc = pymupdf.open()
+    for i in range(2):
+        doc.new_page(width=200, height=100).insert_text((20, 50), f"page {i}")
+    data = doc.tobytes()
+
+    r = client.post("/v1/ocr/document", files={"file": ("doc.pdf", io.BytesIO(data), "application/pdf")})
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert _pages(r) == [0, 1]
+    assert all(line["ok"] and line["pages"] == 2 for line in lines)
+
+
+def _tiff(n):
+    Image = pytest.importorskip("PIL.Image")
+    frames = [Image.fromarray(np.full((40, 60, 3), 128, dtype=np.uint8)) for _ in range(n)]
+    buf = io.BytesIO()
+    frames[0].save(buf, format="TIFF", save_all=True, append_images=frames[1:])
+    return buf.getvalue()
+
+
+def test_single_image_endpoint_rejects_multipage_tiff(client):
+    r = client.post("/v1/ocr", files={"file": ("scan.tiff", io.BytesIO(_tiff(3)), "image/tiff")})
+    assert r.status_code == 415
+    assert "/v1/ocr/document" in r.json()["detail"]
+
+    r = client.post("/v1/ocr", files={"file": ("scan.tiff", io.BytesIO(_tiff(1)), "image/tiff")})
+    assert r.status_code == 200
+
+
+def test_pdf_page_over_pixel_budget_is_rejected_before_rendering(monkeypatch):
+    pymupdf = pytest.importorskip("pymupdf")
+    from app.core.config import settings
+    from app.core.errors import AppException
+    from app.services.documents import open_pages
+
+    doc = pymupdf.open()
+    doc.new_page(width=200, height=100)
+    src = open_pages(doc.tobytes())
+    monkeypatch.setattr(settings, "ocr_max_pixels", 1000)
+
+    with pytest.raises(AppException) as e:
+        src.render(0)
+    assert e.value.status == 413
+    src.close()
@@ -0,0 +1,69 @@
+import msgpack
+import numpy as np
+
+from app.core import serialization
+from app.models.schemas import OcrResponse
+
+
+def _post(client, query="", headers=None):
+    return client.post(f"/v1/ocr{query}", files={"file": ("a.png", b"img", "image/png")}, headers=headers or {})
+
+
+def test_default_json_matches_response_model(client):
+    r = _post(client)
+    assert r.status_code == 200
+    body = r.json()
+    # El camino rápido no revalida, pero produce exactamente lo que produciría OcrResponse.
+    assert body == OcrResponse.model_validate(body).model_dump(mode="json", exclude_unset=True)
+    assert list(body["data"]) == ["text", "blocks", "preprocess", "cache"]
+
+
+def test_columnar_json_by_query_and_accept(client):
+    for r in (
+        _post(client, "?format=columnar"),
+        _post(client, headers={"Accept": "application/vnd.kennedycore.ocr.columnar+json"}),
+    ):
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/vnd.kennedycore.ocr.columnar+json")
+        blocks = r.json()["data"]["blocks"]
+        assert blocks["count"] == 1 and blocks["text"] == ["FAKE"] and blocks["confidence"] == [0.99]
+        assert blocks["boxStride"] == 8 and blocks["boxes"] == [0, 0, 10, 0, 10, 10, 0, 10]
+
+
+def test_columnar_json_without_orjson(client, monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)  # fuerza el fallback json de la stdlib
+    r = _post(client, "?format=columnar")
+    assert r.status_code == 200
+    assert r.json()["data"]["blocks"]["boxes"] == [0, 0, 10, 0, 10, 10, 0, 10]
+
+
+def test_msgpack_has_binary_int32_boxes(client):
+    r = _post(client, headers={"Accept": "application/msgpack"})
+    assert r.status_code == 200
+    body = msgpack.unpackb(r.content, raw=False)
+    blocks = body["data"]["blocks"]
+    boxes = np.frombuffer(blocks["boxes"], dtype="<i4").reshape(blocks["count"], blocks["boxStride"])
+    assert boxes.tolist() == [[0, 0, 10, 0, 10, 10, 0, 10]]
+    assert body["format"] == "columnar" and body["data"]["text"] == "FAKE OCR TEXT"
+
+
+def test_unknown_format_is_400(client):
+    r = _post(client, "?format=xml")
+    assert r.status_code == 400
+    assert r.json()["code"] == "OCR-VALIDATION-400"
+
+
+def test_columnar_formats_without_blocks(client, monkeypatch):
+    # Lo que devuelve el engine para una página en blanco, con blocks=false o un descarte del triage.
+    empty = {"text": "", "blocks": [], "preprocess": None}
+    monkeypatch.setattr(client.app.state.ocr_engine, "extract", lambda img, **kwargs: dict(empty))
+
+    r = _post(client, "?format=columnar&blocks=false")
+    assert r.status_code == 200
+    blocks = r.json()["data"]["blocks"]
+    assert blocks == {"count": 0, "text": [], "confidence": [], "boxes": [], "boxStride": 8}
+
+    r = _post(client, "?format=msgpack")
+    assert r.status_code == 200
+    blocks = msgpack.unpackb(r.content, raw=False)["data"]["blocks"]
+    assert blocks["count"] == 0 and blocks["boxes"] == b""
@@ -0,0 +1,110 @@
+import io
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main as main_module
+from app.core.config import settings
+from app.main import app
+from tests.conftest import FakeOcrEngine
+
+
+@pytest.fixture
+def jobs_client(monkeypatch, tmp_path):
+    monkeypatch.setattr(main_module, "create_ocr_engine", lambda: FakeOcrEngine())
+    monkeypatch.setattr(settings, "ocr_jobs_db", str(tmp_path / "jobs.sqlite3"))
+    previous = dict(app.state._state)
+    with TestClient(app) as c:
+        yield c
+    app.state._state.clear()
+    app.state._state.update(previous)
+
+
+def _wait_result(client, job_id):
+    for _ in range(100):
+        r = client.get(f"/v1/ocr/jobs/{job_id}/result")
+        if r.status_code != 202:
+            return r
+        assert "Retry-After" in r.headers
+        time.sleep(0.02)
+    raise AssertionError("job did not finish")
+
+
+def test_job_runs_and_returns_result(jobs_client):
+    r = jobs_client.post("/v1/ocr/jobs", files={"file": ("a.png", io.BytesIO(b"img"), "image/png")})
+    assert r.status_code == 202
+    job = r.json()["data"]
+    assert job["status"] in ("queued", "running", "done")
+
+    r = _wait_result(jobs_client, job["jobId"])
+    assert r.status_code == 200
+    assert r.json()["data"]["text"] == "FAKE OCR TEXT"
+    assert jobs_client.get(job["statusUrl"]).json()["data"]["status"] == "done"
+
+
+def test_job_requires_one_source(jobs_client):
+    r = jobs_client.post("/v1/ocr/jobs", data={})
+    assert r.status_code == 400
+
+
+def test_unknown_job_is_404(jobs_client):
+    r = jobs_client.get("/v1/ocr/jobs/does-not-exist")
+    assert r.status_code == 404
+    assert r.json()["code"] == "OCR-JOB-NOT-FOUND-404"
+
+
+def test_full_queue_returns_429(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "ocr_jobs_queue_size", 1)
+    monkeypatch.setattr(settings, "ocr_jobs_workers", 0)
+    monkeypatch.setattr(settings, "ocr_pool_size", 0)
+    monkeypatch.setattr(main_module, "create_ocr_engine", lambda: FakeOcrEngine())
+    monkeypatch.setattr(settings, "ocr_jobs_db", str(tmp_path / "jobs.sqlite3"))
+    previous = dict(app.state._state)
+    try:
+        with TestClient(app) as c:
+            files = {"file": ("a.png", io.BytesIO(b"img"), "image/png")}
+            assert c.post("/v1/ocr/jobs", files=files).status_code == 202
+            r = c.post("/v1/ocr/jobs", files={"file": ("b.png", io.BytesIO(b"img"), "image/png")})
+            assert r.status_code == 429
+            assert int(r.headers["Retry-After"]) >= 1
+    finally:
+        app.state._state.clear()
+        app.state._state.update(previous)
+
+
+def test_expired_jobs_are_purged_without_restart(tmp_path):
+    import asyncio
+
+    from app.services.jobs import DONE, JobManager, JobStore
+
+    store = JobStore(tmp_path / "jobs.sqlite3", ttl_seconds=0.05)
+
+    async def run(payload):
+        return {"text": "x"}
+
+    async def scenario():
+        manager = JobManager(store, run, queue_size=4, workers=1, purge_interval=0.05)
+        await manager.start()
+        try:
+            job_id = await manager.submit({})
+            for _ in range(50):
+                await asyncio.sleep(0.02)
+                if manager.stats()["purged"]:
+                    break
+            return job_id, manager.stats()
+        finally:
+            await manager.stop()
+
+    job_id, stats = asyncio.run(scenario())
+
+    assert stats["done"] == 1 and stats["purged"] == 1
+    assert store._db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+    assert store.get(job_id) is None
+
+    expired = store.create()
+    store.update(expired, DONE, result={"text": "y"})
+    time.sleep(0.06)
+    assert store.get(expired) is None
+    assert store._db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+    store.close()
@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from app.core.errors import AppException
+from app.services.ocr_pool import OcrInstancePool
+
+
+def test_pool_runs_instances_in_parallel():
+    pool = OcrInstancePool(object, size=2, timeout=1.0)
+    barrier = threading.Barrier(2, timeout=2.0)
+    seen = []
+
+    def work():
+        with pool.acquire() as inst:
+            seen.append(inst)
+            barrier.wait()
+
+    threads = [threading.Thread(target=work) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(x) for x in seen}) == 2
+    stats = pool.stats()
+    assert stats["acquired"] == 2
+    assert stats["in_use"] == 0
+
+
+def test_pool_times_out_when_exhausted():
+    pool = OcrInstancePool(object, size=1, timeout=0.05)
+
+    with pool.acquire():
+        with pytest.raises(AppException) as exc:
+            with pool.acquire():
+                pass
+
+    assert exc.value.status == 503
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_stats_endpoint(client):
+    r = client.get("/stats")
+    assert r.status_code == 200
+    assert "engine" in r.json()
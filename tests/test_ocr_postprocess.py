@@ -0,0 +1,93 @@
+import numpy as np
+
+from app.services.ocr_postprocess import assemble_result, build_result, layout_from_blocks
+
+
+def _rect(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+def _shuffled(items, seed=0):
+    order = np.random.default_rng(seed).permutation(len(items))
+    return [items[i] for i in order]
+
+
+def test_two_columns_are_read_column_by_column():
+    items = [("TITULO", _rect(100, 20, 700, 60))]
+    for k in range(4):
+        items.append((f"A{k}", _rect(50, 100 + k * 30, 380, 120 + k * 30)))
+        items.append((f"B{k}", _rect(420, 100 + k * 30, 750, 120 + k * 30)))
+
+    out = assemble_result([(box, (text, 0.9)) for text, box in _shuffled(items)], return_blocks=True)
+
+    assert out["text"].split("\n") == ["TITULO", "A0", "A1", "A2", "A3", "B0", "B1", "B2", "B3"]
+    assert [b["text"] for b in out["blocks"]] == out["text"].split("\n")
+
+
+def test_table_rows_are_joined_into_lines():
+    rows = [("Cantidad", "Descripcion", "Precio"), ("2 x", "Cafe con leche", "850,00")]
+    items = [("CUIT 30-71234567-8 IVA Resp. Inscripto", _rect(50, 20, 700, 40))]
+    for k, cells in enumerate(rows):
+        y = 80 + k * 30
+        for text, (x0, x1) in zip(cells, [(50, 130), (250, 420), (600, 680)]):
+            items.append((text, _rect(x0, y, x1, y + 20)))
+
+    out = assemble_result([(box, (text, 0.9)) for text, box in _shuffled(items)], return_blocks=False)
+
+    assert out["text"] == "CUIT 30-71234567-8 IVA Resp. Inscripto\nCantidad Descripcion Precio\n2 x Cafe con leche 850,00"
+    assert out["blocks"] == []
+
+
+def test_skewed_page_keeps_line_order():
+    angle = np.deg2rad(4)
+    rot = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    items = [(f"L{k}", (np.asarray(_rect(50, 100 + k * 30, 700, 120 + k * 30), dtype=float) @ rot.T).tolist()) for k in range(8)]
+
+    out = assemble_result([(box, (text, 0.9)) for text, box in _shuffled(items, seed=1)], return_blocks=True)
+
+    assert out["text"].split("\n") == [f"L{k}" for k in range(8)]
+    assert all(isinstance(v, int) for b in out["blocks"] for p in b["box"] for v in p)
+
+
+def test_regions_keep_the_order_they_were_sent():
+    quads = np.asarray([_rect(0, 200, 100, 220), _rect(0, 0, 100, 20)], dtype=np.float32)
+
+    out = build_result(quads + 0.6, ["abajo", "arriba"], [0.8, 0.9], return_blocks=True, reorder=False)
+
+    assert out["text"] == "abajo\narriba"
+    assert out["blocks"][0]["box"][0] == [1, 201]
+
+
+def test_layout_groups_lines_and_paragraphs():
+    blocks = []
+    y = 100
+    for p in range(2):
+        for k in range(3):
+            blocks.append({"text": f"P{p}L{k}a", "confidence": 0.9, "box": _rect(50, y, 300, y + 20)})
+            blocks.append({"text": f"P{p}L{k}b", "confidence": 0.9, "box": _rect(450, y, 600, y + 20)})
+            y += 28
+        y += 40
+    blocks = _shuffled(blocks)
+
+    layout = layout_from_blocks(blocks)
+
+    assert len(layout["lines"]) == 6 and len(layout["paragraphs"]) == 2
+    first = layout["lines"][0]
+    assert first["text"] == "P0L0a P0L0b"
+    assert [blocks[i]["text"] for i in first["blocks"]] == ["P0L0a", "P0L0b"]
+    assert first["box"] == [50, 100, 600, 120]
+    assert layout["paragraphs"][1]["lines"] == [3, 4, 5]
+    assert layout["paragraphs"][1]["text"].split("\n")[0] == "P1L0a P1L0b"
+
+
+def test_layout_query_param(client):
+    r = client.post("/v1/ocr?layout=true&blocks=false", files={"file": ("a.png", b"layout", "image/png")})
+
+    assert r.status_code == 200
+    data = r.json()["data"]
+    assert data["blocks"] == []
+    assert data["lines"] == [{"text": "FAKE", "box": [0, 0, 10, 10], "blocks": [0]}]
+    assert data["paragraphs"] == [{"text": "FAKE", "box": [0, 0, 10, 10], "lines": [0]}]
+
+    r = client.post("/v1/ocr", files={"file": ("a.png", b"layout", "image/png")})
+    assert "lines" not in r.json()["data"]
@@ -0,0 +1,92 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.core.errors import AppException
+from app.services.ocr_process_pool import ProcessOcrEngine
+
+
+class EchoEngine:
+    """Engine de prueba: devuelve lo que ve en memoria compartida, o se cae/cuelga a pedido."""
+
+    def extract(self, img, *, preprocess, return_blocks, **options):
+        marker = int(img[0, 0, 0])
+        if marker == 1:
+            os._exit(1)
+        if marker == 2:
+            time.sleep(60)
+        return {"text": f"{img.shape[1]}x{img.shape[0]}", "blocks": [], "preprocess": {"sum": int(img.sum())}}
+
+
+class SlowStartEngine(EchoEngine):
+    """Simula la carga del modelo al arrancar el worker."""
+
+    def __init__(self):
+        time.sleep(1.5)
+
+
+@pytest.fixture
+def engine():
+    eng = ProcessOcrEngine(
+        workers=1,
+        timeout=3.0,
+        startup_timeout=60.0,
+        engine_factory=f"{EchoEngine.__module__}:EchoEngine",
+    )
+    yield eng
+    eng.close()
+
+
+def _img(marker: int) -> np.ndarray:
+    img = np.zeros((20, 30, 3), dtype=np.uint8)
+    img[0, 0, 0] = marker
+    img[5, 5] = 7
+    return img
+
+
+def test_image_reaches_worker(engine):
+    out = engine.extract(_img(0), preprocess=False, return_blocks=False)
+    assert out["text"] == "30x20"
+    assert out["preprocess"]["sum"] == 21
+
+
+def test_crashed_and_hung_workers_are_restarted(engine):
+    with pytest.raises(AppException) as exc:
+        engine.extract(_img(1), preprocess=False, return_blocks=False)
+    assert exc.value.status == 500
+
+    with pytest.raises(AppException) as exc:
+        engine.extract(_img(2), preprocess=False, return_blocks=False)
+    assert exc.value.status == 504
+
+    out = engine.extract(_img(0), preprocess=False, return_blocks=False)
+    assert out["text"] == "30x20"
+
+    stats = engine.stats()
+    assert stats["crashes"] == 1
+    assert stats["hangs"] == 1
+    assert stats["workers"][0]["restarts"] == 2
+
+
+def test_restarted_worker_stays_out_of_pool_until_ready():
+    eng = ProcessOcrEngine(
+        workers=1,
+        timeout=3.0,
+        startup_timeout=60.0,
+        engine_factory=f"{SlowStartEngine.__module__}:SlowStartEngine",
+    )
+    try:
+        with pytest.raises(AppException):
+            eng.extract(_img(1), preprocess=False, return_blocks=False)
+        assert eng.stats()["workers"][0]["ready"] is False
+
+        # La espera por la carga del worker nuevo queda en acquire (cola del pool), no en run().
+        out = eng.extract(_img(0), preprocess=False, return_blocks=False)
+        assert out["text"] == "30x20"
+        stats = eng.stats()
+        assert stats["workers"][0]["ready"] is True
+        assert stats["pool"]["wait_seconds"]["max"] > 0.5
+    finally:
+        eng.close()
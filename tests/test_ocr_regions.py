@@ -0,0 +1,74 @@
+import io
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core.errors import AppException
+from app.services.image_preprocess import default_preprocess_config, preprocess_for_ocr, to_original, to_processed
+from app.services.ocr_extract import extract_from_bytes
+from app.services.ocr_regions import parse_regions
+
+
+def test_parse_regions_accepts_rects_and_quads():
+    regions = parse_regions(json.dumps([[10, 20, 110, 60], [[0, 0], [5, 0], [5, 5], [0, 5]]]))
+    assert regions.shape == (2, 4, 2)
+    assert regions[0].tolist() == [[10, 20], [110, 20], [110, 60], [10, 60]]
+
+    for bad in ("[]", "[[1, 2, 3]]", "[[10, 10, 5, 5]]", "not json", "[[0, 0, NaN, 10]]", "[[0, 0, Infinity, 10]]"):
+        with pytest.raises(AppException):
+            parse_regions(bad)
+
+
+def test_regions_outside_the_image_are_rejected():
+    ok, png = cv2.imencode(".png", np.zeros((100, 200, 3), dtype=np.uint8))
+    calls = []
+
+    def extract(img, **options):
+        calls.append(options["regions"])
+        return {"text": "", "blocks": [], "preprocess": None}
+
+    def run(raw):
+        return extract_from_bytes(
+            extract, png.tobytes(), keep_side=None, preprocess=False, return_blocks=True, regions=parse_regions(raw)
+        )
+
+    with pytest.raises(AppException) as exc:
+        run("[[10, 10, 50, 50], [300, 10, 400, 50]]")
+    assert exc.value.status == 400 and "regions[1]" in exc.value.detail
+    assert calls == []
+
+    run("[[150, 50, 400, 300]]")  # parcialmente dentro: se recorta al borde
+    assert len(calls) == 1
+
+
+def test_region_coordinates_round_trip_through_preprocess_meta():
+    img = np.zeros((900, 1600, 3), dtype=np.uint8)
+    img[100:150, 200:400] = 255
+    out, meta = preprocess_for_ocr(img, default_preprocess_config())
+
+    quad = np.array([[[200, 100], [400, 100], [400, 150], [200, 150]]], dtype=np.float32)
+    processed = to_processed(quad, meta)
+    x1, y1 = processed[0, 0].round().astype(int)
+    x2, y2 = processed[0, 2].round().astype(int)
+    # La zona mapeada cae sobre el mismo contenido en la imagen preprocesada.
+    assert out[y1 + 2 : y2 - 2, x1 + 2 : x2 - 2].min() > 200
+    assert np.allclose(to_original(processed, meta), quad, atol=0.01)
+
+
+def test_regions_reach_the_engine(client):
+    r = client.post(
+        "/v1/ocr",
+        files={"file": ("a.png", io.BytesIO(b"regions"), "image/png")},
+        data={"regions": json.dumps([[0, 0, 10, 10]])},
+    )
+    assert r.status_code == 200
+    assert client.app.state.ocr_engine.last_regions.shape == (1, 4, 2)
+
+    r = client.post(
+        "/v1/ocr?rec=false",
+        files={"file": ("a.png", io.BytesIO(b"regions"), "image/png")},
+        data={"regions": json.dumps([[0, 0, 10, 10]])},
+    )
+    assert r.status_code == 400
@@ -0,0 +1,92 @@
+import pytest
+
+from app.core.config import settings
+from app.core.errors import AppException
+from app.services.ocr_registry import OcrEngineRegistry, resolve_lang
+
+
+class SizedEngine:
+    def __init__(self, lang, size):
+        self.lang = lang
+        self.size = size
+        self.closed = False
+
+    def memory_bytes(self):
+        return self.size
+
+    def close(self):
+        self.closed = True
+
+
+def test_loads_on_demand_and_evicts_lru_under_budget():
+    built = []
+
+    def build(lang):
+        built.append(SizedEngine(lang, 40))
+        return built[-1]
+
+    registry = OcrEngineRegistry(build, max_bytes=100)
+    en = registry.acquire("en")
+    registry.release("en", en)
+    assert registry.acquire("en") is en  # hit
+    registry.release("en", en)
+
+    fr = registry.acquire("fr")
+    registry.release("fr", fr)
+    registry.acquire("en")  # en pasa a ser el más reciente
+    registry.release("en", en)
+
+    de = registry.acquire("de")  # 120 > 100: sale fr (LRU)
+    registry.release("de", de)
+
+    stats = registry.stats()
+    assert set(stats["loaded"]) == {"en", "de"}
+    assert stats["loads"] == 3 and stats["hits"] == 2 and stats["evictions"] == 1
+    assert fr.closed and not en.closed
+
+
+def test_evicted_engine_in_use_is_closed_after_last_release():
+    registry = OcrEngineRegistry(lambda lang: SizedEngine(lang, 80), max_bytes=100)
+    en = registry.acquire("en")  # en uso
+    fr = registry.acquire("fr")  # desaloja en, pero sigue en uso
+    assert not en.closed and registry.stats()["draining"] == 1
+
+    registry.release("en", en)
+    assert en.closed and registry.stats()["draining"] == 0
+    registry.release("fr", fr)
+
+
+def test_close_also_closes_draining_engines():
+    registry = OcrEngineRegistry(lambda lang: SizedEngine(lang, 80), max_bytes=100)
+    en = registry.acquire("en")
+    fr = registry.acquire("fr")  # en queda drenando
+
+    registry.close()
+    assert en.closed and fr.closed
+    assert registry.stats()["draining"] == 0
+
+
+def test_fixed_engine_size_overrides_measurement():
+    registry = OcrEngineRegistry(lambda lang: SizedEngine(lang, 1), max_bytes=100, engine_bytes=60)
+    en = registry.acquire("en")
+    registry.release("en", en)
+    fr = registry.acquire("fr")  # 120 > 100 con el tamaño fijo, aunque midan 1
+    registry.release("fr", fr)
+
+    assert set(registry.stats()["loaded"]) == {"fr"} and en.closed
+
+
+def test_lang_validation(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_lang", "es")
+    monkeypatch.setattr(settings, "ocr_langs_raw", "en, ch")
+    assert resolve_lang(None) == "es"
+    assert resolve_lang("EN") == "en"
+    with pytest.raises(AppException) as e:
+        resolve_lang("fr")
+    assert e.value.status == 400
+
+
+def test_lang_query_is_validated(client):
+    r = client.post("/v1/ocr?lang=xx", files={"file": ("a.png", b"img", "image/png")})
+    assert r.status_code == 400
+    assert r.json()["code"] == "OCR-VALIDATION-400"
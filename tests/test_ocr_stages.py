@@ -0,0 +1,35 @@
+import io
+
+from app.services.ocr_stages import OcrStages
+
+
+def _post(client, query):
+    return client.post(
+        f"/v1/ocr?{query}",
+        files={"file": ("a.png", io.BytesIO(b"stages " + query.encode()), "image/png")},
+    )
+
+
+def test_stage_query_params_reach_the_engine(client):
+    r = _post(client, "cls=false")
+    assert r.status_code == 200
+    assert client.app.state.ocr_engine.last_stages == OcrStages(det=True, cls=False, rec=True)
+
+
+def test_at_least_one_of_det_or_rec_is_required(client):
+    r = _post(client, "det=false&rec=false")
+    assert r.status_code == 400
+
+
+def test_results_are_cached_per_stage_configuration(client, monkeypatch):
+    from app.services.ocr_runner import create_result_cache
+
+    monkeypatch.setattr(client.app.state, "result_cache", create_result_cache(), raising=False)
+    assert _post(client, "rec=true").json()["data"]["cache"]["status"] == "miss"
+    assert _post(client, "rec=true").json()["data"]["cache"]["status"] == "hit"
+
+    r = client.post(
+        "/v1/ocr?rec=false",
+        files={"file": ("a.png", io.BytesIO(b"stages rec=true"), "image/png")},
+    )
+    assert r.json()["data"]["cache"]["status"] == "miss"
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.core.errors import AppException
+from app.services.ocr_tiling import extract_tiled, merge_overlaps, tile_grid
+
+WORDS = [(f"w{i}", x, y) for i, (x, y) in enumerate([(10, 10), (470, 200), (880, 430), (1210, 820), (450, 460)])]
+
+
+class GridEngine:
+    """Devuelve las palabras de WORDS que tocan el tile, recortadas al borde como haría el detector."""
+
+    def extract(self, tile, *, preprocess, return_blocks, stages=None):
+        ox = int(tile[0, 0, 0]) * 256 + int(tile[0, 0, 1])
+        oy = int(tile[0, 0, 2]) * 256 + int(tile[0, 0, 3])
+        th, tw = tile.shape[:2]
+        blocks = []
+        for text, x, y in WORDS:
+            x1, y1 = max(x, ox) - ox, max(y, oy) - oy
+            x2, y2 = min(x + 60, ox + tw) - ox, min(y + 20, oy + th) - oy
+            if x2 - x1 > 5 and y2 - y1 > 5:
+                blocks.append({"text": text, "confidence": 0.9, "box": [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]})
+        return {"text": "", "blocks": blocks, "preprocess": None}
+
+
+def _coordinate_image(h, w):
+    ys, xs = np.mgrid[0:h, 0:w]
+    return np.stack([xs // 256, xs % 256, ys // 256, ys % 256], axis=-1).astype(np.uint8)
+
+
+def test_tile_grid_covers_image_with_overlap():
+    tiles = tile_grid(1000, 1300, 500, 100)
+    assert tiles[0] == (0, 0, 500, 500)
+    assert tiles[-1] == (800, 500, 1300, 1000)
+    covered = np.zeros((1000, 1300), dtype=bool)
+    for x0, y0, x1, y1 in tiles:
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+
+
+def test_merge_keeps_full_box_and_never_merges_within_a_tile():
+    quads = np.array(
+        [
+            [[100, 0], [160, 0], [160, 20], [100, 20]],  # completa (tile 1)
+            [[100, 0], [130, 0], [130, 20], [100, 20]],  # cortada por el borde (tile 0)
+            [[105, 2], [125, 2], [125, 18], [105, 18]],  # mismo tile que la completa
+        ],
+        dtype=np.float32,
+    )
+    keep = merge_overlaps(quads, np.array([1, 0, 1]), 0.6)
+    assert sorted(keep.tolist()) == [0, 2]
+
+
+def test_extract_tiled_returns_each_word_once_in_original_coordinates(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_tile_size", 500)
+    monkeypatch.setattr(settings, "ocr_tile_overlap", 100)
+    out = extract_tiled(GridEngine(), _coordinate_image(1000, 1300), return_blocks=True)
+
+    found = {b["text"]: b["box"] for b in out["blocks"]}
+    assert len(out["blocks"]) == len(WORDS)
+    for text, x, y in WORDS:
+        assert found[text] == [[x, y], [x + 60, y], [x + 60, y + 20], [x, y + 20]]
+    assert out["preprocess"]["tiling"]["tiles"] == 9
+
+
+def test_too_many_tiles_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_tile_max_tiles", 2)
+    with pytest.raises(AppException) as exc:
+        extract_tiled(GridEngine(), np.zeros((4000, 4000, 4), dtype=np.uint8), return_blocks=True)
+    assert exc.value.status == 413
+
+
+def test_tiles_never_exceed_the_detector_limit(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_tile_size", 1600)
+    monkeypatch.setattr(settings, "ocr_det_limit_side_len", 960)
+    out = extract_tiled(GridEngine(), _coordinate_image(1000, 1300), return_blocks=True)
+
+    assert out["preprocess"]["tiling"]["tile_size"] == 960
+    assert len(out["blocks"]) == len(WORDS)
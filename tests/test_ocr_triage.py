@@ -0,0 +1,100 @@
+from dataclasses import replace
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.trace import set_trace_id
+from app.services.engine_loader import warmup_images
+from app.services.ocr_triage import (
+    AUDITED,
+    PASSED,
+    SKIPPED,
+    TriageConfig,
+    run_triaged,
+    triage_reason,
+    triage_scores,
+    triage_stats,
+)
+
+CFG = TriageConfig(max_side=512, min_std=2.0, min_edge_density=0.0005, text_check=True, min_text_score=0.0003, audit_rate=0.0)
+
+
+def _product_photo():
+    img = np.zeros((800, 800, 3), np.uint8)
+    img[...] = np.linspace(40, 220, 800, dtype=np.uint8)[None, :, None]
+    cv2.circle(img, (400, 400), 200, (20, 60, 180), -1)
+    return cv2.GaussianBlur(img, (7, 7), 0)
+
+
+def _reason(img, cfg=CFG):
+    return triage_reason(triage_scores(img, cfg), cfg)
+
+
+def test_verdicts():
+    single_word = np.full((1200, 1600, 3), 255, np.uint8)
+    cv2.putText(single_word, "SALE", (700, 600), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+
+    assert _reason(np.full((1754, 1240, 3), 255, np.uint8)) == "blank"
+    assert _reason(warmup_images([(1240, 1754)])[0]) is None
+    assert _reason(single_word) is None
+    assert _reason(_product_photo()) == "no_text"
+    # Sin el chequeo de texto, una foto con bordes pasa al OCR.
+    assert _reason(_product_photo(), replace(CFG, text_check=False)) is None
+
+
+def test_skip_returns_empty_result_without_running_ocr():
+    calls = []
+    out = run_triaged(np.full((300, 300, 3), 255, np.uint8), CFG, lambda: calls.append(1))
+
+    assert calls == []
+    assert out["text"] == "" and out["blocks"] == []
+    assert out["triage"]["status"] == SKIPPED and out["triage"]["reason"] == "blank"
+
+    doc = warmup_images([(800, 600)])[0]
+    out = run_triaged(doc, CFG, lambda: {"text": "x", "blocks": [], "preprocess": None})
+    assert out["triage"]["status"] == PASSED and out["text"] == "x"
+
+
+def test_audit_records_false_negatives(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ocr_triage_audit_dir", str(tmp_path))
+    cfg = replace(CFG, audit_rate=1.0)
+    before = triage_stats()["false_negative"]
+
+    out = run_triaged(_product_photo(), cfg, lambda: {"text": "OFERTA", "blocks": [], "preprocess": None})
+
+    assert out["text"] == "OFERTA"
+    assert out["triage"]["status"] == AUDITED and out["triage"]["false_negative"] is True
+    stats = triage_stats()
+    assert stats["false_negative"] == before + 1
+    assert stats["recent_false_negatives"][-1]["text"] == "OFERTA"
+    assert len(list(tmp_path.glob("*.png"))) == 1
+
+
+def test_audit_file_name_ignores_client_trace_id(tmp_path, monkeypatch):
+    audit_dir = tmp_path / "audit"
+    monkeypatch.setattr(settings, "ocr_triage_audit_dir", str(audit_dir))
+    set_trace_id("../../escaped")
+    try:
+        cfg = replace(CFG, audit_rate=1.0)
+        run_triaged(_product_photo(), cfg, lambda: {"text": "OFERTA", "blocks": [], "preprocess": None})
+    finally:
+        set_trace_id("")
+
+    assert [p.parent for p in tmp_path.rglob("*.png")] == [audit_dir]
+    assert triage_stats()["recent_false_negatives"][-1]["traceId"] == "../../escaped"
+
+
+def test_triage_query_param_reaches_engine(client, monkeypatch):
+    monkeypatch.setattr(settings, "ocr_triage", False)
+    engine = client.app.state.ocr_engine
+
+    client.post("/v1/ocr", files={"file": ("a.png", b"triage-1", "image/png")})
+    assert engine.last_triage is None
+
+    client.post("/v1/ocr?triage=true", files={"file": ("a.png", b"triage-2", "image/png")})
+    assert isinstance(engine.last_triage, TriageConfig)
+
+    monkeypatch.setattr(settings, "ocr_triage", True)
+    client.post("/v1/ocr?triage=false", files={"file": ("a.png", b"triage-3", "image/png")})
+    assert engine.last_triage is None
@@ -0,0 +1,54 @@
+import threading
+
+import numpy as np
+
+from app.services.rec_batcher import RecognitionBatcher
+
+
+def _crop(value: int) -> np.ndarray:
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+def test_concurrent_requests_share_batches():
+    calls = []
+
+    def recognize(crops):
+        calls.append(len(crops))
+        return [(str(int(c[0, 0, 0])), 0.9) for c in crops]
+
+    batcher = RecognitionBatcher(recognize, window_ms=200, max_batch=8)
+    results = {}
+
+    def request(i):
+        results[i] = batcher.recognize([_crop(i * 10 + j) for j in range(3)])
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    for i in range(4):
+        assert [text for text, _ in results[i]] == [str(i * 10 + j) for j in range(3)]
+    assert sum(calls) == 12
+    assert max(calls) == 8
+    assert len(calls) < 4
+
+    stats = batcher.stats()
+    assert sum(v["batches"] for v in stats["by_batch_size"].values()) == len(calls)
+
+
+def test_recognizer_errors_reach_every_request():
+    def recognize(crops):
+        raise RuntimeError("boom")
+
+    batcher = RecognitionBatcher(recognize, window_ms=1, max_batch=4)
+    future = batcher.submit([_crop(1)])
+    try:
+        future.result(timeout=2)
+        assert False, "expected error"
+    except RuntimeError as e:
+        assert str(e) == "boom"
+    finally:
+        batcher.close()
@@ -0,0 +1,102 @@
+import io
+import threading
+import time
+
+from app.main import app
+from app.services.result_cache import OcrResultCache, cache_key
+
+
+def _result(text: str):
+    return {"text": text, "blocks": [], "preprocess": None}
+
+
+def test_key_depends_on_bytes_and_params():
+    base = cache_key(b"img", preprocess=True, blocks=True)
+    assert base == cache_key(b"img", blocks=True, preprocess=True)
+    assert base != cache_key(b"img", preprocess=False, blocks=True)
+    assert base != cache_key(b"img2", preprocess=True, blocks=True)
+
+
+def test_memory_lru_evicts_by_bytes():
+    cache = OcrResultCache(max_bytes=120)
+    for i in range(4):
+        cache.get_or_compute(f"k{i}", lambda i=i: _result(f"t{i}"))
+
+    stats = cache.stats()
+    assert stats["memory"]["bytes"] <= 120
+    assert stats["evictions"] > 0
+
+    _, info = cache.get_or_compute("k3", lambda: _result("again"))
+    assert info == {"status": "hit", "tier": "memory"}
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = OcrResultCache(max_bytes=1024, disk_path=path, disk_max_bytes=1024 * 1024)
+    cache.get_or_compute("k", lambda: _result("persisted"))
+    cache.close()
+
+    cache = OcrResultCache(max_bytes=1024, disk_path=path, disk_max_bytes=1024 * 1024)
+    out, info = cache.get_or_compute("k", lambda: _result("recomputed"))
+    cache.close()
+
+    assert out["text"] == "persisted"
+    assert info == {"status": "hit", "tier": "disk"}
+
+
+def test_inflight_requests_share_one_computation():
+    cache = OcrResultCache(max_bytes=1024)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return _result("shared")
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(out["text"] == "shared" for out, _ in results)
+    assert cache.stats()["hits"]["inflight"] == 2
+
+
+def test_results_rejected_by_store_are_not_kept_or_shared():
+    cache = OcrResultCache(max_bytes=1024)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return _result("not mine")
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute, lambda out: False)))
+        for _ in range(2)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Quien esperaba el mismo key no recibe el resultado descartado: lo computa por su cuenta.
+    assert len(calls) == 2
+    assert [info["status"] for _, info in results] == ["miss", "miss"]
+    assert cache.peek("k") is None
+
+
+def test_upload_reports_cache_hit(client, monkeypatch):
+    monkeypatch.setattr(app.state, "result_cache", OcrResultCache(max_bytes=1024 * 1024), raising=False)
+
+    for expected in ("miss", "hit"):
+        r = client.post("/v1/ocr", files={"file": ("test.png", io.BytesIO(b"same bytes"), "image/png")})
+        assert r.status_code == 200
+        assert r.json()["data"]["cache"]["status"] == expected
@@ -0,0 +1,119 @@
+import asyncio
+import io
+import os
+import tempfile
+
+import pytest
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.core.errors import AppException
+from app.api.v1.uploads import PartSizeLimiter, UploadTooLarge
+from app.utils.files import read_upload_chunked
+
+
+@pytest.fixture
+def one_mb_limit(monkeypatch):
+    monkeypatch.setattr(settings, "max_file_mb", 1)
+
+
+def test_declared_oversized_upload_is_rejected_before_reading(client, one_mb_limit):
+    r = client.post(
+        "/v1/ocr",
+        files={"file": ("big.png", io.BytesIO(os.urandom(2 * 1024 * 1024)), "image/png")},
+    )
+
+    assert r.status_code == 413
+    assert r.headers["content-type"].startswith("application/problem+json")
+    assert r.json()["type"].endswith("ocr-too-large-413")
+
+
+def test_chunked_upload_is_cut_when_limit_is_crossed(client, one_mb_limit):
+    boundary = "kc-boundary"
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="big.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode()
+
+    def body():
+        yield head
+        for _ in range(8):
+            yield os.urandom(256 * 1024)
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    r = client.post(
+        "/v1/ocr",
+        content=body(),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+
+    assert r.status_code == 413
+    assert r.json()["type"].endswith("ocr-too-large-413")
+
+
+def test_batch_part_over_file_limit_is_cut_while_streaming(client, one_mb_limit):
+    boundary = "kc-boundary"
+
+    def body():
+        yield (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="files"; filename="big.png"\r\n'
+            "Content-Type: image/png\r\n\r\n"
+        ).encode()
+        for _ in range(40):  # 10MB: dentro del tope del body de /batch, muy por encima del de un archivo
+            yield os.urandom(256 * 1024)
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    r = client.post(
+        "/v1/ocr/batch",
+        content=body(),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+
+    # Lo corta el middleware (antes de spoolear el archivo), no el chequeo por archivo del endpoint.
+    assert r.status_code == 413
+    assert r.json()["detail"] == "Un archivo excede 1MB"
+
+
+def test_part_limiter_finds_delimiters_split_across_chunks():
+    limiter = PartSizeLimiter(b"xyz", 20)
+    for chunk in (b"--xyz\r\n12345", b"678\r\n--x", b"yz\r\nabcd", b"g\r\n--xyz--"):
+        limiter.feed(chunk)
+
+    with pytest.raises(UploadTooLarge):
+        limiter.feed(b"0" * 20)
+
+
+def test_large_upload_within_limit_is_memory_mapped(client):
+    data = b"\x89PNG" + os.urandom(3 * 1024 * 1024)
+
+    r = client.post("/v1/ocr", files={"file": ("large.png", io.BytesIO(data), "image/png")})
+
+    assert r.status_code == 200
+    assert client.app.state.ocr_engine.last_size == len(data)
+
+
+def test_spooled_upload_is_mapped_and_released():
+    spool = tempfile.SpooledTemporaryFile(max_size=1024)
+    spool.write(b"x" * 4096)
+    spool.seek(0)
+    upload = UploadFile(spool, size=4096, filename="a.png")
+
+    buf = asyncio.run(read_upload_chunked(upload, 8192))
+    assert buf.mapped and len(buf) == 4096 and buf.data[:4] == b"xxxx"
+
+    buf.release()
+    buf.release()
+    assert spool.closed and len(buf) == 0
+
+
+def test_unknown_size_stream_stops_at_the_limit():
+    upload = UploadFile(io.BytesIO(b"x" * 5000), filename="a.png")
+
+    with pytest.raises(AppException) as e:
+        asyncio.run(read_upload_chunked(upload, 4096))
+    assert e.value.status == 413
+
+    small = asyncio.run(read_upload_chunked(UploadFile(io.BytesIO(b"abc"), filename="b.png"), 4096))
+    assert not small.mapped and small.data == b"abc"